@@ -4,6 +4,7 @@ import resources
 from PyQt6 import QtWidgets
 
 from configs import setup_logging
+from models.log_archive import archive_logs_in_background
 from views.auth import LoginDialog
 from views.main_window import MainWindow
 
@@ -17,6 +18,7 @@ if __name__ == "__main__":
         login_dialog = LoginDialog()
         if login_dialog.exec() == QtWidgets.QDialog.DialogCode.Accepted:
             # Proceed to main window if login is successful
+            archive_logs_in_background()
             main_window = MainWindow()
 
             main_window.show()
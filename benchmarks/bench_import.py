@@ -0,0 +1,63 @@
+"""Throughput of importing a directory tree of small files.
+
+"per item" calls create_folder and create_file once per entry, one commit
+each, which is what adding a tree level by level amounts to. "import" runs
+import_directory: one scan, parallel copies and a single transaction.
+
+    python -m benchmarks.bench_import [folder count] [files per folder]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BENCH_USERNAME, create_database, ensure_app, write_files
+
+
+def per_item(model, directory):
+    top = model.create_folder(BENCH_USERNAME, os.path.basename(directory))
+    for name in sorted(os.listdir(directory)):
+        folder = model.create_folder(BENCH_USERNAME, name, top.id)
+        folder_path = os.path.join(directory, name)
+        for file_name in sorted(os.listdir(folder_path)):
+            model.create_file(BENCH_USERNAME, os.path.join(folder_path, file_name), folder.id)
+
+
+def imported(model, directory):
+    from PyQt6.QtCore import QEventLoop
+
+    loop = QEventLoop()
+    importer = model.import_directory(BENCH_USERNAME, directory)
+    importer.finished.connect(lambda *_: loop.quit())
+    importer.start()
+    loop.exec()
+
+
+def run(folder_count, file_count):
+    from models.item import ItemModel
+
+    for name, load in (("per item", per_item), ("import", imported)):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_name = os.path.join(tmp, "bench.db")
+            create_database(database_name)
+            directory = os.path.join(tmp, "course")
+            for index in range(folder_count):
+                write_files(os.path.join(directory, f"chapter_{index}"), file_count, 4 * 1024)
+            root_path = os.path.join(tmp, "files_storage")
+            os.makedirs(root_path)
+            model = ItemModel(database_name=database_name, root_path=root_path)
+
+            started = time.perf_counter()
+            load(model, directory)
+            elapsed = time.perf_counter() - started
+            model.close_connection()
+
+        count = folder_count * file_count
+        print(f"{name}: {count} files in {elapsed:.1f}s, {count / elapsed:.0f} files/s")
+
+
+if __name__ == "__main__":
+    folders = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    files_per_folder = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    app = ensure_app()
+    run(folders, files_per_folder)
@@ -0,0 +1,64 @@
+"""Latency and memory of 1,000 sequential uploads into the file tree.
+
+Compares inserting the created row into the loaded tree with reloading the
+whole model after every upload, as refresh_tree_view used to do.
+
+    python -m benchmarks.bench_incremental_update [uploads]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.utils import BENCH_USERNAME, create_database, ensure_app, summarize, write_files
+
+
+def run(uploads, incremental):
+    from models.item import ItemModel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_name = os.path.join(tmp, "bench.db")
+        create_database(database_name)
+        sources = write_files(os.path.join(tmp, "src"), uploads, 1024)
+        root_path = os.path.join(tmp, "files_storage")
+        os.makedirs(root_path)
+
+        model = ItemModel(database_name=database_name, root_path=root_path)
+        tree_model = model.get_model()
+        tree_model.fetch_root()
+        tree_model.wait_for_loads()
+        tree_model.fetchMore(tree_model.index(0, 0))
+        tree_model.wait_for_loads()
+
+        tracemalloc.start()
+        start_memory = tracemalloc.get_traced_memory()[0]
+        samples = []
+        for path in sources:
+            started = time.perf_counter()
+            item = model.create_file(BENCH_USERNAME, path)
+            if incremental:
+                tree_model.insert_item(item)
+            else:
+                model.refresh_model()
+                tree_model.wait_for_loads()
+                tree_model.fetchMore(tree_model.index(0, 0))
+                tree_model.wait_for_loads()
+            samples.append(time.perf_counter() - started)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        model.close_connection()
+
+    label = "incremental insert" if incremental else "full refresh"
+    summarize(label, samples)
+    print(
+        f"{label}: memory growth={(current - start_memory) / 1024:.1f}KiB "
+        f"peak={(peak - start_memory) / 1024:.1f}KiB"
+    )
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    app = ensure_app()
+    run(count, incremental=False)
+    run(count, incremental=True)
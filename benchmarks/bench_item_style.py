@@ -0,0 +1,55 @@
+"""Per-node cost of building the font, brush and icon of a tree row.
+
+"uncached" repeats what CustomItem and populate_data did for every node:
+a new QFont per cell and a QFileIconProvider lookup per node. "cached"
+goes through the shared caches in common/style.py.
+
+    python -m benchmarks.bench_item_style [nodes]
+"""
+import sys
+import time
+
+from benchmarks.utils import ensure_app
+from common.file import get_item_category
+
+NAMES = ["slides.pdf", "photo.jpg", "lecture.mp4", "notes.txt", "song.mp3", "archive.zip", "Chương 1"]
+
+
+def uncached(nodes):
+    from PyQt6.QtGui import QColor, QFont
+    from PyQt6.QtWidgets import QFileIconProvider
+
+    icon_provider = QFileIconProvider()
+    for index in range(nodes):
+        name = NAMES[index % len(NAMES)]
+        is_folder = "." not in name
+        for _ in range(4):
+            font = QFont("Open Sans", 13)
+            font.setBold(is_folder)
+            QColor(0, 0, 0)
+        icon_provider.icon(
+            QFileIconProvider.IconType.Folder
+            if is_folder
+            else QFileIconProvider.IconType.File
+        )
+
+
+def cached(nodes):
+    from common.style import get_icon, get_style
+
+    for index in range(nodes):
+        name = NAMES[index % len(NAMES)]
+        is_folder = "." not in name
+        for _ in range(4):
+            get_style(13, is_folder)
+        get_icon(get_item_category("folder" if is_folder else "file", name))
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    app = ensure_app()
+    for name, func in (("uncached", uncached), ("cached", cached)):
+        started = time.perf_counter()
+        func(count)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed * 1000:.1f}ms total, {elapsed / count * 1e6:.2f}us per node")
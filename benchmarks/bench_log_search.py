@@ -0,0 +1,74 @@
+"""Latency of searching the audit log.
+
+Fills the logs table with generated Vietnamese messages, then times
+LogModel.search_log for common words, a prefix and a rare word, next to
+the LIKE scan search_log could at best have done before. Common words cost
+the most: bm25 counts every log holding them.
+
+    python -m benchmarks.bench_log_search [count]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import create_database, summarize
+from sql_statements.log import CREATE_TABLE_SQL
+
+WORDS = [
+    "Đăng nhập", "Đăng xuất", "thành công", "thất bại", "Tải lên tệp", "Tải xuống tệp",
+    "Xóa thư mục", "Đổi tên", "Tạo thư mục", "Đổi mật khẩu", "bài giảng", "chương",
+]
+QUERIES = ["dang xuat that bai", "dang nhap", "thu mu*", "999999"]
+
+
+def fill(database_name, count):
+    connection = sqlite3.connect(database_name)
+    connection.execute(CREATE_TABLE_SQL)
+    rows = (
+        (1, f"{' '.join(random.sample(WORDS, 3))} {index}", index)
+        for index in range(count)
+    )
+    connection.executemany(
+        "INSERT INTO logs (user_id, message, created_at) VALUES (?, ?, ?)", rows
+    )
+    connection.commit()
+    connection.close()
+
+
+def run(count):
+    from models.log import LogModel
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        database_name = os.path.join(tmp, "bench.db")
+        create_database(database_name)
+        fill(database_name, count)
+
+        started = time.perf_counter()
+        model = LogModel(database_name=database_name)
+        print(f"indexing {count} logs: {time.perf_counter() - started:.2f}s")
+
+        for text in QUERIES:
+            samples = []
+            for _ in range(20):
+                started = time.perf_counter()
+                model.search_log(text)
+                samples.append(time.perf_counter() - started)
+            summarize(f"search '{text}'", samples)
+
+        samples = []
+        for _ in range(5):
+            started = time.perf_counter()
+            model.connection.execute(
+                "SELECT id FROM logs WHERE message LIKE ? LIMIT 100", ("% 999999",)
+            ).fetchall()
+            samples.append(time.perf_counter() - started)
+        summarize("LIKE '% 999999'", samples)
+        model.close_connection()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
@@ -0,0 +1,64 @@
+"""Throughput of writing audit log events.
+
+"legacy" is the old LogModel.write_log: a new connection, a user lookup and
+a commit per event, on the calling thread. "log writer" queues the events
+for the LogWriter thread, which inserts them in batches; it is timed until
+every event is written.
+
+    python -m benchmarks.bench_log_write [count]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BENCH_USERNAME, create_database
+from sql_statements.log import CREATE_TABLE_SQL
+
+
+def legacy(database_name, username, message):
+    connection = sqlite3.connect(database_name)
+    cur = connection.cursor()
+    try:
+        cur.execute("SELECT id FROM users WHERE username = ?", (username,))
+        user_id = cur.fetchone()[0]
+        cur.execute("insert into logs (user_id, message) values (?, ?)", (user_id, message))
+        connection.commit()
+    finally:
+        cur.close()
+        connection.close()
+
+
+def run(count):
+    from models.log_writer import LogWriter
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_name = os.path.join(tmp, "bench.db")
+        create_database(database_name)
+        connection = sqlite3.connect(database_name)
+        connection.execute(CREATE_TABLE_SQL)
+        connection.commit()
+        connection.close()
+
+        started = time.perf_counter()
+        for index in range(count):
+            legacy(database_name, BENCH_USERNAME, f"Xóa tệp {index}")
+        elapsed = time.perf_counter() - started
+        print(f"legacy: {count} events in {elapsed:.2f}s, {count / elapsed:.0f} events/s")
+
+        writer = LogWriter(database_name)
+        started = time.perf_counter()
+        for index in range(count):
+            writer.write(BENCH_USERNAME, f"Xóa tệp {index}")
+        queued = time.perf_counter() - started
+        writer.close()
+        elapsed = time.perf_counter() - started
+        print(
+            f"log writer: {count} events in {elapsed:.2f}s, {count / elapsed:.0f} events/s, "
+            f"{queued / count * 1e6:.1f}us per write call"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,50 @@
+"""Cost of turning stored UTC timestamps into display strings.
+
+"legacy" is the old per-row path: pytz.timezone() and fromisoformat() for
+every value, then strftime. "batch" is format_utc_timestamps from
+common/time.py. Timestamps repeat the way log rows written in the same
+second do.
+
+    python -m benchmarks.bench_time [count]
+"""
+import datetime
+import sys
+import time
+
+from common.time import format_utc_timestamps
+
+
+def make_timestamps(count):
+    start = datetime.datetime(2024, 1, 1)
+    return [
+        (start + datetime.timedelta(seconds=index // 3)).strftime("%Y-%m-%d %H:%M:%S")
+        for index in range(count)
+    ]
+
+
+def legacy(timestamps, zone="Asia/Bangkok"):
+    import pytz
+
+    return [
+        datetime.datetime.fromisoformat(value)
+        .replace(tzinfo=pytz.utc)
+        .astimezone(pytz.timezone(zone))
+        .strftime("%Y-%m-%d %H:%M:%S")
+        for value in timestamps
+    ]
+
+
+def batch(timestamps, zone="Asia/Bangkok"):
+    return format_utc_timestamps(timestamps, zone)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    timestamps = make_timestamps(count)
+    outputs = {}
+    for name, func in (("legacy", legacy), ("batch", batch)):
+        started = time.perf_counter()
+        outputs[name] = func(timestamps)
+        elapsed = time.perf_counter() - started
+        print(f"{name}: {elapsed * 1000:.1f}ms total, {elapsed / count * 1e9:.0f}ns per value")
+    assert outputs["legacy"] == outputs["batch"]
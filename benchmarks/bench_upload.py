@@ -0,0 +1,61 @@
+"""Throughput of uploading a selection of files into the root folder.
+
+"sequential" calls create_file once per file, as handle_add_files used to
+on the GUI thread. "upload manager" copies on the transfer pool and inserts
+rows in batches. Runs 1,000 small files and 10 large ones.
+
+    python -m benchmarks.bench_upload [small count] [large size in MB]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.utils import BENCH_USERNAME, create_database, ensure_app, write_files
+
+
+def sequential(model, sources):
+    for path in sources:
+        model.create_file(BENCH_USERNAME, path)
+
+
+def managed(model, sources):
+    from PyQt6.QtCore import QEventLoop
+
+    loop = QEventLoop()
+    uploads = model.upload_files(BENCH_USERNAME, sources)
+    uploads.finished.connect(lambda *_: loop.quit())
+    uploads.start()
+    loop.exec()
+
+
+def run(label, count, size):
+    from models.item import ItemModel
+
+    for name, upload in (("sequential", sequential), ("upload manager", managed)):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_name = os.path.join(tmp, "bench.db")
+            create_database(database_name)
+            sources = write_files(os.path.join(tmp, "src"), count, size, prefix=label)
+            root_path = os.path.join(tmp, "files_storage")
+            os.makedirs(root_path)
+            model = ItemModel(database_name=database_name, root_path=root_path)
+
+            started = time.perf_counter()
+            upload(model, sources)
+            elapsed = time.perf_counter() - started
+            model.close_connection()
+
+        megabytes = count * size / 1024 / 1024
+        print(
+            f"{label} {name}: {count} files in {elapsed * 1000:.0f}ms, "
+            f"{count / elapsed:.0f} files/s, {megabytes / elapsed:.0f}MB/s"
+        )
+
+
+if __name__ == "__main__":
+    small_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    large_size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    app = ensure_app()
+    run("small", small_count, 16 * 1024)
+    run("large", 10, large_size * 1024 * 1024)
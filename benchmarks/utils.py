@@ -0,0 +1,59 @@
+import os
+import sqlite3
+import statistics
+import sys
+
+from common import session
+from common.auth import hash_password
+from common.session import UserSession
+from messages.permissions import ALL_PERMISSION
+from sql_statements.auth import CREATE_USER_TABLE_SQL, INSERT_USER_SQL
+from sql_statements.profile import CREATE_TABLE_SQL as CREATE_PROFILE_TABLE_SQL
+from sql_statements.profile import CREATE_USER_ID_INDEX_SQL as CREATE_PROFILE_INDEX_SQL
+from sql_statements.profile import INIT_DATA as INIT_PROFILE_DATA
+
+BENCH_USERNAME = "admin"
+
+
+def create_database(database_name):
+    """Create the tables the item and log models expect, with one admin user."""
+    connection = sqlite3.connect(database_name)
+    try:
+        connection.execute(CREATE_USER_TABLE_SQL)
+        connection.execute(
+            INSERT_USER_SQL, (BENCH_USERNAME, hash_password("admin123"), True)
+        )
+        connection.execute(CREATE_PROFILE_TABLE_SQL)
+        connection.execute(CREATE_PROFILE_INDEX_SQL)
+        connection.execute(INIT_PROFILE_DATA)
+        connection.commit()
+    finally:
+        connection.close()
+    session.SESSION = UserSession(BENCH_USERNAME, list(ALL_PERMISSION))
+
+
+def ensure_app():
+    from PyQt6.QtWidgets import QApplication
+
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+def write_files(directory, count, size, prefix="file"):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f"{prefix}_{index}.txt")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def summarize(name, samples):
+    samples = sorted(samples)
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(
+        f"{name}: n={len(samples)} mean={statistics.mean(samples) * 1000:.3f}ms "
+        f"p95={p95 * 1000:.3f}ms max={samples[-1] * 1000:.3f}ms"
+    )
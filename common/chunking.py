@@ -0,0 +1,98 @@
+import hashlib
+import random
+
+READ_SIZE = 4 * 1024 * 1024
+
+# Gear table of FastCDC, fixed so the same content always cuts at the same places
+_GEAR = [random.Random(f"gear-{byte}").getrandbits(64) for byte in range(256)]
+
+
+def _spread_mask(bits):
+    """A mask of ``bits`` ones spread over the high 48 bits of the fingerprint.
+
+    The fingerprint is shifted left once per byte, so its high bits depend on
+    the longest stretch of recent bytes.
+    """
+    mask = 0
+    for index in range(bits):
+        mask |= 1 << (63 - index * 48 // bits)
+    return mask
+
+
+class ContentDefinedChunker:
+    """FastCDC: cut points chosen by a rolling gear hash of the content.
+
+    An edit only changes the chunks around it, the cut points before and
+    after it stay where they were. Chunks fall between ``min_size`` and
+    ``max_size``, normalised towards ``avg_size`` with a stricter mask before
+    it and a looser one after it.
+    """
+
+    def __init__(self, min_size, avg_size, max_size):
+        self._min_size = min_size
+        self._avg_size = avg_size
+        self._max_size = max_size
+        bits = avg_size.bit_length() - 1
+        self._mask_small = _spread_mask(bits + 2)
+        self._mask_large = _spread_mask(bits - 2)
+
+    def _cut_point(self, data, start, end):
+        length = end - start
+        if length <= self._min_size:
+            return length
+        length = min(length, self._max_size)
+        normal = min(length, self._avg_size)
+        gear = _GEAR
+        fingerprint = 0
+        index = self._min_size
+        view = memoryview(data)
+        for mask, stop in ((self._mask_small, normal), (self._mask_large, length)):
+            # Iterating a memoryview is the fastest way to walk bytes in Python
+            for byte in view[start + index:start + stop]:
+                fingerprint = ((fingerprint << 1) + gear[byte]) & 0xFFFFFFFFFFFFFFFF
+                index += 1
+                if not fingerprint & mask:
+                    return index
+        return length
+
+    def iter_chunks(self, source):
+        """Yield the chunks of a binary file object from its current position."""
+        buffer = b""
+        position = 0
+        eof = False
+        while True:
+            if not eof and len(buffer) - position < self._max_size:
+                data = source.read(READ_SIZE)
+                eof = not data
+                buffer = buffer[position:] + data
+                position = 0
+            if position >= len(buffer):
+                return
+            size = self._cut_point(buffer, position, len(buffer))
+            if size == len(buffer) - position and not eof and size < self._max_size:
+                # Not enough data yet to tell where this chunk ends
+                continue
+            yield buffer[position:position + size]
+            position += size
+
+
+def assemble_chunks(chunk_paths, target_path, on_progress=None, is_cancelled=None):
+    """Concatenate chunk files into ``target_path``, hashing the output.
+
+    Returns the SHA-256 hex digest and the size of the content, or None when
+    ``is_cancelled()`` became true.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(target_path, "wb") as target:
+        for chunk_path in chunk_paths:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            with open(chunk_path, "rb") as chunk_file:
+                data = chunk_file.read()
+            digest.update(data)
+            target.write(data)
+            size += len(data)
+            if on_progress is not None:
+                on_progress(size)
+    return digest.hexdigest(), size
@@ -0,0 +1,125 @@
+import hashlib
+import lzma
+import zlib
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from common.file import get_file_type
+from configs import COMPRESSION_MIN_SAVING, COMPRESSION_POLICY
+
+CHUNK_SIZE = 1024 * 1024
+# Compressed input is read in smaller pieces so a chunk cannot expand into a huge buffer
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+
+def _zstd_compressor():
+    return zstandard.ZstdCompressor(level=3).compressobj()
+
+
+def _zstd_decompressor():
+    return zstandard.ZstdDecompressor().decompressobj()
+
+
+# codec -> (compressor factory, decompressor factory), both with the zlib object interface
+CODECS = {
+    "zlib": (lambda: zlib.compressobj(6), zlib.decompressobj),
+    "lzma": (lzma.LZMACompressor, lzma.LZMADecompressor),
+}
+if zstandard is not None:
+    CODECS["zstd"] = (_zstd_compressor, _zstd_decompressor)
+
+
+# Leading bytes each codec writes, the zlib header varies with the level
+CODEC_MAGIC = {
+    "zstd": b"\x28\xb5\x2f\xfd",
+    "lzma": b"\xfd7zXZ\x00",
+    "zlib": b"\x78",
+}
+
+
+def detect_codec(header):
+    """Codec that wrote a compressed blob starting with ``header``, None if unknown."""
+    for codec, magic in CODEC_MAGIC.items():
+        if header.startswith(magic):
+            return codec
+    return None
+
+
+def get_codec(filename):
+    """Codec the policy picks for a file, None to store it as it is.
+
+    zstd falls back to zlib when the zstandard package is not installed.
+    """
+    codec = COMPRESSION_POLICY.get(get_file_type(filename))
+    if codec == "zstd" and codec not in CODECS:
+        return "zlib"
+    return codec
+
+
+def pays_off(size, stored_size):
+    return stored_size <= size * (1 - COMPRESSION_MIN_SAVING)
+
+
+def compress_file(source_path, target_path, codec, on_progress=None, is_cancelled=None):
+    """Compress ``source_path`` into ``target_path``.
+
+    The first chunk is compressed on its own first and None is returned
+    without writing anything when even that does not pay off. Returns the
+    compressed size, or None when cancelled or skipped.
+    """
+    compressor = CODECS[codec][0]()
+    with open(source_path, "rb") as source:
+        chunk = source.read(CHUNK_SIZE)
+        probe = CODECS[codec][0]()
+        if chunk and not pays_off(len(chunk), len(probe.compress(chunk) + probe.flush())):
+            return None
+
+        read = 0
+        stored_size = 0
+        with open(target_path, "wb") as target:
+            while chunk:
+                if is_cancelled is not None and is_cancelled():
+                    return None
+                data = compressor.compress(chunk)
+                target.write(data)
+                stored_size += len(data)
+                read += len(chunk)
+                if on_progress is not None:
+                    on_progress(read)
+                chunk = source.read(CHUNK_SIZE)
+            data = compressor.flush()
+            target.write(data)
+            stored_size += len(data)
+    return stored_size
+
+
+def decompress_file(source_path, target_path, codec, on_progress=None, is_cancelled=None):
+    """Decompress ``source_path`` into ``target_path``, hashing the output.
+
+    Returns the SHA-256 hex digest and the size of the original content, or
+    None when ``is_cancelled()`` became true.
+    """
+    decompressor = CODECS[codec][1]()
+    digest = hashlib.sha256()
+    size = 0
+    read = 0
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        while chunk := source.read(DECOMPRESS_CHUNK_SIZE):
+            if is_cancelled is not None and is_cancelled():
+                return None
+            data = decompressor.decompress(chunk)
+            digest.update(data)
+            target.write(data)
+            size += len(data)
+            read += len(chunk)
+            if on_progress is not None:
+                on_progress(read)
+        if hasattr(decompressor, "flush"):
+            data = decompressor.flush()
+            digest.update(data)
+            target.write(data)
+            size += len(data)
+    return digest.hexdigest(), size
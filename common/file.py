@@ -1,3 +1,14 @@
+import errno
+import logging
+import os
+import sys
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
 def get_file_type(filename):
     if len(filename.split('.')) == 1:
         return "Thư mục"
@@ -20,3 +31,103 @@ def get_file_type(filename):
         return 'Âm Thanh'
     else:
         return 'Tệp'
+
+
+def get_item_category(item_type, filename):
+    """Category shown for an item, folders are recognised by type and not by name."""
+    if item_type == "folder":
+        return "Thư mục"
+    category = get_file_type(filename)
+    return "Tệp" if category == "Thư mục" else category
+
+
+COPY_CHUNK_SIZE = 8 * 1024 * 1024
+# ioctl request of FICLONE from linux/fs.h
+FICLONE = 0x40049409
+# Errors meaning "this primitive does not work here", the next one is tried
+_UNSUPPORTED_COPY_ERRORS = {
+    errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTTY,
+    errno.EBADF, errno.EPERM, errno.ENOTSUP,
+}
+
+
+def _copy_reflink(source, target, total, on_progress, is_cancelled):
+    fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    if on_progress is not None:
+        on_progress(total, total)
+    return True
+
+
+def _copy_chunks(copy_chunk):
+    """Build a copier calling ``copy_chunk(source_fd, target_fd, count)`` until done."""
+
+    def copier(source, target, total, on_progress, is_cancelled):
+        written = 0
+        while written < total:
+            if is_cancelled is not None and is_cancelled():
+                return None
+            copied = copy_chunk(
+                source.fileno(), target.fileno(), min(COPY_CHUNK_SIZE, total - written)
+            )
+            if copied == 0:
+                break
+            written += copied
+            if on_progress is not None:
+                on_progress(written, total)
+        return True
+
+    return copier
+
+
+def _copy_buffered(source, target, total, on_progress, is_cancelled):
+    written = 0
+    while chunk := source.read(COPY_CHUNK_SIZE):
+        if is_cancelled is not None and is_cancelled():
+            return None
+        target.write(chunk)
+        written += len(chunk)
+        if on_progress is not None:
+            on_progress(written, total)
+    return True
+
+
+COPY_METHODS = {}
+if fcntl is not None and sys.platform.startswith("linux"):
+    COPY_METHODS["reflink"] = _copy_reflink
+if hasattr(os, "copy_file_range"):
+    COPY_METHODS["copy_file_range"] = _copy_chunks(
+        lambda source_fd, target_fd, count: os.copy_file_range(source_fd, target_fd, count)
+    )
+if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+    COPY_METHODS["sendfile"] = _copy_chunks(
+        lambda source_fd, target_fd, count: os.sendfile(target_fd, source_fd, None, count)
+    )
+COPY_METHODS["buffered"] = _copy_buffered
+
+
+def copy_file(source_path, target_path, on_progress=None, is_cancelled=None, methods=None):
+    """Copy a file with the fastest primitive that works for the two paths.
+
+    A reflink shares the blocks when both files sit on one copy-on-write
+    filesystem (Btrfs, XFS), copy_file_range and sendfile keep the copy in the
+    kernel, and a buffered read/write loop works everywhere. ``methods``
+    restricts the order tried, the default is ``COPY_METHODS``.
+
+    Returns the name of the method used, or None when ``is_cancelled()``
+    became true, in which case the target is left partial.
+    """
+    total = os.path.getsize(source_path)
+    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+        for method in methods or COPY_METHODS:
+            try:
+                if COPY_METHODS[method](source, target, total, on_progress, is_cancelled) is None:
+                    return None
+                return method
+            except OSError as error:
+                if error.errno not in _UNSUPPORTED_COPY_ERRORS or method == "buffered":
+                    raise
+                logging.debug(f"Copy with {method} not supported: {error}")
+                source.seek(0)
+                target.seek(0)
+                target.truncate()
+    raise Exception(f"Error: no copy method could copy '{source_path}'")
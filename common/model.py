@@ -4,6 +4,8 @@ import sqlite3
 
 from PyQt6 import QtSql
 
+from sql_statements.migration import TEXT_TIMESTAMP_TO_EPOCH_SQL
+
 
 class Model(abc.ABC):
 
@@ -37,7 +39,10 @@ class SqliteModel(Model):
 
 class NativeSqlite3Model(Model):
     def __init__(self, database_name, table_create_sql):
+        self.database_name = database_name
         self.connection = sqlite3.connect(database_name)
+        # WAL lets background readers run while this connection writes
+        self.connection.execute("PRAGMA journal_mode=WAL")
         self._table_create_sql = table_create_sql
         self.init_db()
 
@@ -52,5 +57,45 @@ class NativeSqlite3Model(Model):
         finally:
             cur.close()
 
+    def _migrate_timestamps(self, table, columns=("created_at", "updated_at")):
+        """Rebuild ``table`` when ``columns`` still default to current_timestamp.
+
+        The table is recreated from the current create SQL, which stores epoch
+        seconds, and existing text values are converted while copying. Indexes
+        on the old table are dropped with it, so callers create theirs after.
+        """
+        cur = self.connection.cursor()
+        try:
+            cur.execute(f"PRAGMA table_info({table})")
+            table_info = cur.fetchall()
+            defaults = {row[1]: (row[4] or "").lower() for row in table_info}
+            if not any(defaults.get(column) == "current_timestamp" for column in columns):
+                return
+
+            names = [row[1] for row in table_info]
+            select = ", ".join(
+                TEXT_TIMESTAMP_TO_EPOCH_SQL.format(column=name) if name in columns else name
+                for name in names
+            )
+            self.connection.commit()
+            # Keep other tables' references pointing at the table name, not the renamed one
+            cur.execute("PRAGMA legacy_alter_table = ON")
+            cur.execute("BEGIN")
+            cur.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+            cur.execute(self._table_create_sql)
+            cur.execute(
+                f"INSERT INTO {table} ({', '.join(names)}) SELECT {select} FROM {table}_old"
+            )
+            migrated = cur.rowcount
+            cur.execute(f"DROP TABLE {table}_old")
+            self.connection.commit()
+            logging.info(f"Migrated {migrated} rows of '{table}' to epoch timestamps")
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            raise Exception(f"Failed to migrate '{table}' timestamps: {error}")
+        finally:
+            cur.execute("PRAGMA legacy_alter_table = OFF")
+            cur.close()
+
     def close_connection(self):
         self.connection.close()
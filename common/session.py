@@ -3,7 +3,7 @@ import logging
 
 class UserSession:
     def __init__(self, username, permissions: list[str],
-                 item_permissions: dict[str, list[str]] = {}):
+                 item_permissions: dict[int, list[str]] = {}):
         logging.debug(f"DEBUG: User '{username}'\n- Permissions '{permissions}'\n- Items '{item_permissions}'")
         self._username = username
         self._permissions = permissions
@@ -15,25 +15,25 @@ class UserSession:
     def get_permissions(self):
         return self._permissions
 
-    def get_item_permissions(self, item):
-        if item not in self._item_permissions.keys():
+    def get_item_permissions(self, item_id: int):
+        if item_id not in self._item_permissions.keys():
             return []
-        return self._item_permissions[item]
+        return self._item_permissions[item_id]
 
     def match_permissions(self, checked_permission):
         logging.debug(f"DEBUG: check permission {checked_permission}")
         return checked_permission in self._permissions
 
-    def match_item_permissions(self, item: str, checked_permission: str):
-        logging.debug(f"DEBUG: check {item} permission {checked_permission}")
-        return (item in self._item_permissions.keys()
-                and checked_permission in self._item_permissions[item])
+    def match_item_permissions(self, item_id: int, checked_permission: str):
+        logging.debug(f"DEBUG: check item {item_id} permission {checked_permission}")
+        return (item_id in self._item_permissions.keys()
+                and checked_permission in self._item_permissions[item_id])
 
     def update_permissions(self, new_permissions):
         self._permissions = new_permissions
 
-    def update_item_permissions(self, item, new_permissions):
-        self._item_permissions[item] = new_permissions
+    def update_item_permissions(self, item_id: int, new_permissions):
+        self._item_permissions[item_id] = new_permissions
 
     def clear(self):
         del self._username
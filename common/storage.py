@@ -0,0 +1,261 @@
+import hashlib
+import logging
+import os
+import re
+import uuid
+from dataclasses import dataclass
+
+from common.compression import compress_file, detect_codec, pays_off
+from common.file import copy_file
+from configs import FILES_STORAGE_FANOUT
+
+CHUNK_SIZE = 1024 * 1024
+BLOB_NAME_PATTERN = re.compile(r"[0-9a-f]{64}")
+FANOUT_NAME_PATTERN = re.compile(r"[0-9a-f]+")
+
+
+@dataclass
+class StoredBlob:
+    blob_hash: str
+    size: int
+    # False when the content was already stored
+    created: bool
+    codec: str = None
+    # None when how the blob is stored is not known, it cannot create its row then
+    stored_size: int = None
+
+    def reference_params(self):
+        """Parameters of REFERENCE_BLOB_SQL for one more item using this blob."""
+        if self.stored_size is None:
+            # The row would record a compressed blob as raw
+            raise Exception(f"Error: how blob '{self.blob_hash}' is stored is not known")
+        return {
+            "hash": self.blob_hash,
+            "size": self.size,
+            "codec": self.codec,
+            "stored_size": self.stored_size,
+        }
+
+
+def hash_file(file_path, chunk_size=CHUNK_SIZE, on_progress=None, is_cancelled=None):
+    """Return the SHA-256 hex digest and the size of a file, read in chunks.
+
+    Returns None when ``is_cancelled()`` becomes true.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(file_path, "rb") as source:
+        while chunk := source.read(chunk_size):
+            if is_cancelled is not None and is_cancelled():
+                return None
+            digest.update(chunk)
+            size += len(chunk)
+            if on_progress is not None:
+                on_progress(size)
+    return digest.hexdigest(), size
+
+
+class BlobStore:
+    """Files stored once under the SHA-256 of their content.
+
+    Blobs are spread over nested directories named after the leading
+    characters of their hash, as set by ``fanout``. The store only deals with
+    files on disk; how many items point at a blob is tracked in the ``blobs``
+    table by the item model.
+    """
+
+    def __init__(self, root_path, fanout=FILES_STORAGE_FANOUT):
+        self._root_path = root_path
+        self._fanout = list(fanout)
+
+    def get_root_path(self):
+        return self._root_path
+
+    def shard_path(self, blob_hash):
+        """Path of a blob in the configured layout."""
+        parts = []
+        start = 0
+        for width in self._fanout:
+            parts.append(blob_hash[start:start + width])
+            start += width
+        return os.path.join(self._root_path, *parts, blob_hash)
+
+    def blob_path(self, blob_hash):
+        """Path of a blob as it is stored right now.
+
+        Blobs stored flat, from before the fan-out existed, are found in the
+        store root until ``migrate_layout`` moves them. After changing the
+        fan-out itself, migrate before starting the application.
+        """
+        path = self.shard_path(blob_hash)
+        if not os.path.exists(path):
+            flat_path = os.path.join(self._root_path, blob_hash)
+            if os.path.exists(flat_path):
+                return flat_path
+        return path
+
+    def exists(self, blob_hash):
+        return os.path.exists(self.blob_path(blob_hash))
+
+    def put_file(self, file_path, codec=None, on_progress=None, is_cancelled=None):
+        """Store ``file_path`` under the SHA-256 of its content.
+
+        The file is hashed first so content that is already stored is not
+        written at all. With ``codec`` the blob is compressed, unless that
+        does not pay off and it is stored raw. Returns a StoredBlob, or None
+        when ``is_cancelled()`` became true; nothing is left in the store then.
+        ``on_progress(done, total)`` counts the hashing and the write, so
+        ``total`` is twice the file size.
+        """
+        total = os.path.getsize(file_path) * 2
+        hashed = hash_file(
+            file_path,
+            on_progress=None if on_progress is None else lambda done: on_progress(done, total),
+            is_cancelled=is_cancelled,
+        )
+        if hashed is None:
+            return None
+        blob_hash, size = hashed
+        if self.exists(blob_hash):
+            if on_progress is not None:
+                on_progress(total, total)
+            return self.describe(blob_hash, size)
+
+        temp_path = os.path.join(self._root_path, f".upload-{uuid.uuid4()}")
+        write_progress = (
+            None if on_progress is None else lambda done, *_: on_progress(size + done, total)
+        )
+        try:
+            stored_size = None
+            if codec is not None:
+                stored_size = compress_file(
+                    file_path, temp_path, codec, write_progress, is_cancelled
+                )
+                if is_cancelled is not None and is_cancelled():
+                    return None
+            if stored_size is None or not pays_off(size, stored_size):
+                codec = None
+                stored_size = size
+                method = copy_file(file_path, temp_path, write_progress, is_cancelled)
+                if method is None:
+                    return None
+            else:
+                method = codec
+            logging.info(f"Stored blob '{blob_hash}' of {size} bytes using {method}")
+            created = self._commit(temp_path, blob_hash)
+            if not created:
+                # Stored meanwhile by another upload, maybe with another codec
+                return self.describe(blob_hash, size)
+            return StoredBlob(blob_hash, size, True, codec, stored_size)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def adopt_file(self, file_path):
+        """Add a file that already lives on the store's filesystem, uncompressed.
+
+        The file is hard linked into the store, or copied where links are not
+        supported, and left in place so the caller can remove it once the
+        database points at the blob. Returns a StoredBlob like ``put_file``.
+        """
+        blob_hash, size = hash_file(file_path)
+        if self.exists(blob_hash):
+            return self.describe(blob_hash, size)
+        try:
+            target_path = self.shard_path(blob_hash)
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            os.link(file_path, target_path)
+        except FileExistsError:
+            return self.describe(blob_hash, size)
+        except OSError:
+            return self.put_file(file_path)
+        return StoredBlob(blob_hash, size, True, None, size)
+
+    def describe(self, blob_hash, size):
+        """StoredBlob of content already in the store, with how it is stored.
+
+        Read from the blob file, as its row may not be committed yet or may be
+        gone after a crash: a raw blob is as large as the content, a smaller
+        one is compressed with the codec its header names.
+        """
+        blob_path = self.blob_path(blob_hash)
+        stored_size = os.path.getsize(blob_path)
+        if stored_size == size:
+            return StoredBlob(blob_hash, size, False, None, size)
+        with open(blob_path, "rb") as blob_file:
+            codec = detect_codec(blob_file.read(8))
+        if codec is None:
+            raise Exception(f"Error: blob '{blob_hash}' is neither raw nor in a known codec")
+        return StoredBlob(blob_hash, size, False, codec, stored_size)
+
+    def _commit(self, file_path, blob_hash):
+        """Move a written blob into place, False when it was stored meanwhile."""
+        if self.exists(blob_hash):
+            return False
+        target_path = self.shard_path(blob_hash)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(file_path, target_path)
+        return True
+
+    def put_bytes(self, blob_hash, data):
+        """Store ``data`` already hashed as ``blob_hash``, False when it was stored."""
+        if self.exists(blob_hash):
+            return False
+        os.makedirs(self._root_path, exist_ok=True)
+        temp_path = os.path.join(self._root_path, f".upload-{uuid.uuid4()}")
+        try:
+            with open(temp_path, "wb") as target:
+                target.write(data)
+            return self._commit(temp_path, blob_hash)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def remove(self, blob_hash):
+        try:
+            os.remove(self.blob_path(blob_hash))
+        except FileNotFoundError:
+            pass
+
+    def migrate_layout(self, batch_size=1000):
+        """Move blobs that are not where the current layout puts them.
+
+        Safe to run while the application is open: each move is an atomic
+        rename and ``blob_path`` finds blobs on either side of it. Nothing is
+        recorded between runs, a run interrupted by a crash simply finds the
+        blobs it had not moved yet. Returns the number of blobs moved.
+        """
+        moved = 0
+        pending = 0
+        visited = []
+        for directory, dirnames, filenames in os.walk(self._root_path):
+            # Only fan-out directories hold blobs, others such as chunks/ are separate stores
+            dirnames[:] = [name for name in dirnames if FANOUT_NAME_PATTERN.fullmatch(name)]
+            visited.append(directory)
+            for filename in filenames:
+                if not BLOB_NAME_PATTERN.fullmatch(filename):
+                    continue
+                current_path = os.path.join(directory, filename)
+                target_path = self.shard_path(filename)
+                if current_path == target_path:
+                    continue
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                try:
+                    os.replace(current_path, target_path)
+                except PermissionError:
+                    # Windows refuses to move a file that is open, the next run retries
+                    logging.warning(f"Blob '{filename}' is in use, not moved")
+                    continue
+                moved += 1
+                pending += 1
+                if pending == batch_size:
+                    logging.info(f"Moved {moved} blobs to the new layout")
+                    pending = 0
+        # Deepest first, so emptied parents can go too
+        for directory in reversed(visited[1:]):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+        logging.info(f"Moved {moved} blobs to the new layout")
+        return moved
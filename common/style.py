@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+from PyQt6.QtGui import QBrush, QColor, QFont, QIcon
+from PyQt6.QtWidgets import QFileIconProvider
+
+FONT_FAMILY = "Open Sans"
+
+# Freedesktop theme icons per category, QFileIconProvider is used where the
+# platform has no icon theme
+CATEGORY_THEME_ICONS = {
+    "Hình Ảnh": "image-x-generic",
+    "Tài liệu": "x-office-document",
+    "Phim Ảnh": "video-x-generic",
+    "Âm Thanh": "audio-x-generic",
+}
+
+
+@dataclass(frozen=True)
+class ItemStyle:
+    font: QFont
+    foreground: QBrush
+
+
+@lru_cache(maxsize=None)
+def get_style(size: int, bold: bool = False, color: tuple = (0, 0, 0)) -> ItemStyle:
+    """Shared font and brush for a (size, bold, color) combination."""
+    font = QFont(FONT_FAMILY, size)
+    font.setBold(bold)
+    return ItemStyle(font, QBrush(QColor(*color)))
+
+
+@lru_cache(maxsize=None)
+def _icon_provider():
+    return QFileIconProvider()
+
+
+@lru_cache(maxsize=None)
+def get_icon(category: str) -> QIcon:
+    """Shared icon for a category returned by ``get_item_category``."""
+    if category == "Thư mục":
+        return _icon_provider().icon(QFileIconProvider.IconType.Folder)
+    fallback = _icon_provider().icon(QFileIconProvider.IconType.File)
+    theme_name = CATEGORY_THEME_ICONS.get(category)
+    if theme_name is None:
+        return fallback
+    return QIcon.fromTheme(theme_name, fallback)
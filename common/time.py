@@ -1,12 +1,98 @@
 import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 import pytz
 
+DISPLAY_FORMAT = "%Y-%m-%d %H:%M:%S"
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
 
-def convert_utc_time_to_timezone(timestamp_utc, zone="Asia/Bangkok"):
-    timezone = pytz.timezone(zone)
-    return (
-        datetime.datetime.fromisoformat(timestamp_utc)
-        .replace(tzinfo=pytz.utc)
+
+@lru_cache(maxsize=None)
+def get_timezone(zone="Asia/Bangkok"):
+    """Return a cached tzinfo for ``zone``.
+
+    Zones without daylight saving time, such as Asia/Bangkok, are turned into
+    a fixed offset, which converts much faster than a zone database lookup.
+    """
+    try:
+        timezone = ZoneInfo(zone)
+    except ZoneInfoNotFoundError:
+        # Windows has no system zone database unless tzdata is installed
+        timezone = pytz.timezone(zone)
+
+    year = datetime.datetime.now(datetime.timezone.utc).year
+    offsets = {
+        datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc)
         .astimezone(timezone)
+        .utcoffset()
+        for month in (1, 7)
+    }
+    if len(offsets) == 1:
+        return datetime.timezone(offsets.pop(), zone)
+    return timezone
+
+
+def parse_utc_timestamp(timestamp_utc):
+    """Parse a UTC timestamp stored as epoch seconds or as current_timestamp text."""
+    if isinstance(timestamp_utc, int):
+        return EPOCH + datetime.timedelta(seconds=timestamp_utc)
+    if (
+        len(timestamp_utc) == 19
+        and timestamp_utc[4] == "-"
+        and timestamp_utc[10] == " "
+    ):
+        # Fast path for "YYYY-MM-DD HH:MM:SS"
+        return datetime.datetime(
+            int(timestamp_utc[0:4]),
+            int(timestamp_utc[5:7]),
+            int(timestamp_utc[8:10]),
+            int(timestamp_utc[11:13]),
+            int(timestamp_utc[14:16]),
+            int(timestamp_utc[17:19]),
+            tzinfo=datetime.timezone.utc,
+        )
+    return datetime.datetime.fromisoformat(timestamp_utc).replace(
+        tzinfo=datetime.timezone.utc
     )
+
+
+def convert_utc_time_to_timezone(timestamp_utc, zone="Asia/Bangkok"):
+    return parse_utc_timestamp(timestamp_utc).astimezone(get_timezone(zone))
+
+
+def format_utc_timestamp(timestamp_utc, zone="Asia/Bangkok", fmt=DISPLAY_FORMAT):
+    return format_utc_timestamps([timestamp_utc], zone, fmt)[0]
+
+
+def format_utc_timestamps(timestamps_utc, zone="Asia/Bangkok", fmt=DISPLAY_FORMAT):
+    """Convert and format a batch of UTC timestamps in one call.
+
+    Repeated values are formatted once, and with a fixed offset zone and the
+    default format the conversion is plain datetime arithmetic. ``None``
+    becomes an empty string.
+    """
+    timezone = get_timezone(zone)
+    offset = None
+    if isinstance(timezone, datetime.timezone) and fmt == DISPLAY_FORMAT:
+        offset = timezone.utcoffset(None)
+
+    formatted: dict[int | str, str] = {}
+    results = []
+    for timestamp_utc in timestamps_utc:
+        if timestamp_utc is None:
+            results.append("")
+            continue
+        value = formatted.get(timestamp_utc)
+        if value is None:
+            moment = parse_utc_timestamp(timestamp_utc)
+            if offset is not None:
+                # isoformat of a naive datetime without microseconds is DISPLAY_FORMAT
+                value = (
+                    (moment + offset).replace(tzinfo=None, microsecond=0).isoformat(" ")
+                )
+            else:
+                value = moment.astimezone(timezone).strftime(fmt)
+            formatted[timestamp_utc] = value
+        results.append(value)
+    return results
@@ -0,0 +1,23 @@
+import threading
+
+from PyQt6.QtCore import QRunnable
+
+
+class CancellableRunnable(QRunnable):
+    """QRunnable that can be asked to stop between units of work.
+
+    The thread pool deletes the runnable once ``run`` returns, so callers keep
+    ``cancel_event`` rather than the runnable itself when they need to cancel
+    it later. Results go back to the GUI thread through a QObject holding the
+    signals, created in the GUI thread together with the runnable.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
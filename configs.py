@@ -14,8 +14,42 @@ else:
 
 
 FILES_ROOT_PATH = os.path.join(APP_PATH, "files_storage")
+# Hex characters of the blob hash used for each directory level, [2, 2] stores
+# a blob at files_storage/ab/cd/abcd...; run "migrate_storage.py layout" after changing it
+FILES_STORAGE_FANOUT = [2, 2]
+# Codec per category of get_file_type, other categories are stored as they are.
+# zstd needs the zstandard package and falls back to zlib without it
+COMPRESSION_POLICY = {"Tài liệu": "zstd", "Tệp": "zlib"}
+# A compressed blob must be this much smaller than the file, else the file is stored raw
+COMPRESSION_MIN_SAVING = 0.1
+# Store uploads as content-defined chunks shared between files, so an edited
+# file only adds the chunks around the edit and interrupted uploads resume
+CHUNKED_STORAGE = False
+# Minimum, average and maximum chunk size in bytes
+CHUNK_SIZES = [64 * 1024, 256 * 1024, 1024 * 1024]
+# Thumbnails of image items, generated on first display. The directory is a
+# cache: anything in it can be deleted and is generated again
+THUMBNAIL_PATH = os.path.join(APP_PATH, "thumbnails")
+THUMBNAIL_SIZE = 128
+THUMBNAIL_CACHE_BYTES = 256 * 1024 * 1024
+# Thumbnails kept decoded in memory
+THUMBNAIL_MEMORY_COUNT = 500
 
 DATABASE_NAME = "app_quan_ly_pyqt6.db"
+# Audit log events waiting for the writer thread; writers wait when it is full
+LOG_QUEUE_SIZE = 10000
+# Most log rows inserted in one transaction
+LOG_BATCH_SIZE = 500
+# Log search ranks only this many of the most recent matches
+LOG_SEARCH_WINDOW = 1000
+# Logs older than this many days are moved at startup into one archive
+# database per month in LOG_ARCHIVE_PATH; None keeps them in the main database
+LOG_RETENTION_DAYS = 180
+# Logs and archives older than this many days are deleted; None keeps them forever
+LOG_PURGE_DAYS = 5 * 365
+# Log rows moved or deleted in one transaction
+LOG_ARCHIVE_BATCH_SIZE = 1000
+LOG_ARCHIVE_PATH = os.path.join(APP_PATH, "log_archive")
 LOG_PATH = Path(__file__).parent / "logs"
 LOGIN_UI_PATH = Path(__file__).parent / "ui/login.ui"
 DASHBOARD_UI_PATH = Path(__file__).parent / "ui/admin_dashboard.ui"
@@ -25,10 +59,13 @@ PERMISSION_PATH = Path(__file__).parent / "ui/permission_dialog.ui"
 PROFILE_PATH = Path(__file__).parent / "ui/profile.ui"
 ITEM_PERMISSION_PATH = Path(__file__).parent / "ui/item_permission.ui"
 FILE_TREE_VIEW_COLUMNS = ["Tên", "Loại", "Ngày Tạo", "Người Tạo"]
+LOG_TABLE_COLUMNS = ["Họ Tên", "Thông Tin", "Thời Gian"]
 TIMEZONE = "Asia/Bangkok"
 
 os.makedirs(LOG_PATH, exist_ok=True)
 os.makedirs(FILES_ROOT_PATH, exist_ok=True)
+os.makedirs(THUMBNAIL_PATH, exist_ok=True)
+os.makedirs(LOG_ARCHIVE_PATH, exist_ok=True)
 
 
 def setup_logging():
@@ -24,11 +24,15 @@ FOLDER_CREATE_ERROR = "Thư mục không thể tạo"
 FOLDER_CREATE_SUCCESS = "Thư mục tạo thành công"
 FOLDER_REMOVE_ERROR = "Thư mục không thể xóa"
 FOLDER_REMOVE_SUCCESS = "Thư mục xóa thành công"
+IMPORT_DIRECTORY_SUCCESS = "Nhập thư mục thành công"
+IMPORT_DIRECTORY_ERROR = "Nhập thư mục thất bại"
 
 CREATE_PROFILE_ERROR = "Tạo hồ sơ cá nhân thát bại"
 PROFILE_CREATE_SUCCESS = "Tạo hồ sơ cá nhân thành công"
 PROFILE_UPDATE_SUCCESS = "Cập nhật hồ sơ thành công"
 DB_ERROR = "Lỗi trên cơ sở dữ liệu"
+LOG_LOAD_ERROR = "Không thể tải nhật ký"
+LOG_SEARCH_LIMITED = "Chỉ hiển thị {count} kết quả mới nhất, các kết quả cũ hơn bị bỏ qua. Hãy thu hẹp tìm kiếm."
 CREATE_OR_UPDATE_PROFILE_ERROR = "Tạo hoặc cập nhật có vấn đề"
 
 
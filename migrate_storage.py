@@ -0,0 +1,162 @@
+import argparse
+import os
+import sqlite3
+import time
+
+from common.storage import BlobStore
+from configs import (
+    DATABASE_NAME,
+    FILES_ROOT_PATH,
+    LOG_ARCHIVE_BATCH_SIZE,
+    LOG_PATH,
+    LOG_PURGE_DAYS,
+    LOG_RETENTION_DAYS,
+)
+from models.chunk_store import ChunkStore
+from models.item import ItemModel
+from models.log_archive import LogArchiver
+from models.scrubber import StorageScrubber
+
+
+def migrate_blobs(args):
+    item_model = ItemModel()
+    try:
+        migrated = item_model.migrate_to_blob_store(args.batch_size)
+        print(f"Migrated {migrated} files to the blob store")
+    finally:
+        item_model.close_connection()
+
+
+def migrate_layout(args):
+    moved = BlobStore(FILES_ROOT_PATH).migrate_layout(args.batch_size)
+    print(f"Moved {moved} blobs to the configured layout")
+    moved = ChunkStore(DATABASE_NAME, FILES_ROOT_PATH).migrate_layout(args.batch_size)
+    print(f"Moved {moved} chunks to the configured layout")
+
+
+def compression_report(args):
+    item_model = ItemModel()
+    try:
+        report = item_model.get_compression_report()
+    finally:
+        item_model.close_connection()
+    print(f"{'Loại':<12}{'Blobs':>8}{'Size':>16}{'Stored':>16}{'Saved':>16}")
+    for row in report:
+        print(
+            f"{row.category:<12}{row.blobs:>8}{row.size:>16}{row.stored_size:>16}{row.saved:>16}"
+        )
+
+
+def scrub(args):
+    if hasattr(os, "nice"):
+        # Leave the CPU to the application and other users
+        os.nice(19)
+    scrubber = StorageScrubber(
+        rate=args.rate * 1024 * 1024 if args.rate else None, batch_size=args.batch_size
+    )
+    report_path = args.report or os.path.join(
+        LOG_PATH, f"scrub_{time.strftime('%Y-%m-%d_%H%M%S')}.json"
+    )
+    try:
+        report = scrubber.run()
+    except KeyboardInterrupt:
+        report = scrubber.report
+        report.interrupted = True
+        report.finished_at = int(time.time())
+    report.write(report_path)
+    metrics = report.to_dict()
+    print(
+        f"Checked {report.blobs_checked} blobs, {report.chunks_checked} chunks, "
+        f"{report.legacy_files_checked} legacy files; read {report.bytes_read} bytes "
+        f"in {metrics['seconds']}s ({metrics['bytes_per_second']} B/s)"
+    )
+    print(
+        f"Missing: {len(report.missing)}, corrupt: {len(report.corrupt)}, "
+        f"orphans: {len(report.orphans)}, mismatches: {len(report.mismatches)}"
+        + (", interrupted" if report.interrupted else "")
+    )
+    print(f"Report written to {report_path}")
+
+
+def archive_logs(args):
+    archiver = LogArchiver(
+        retention_days=args.retention_days,
+        purge_days=args.purge_days,
+        batch_size=args.batch_size,
+    )
+    report = archiver.run()
+    for name, count in sorted(report.archived.items()):
+        print(f"Archived {count} logs to {name}")
+    print(f"Purged {report.purged} logs, removed {len(report.removed_files)} archive files")
+    if args.vacuum:
+        # Gives the freed pages back to the disk, the database is locked meanwhile
+        connection = sqlite3.connect(DATABASE_NAME)
+        try:
+            connection.execute("VACUUM")
+        finally:
+            connection.close()
+        print(f"Vacuumed {DATABASE_NAME}")
+
+
+def optional_days(value):
+    return None if value.lower() == "none" else int(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain files_storage and the audit log")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    blobs = commands.add_parser(
+        "blobs", help="Move files named after their item code into the blob store"
+    )
+    blobs.add_argument("--batch-size", type=int, default=100)
+    blobs.set_defaults(func=migrate_blobs)
+
+    layout = commands.add_parser(
+        "layout",
+        help="Move blobs into the directory layout set by FILES_STORAGE_FANOUT, "
+        "safe to rerun after an interruption",
+    )
+    layout.add_argument("--batch-size", type=int, default=1000)
+    layout.set_defaults(func=migrate_layout)
+
+    report = commands.add_parser(
+        "compression-report", help="Show the bytes compression saves per file category"
+    )
+    report.set_defaults(func=compression_report)
+
+    scrubber = commands.add_parser(
+        "scrub",
+        help="Verify every blob and chunk against its checksum and reconcile "
+        "files_storage with the database, without repairing anything",
+    )
+    scrubber.add_argument(
+        "--rate", type=float, default=50, help="MB read per second, 0 for no limit"
+    )
+    scrubber.add_argument("--batch-size", type=int, default=500)
+    scrubber.add_argument("--report", help="Path of the JSON report, logs/scrub_<time>.json by default")
+    scrubber.set_defaults(func=scrub)
+
+    archive = commands.add_parser(
+        "archive-logs",
+        help="Move old audit logs into monthly archive databases and delete the expired ones, "
+        "safe to rerun after an interruption",
+    )
+    archive.add_argument(
+        "--retention-days", type=optional_days, default=LOG_RETENTION_DAYS,
+        help="Age in days of the logs moved out of the main database, none to keep them",
+    )
+    archive.add_argument(
+        "--purge-days", type=optional_days, default=LOG_PURGE_DAYS,
+        help="Age in days of the logs and archives deleted, none to keep them forever",
+    )
+    archive.add_argument("--batch-size", type=int, default=LOG_ARCHIVE_BATCH_SIZE)
+    archive.add_argument("--vacuum", action="store_true", help="VACUUM the main database afterwards")
+    archive.set_defaults(func=archive_logs)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
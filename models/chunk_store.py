@@ -0,0 +1,165 @@
+import hashlib
+import logging
+import os
+import sqlite3
+
+from common.chunking import ContentDefinedChunker
+from common.storage import CHUNK_SIZE, BlobStore, StoredBlob
+from configs import CHUNK_SIZES
+from sql_statements.blob import FETCH_BLOB_STORAGE_SQL
+from sql_statements.chunk import (
+    CHUNKED_CODEC,
+    FETCH_UPLOAD_SESSION_SQL,
+    INSERT_UPLOAD_SESSION_SQL,
+    DELETE_STALE_UPLOAD_SESSION_CHUNKS_SQL,
+    DELETE_STALE_UPLOAD_SESSIONS_SQL,
+    FETCH_UPLOAD_SESSION_PROGRESS_SQL,
+    INSERT_CHUNK_SQL,
+    INSERT_UPLOAD_SESSION_CHUNK_SQL,
+    INSERT_BLOB_CHUNKS_SQL,
+    INSERT_CHUNKED_BLOB_SQL,
+    REFERENCE_BLOB_CHUNKS_SQL,
+    DELETE_UPLOAD_SESSION_CHUNKS_SQL,
+    DELETE_ABANDONED_CHUNK_SQL,
+    FETCH_UPLOAD_SESSION_CHUNK_HASHES_SQL,
+    DELETE_UPLOAD_SESSION_SQL,
+)
+
+CHUNKS_DIRECTORY = "chunks"
+
+
+class ChunkStore:
+    """Stores files as content-defined chunks shared between all files.
+
+    Only chunks not stored yet are written, so a re-uploaded file with a small
+    edit costs the few chunks around the edit. Each chunk is committed to an
+    upload session as it is written: an upload that was cancelled or crashed
+    restarts from the last committed chunk when the same, unchanged file is
+    uploaded again.
+
+    ``put_file`` runs on pool threads and opens its own connection, like
+    ``BlobStore.put_file`` it returns a StoredBlob. The blob row it inserts
+    is unreferenced until an item takes it.
+    """
+
+    def __init__(self, database_name, root_path, chunk_sizes=CHUNK_SIZES):
+        self._database_name = database_name
+        self._blobs = BlobStore(root_path)
+        self._chunks = BlobStore(os.path.join(root_path, CHUNKS_DIRECTORY))
+        self._chunker = ContentDefinedChunker(*chunk_sizes)
+
+    def chunk_path(self, chunk_hash):
+        return self._chunks.blob_path(chunk_hash)
+
+    def remove_chunk(self, chunk_hash):
+        self._chunks.remove(chunk_hash)
+
+    def migrate_layout(self, batch_size=1000):
+        return self._chunks.migrate_layout(batch_size)
+
+    def put_file(self, file_path, codec=None, on_progress=None, is_cancelled=None):
+        """Store ``file_path`` as chunks, ``codec`` is not applied to chunks."""
+        stat = os.stat(file_path)
+        size = stat.st_size
+        connection = sqlite3.connect(self._database_name, timeout=30)
+        try:
+            session_id, seq, offset = self._open_session(connection, file_path, stat)
+            if offset:
+                logging.info(f"Resuming upload of '{file_path}' at chunk {seq}, byte {offset}")
+
+            digest = hashlib.sha256()
+            written = 0
+            with open(file_path, "rb") as source:
+                # Committed chunks are only read again for the hash of the whole file
+                while source.tell() < offset:
+                    data = source.read(min(CHUNK_SIZE, offset - source.tell()))
+                    if not data:
+                        break
+                    digest.update(data)
+
+                for chunk in self._chunker.iter_chunks(source):
+                    if is_cancelled is not None and is_cancelled():
+                        # The session stays so the next upload resumes from here
+                        return None
+                    chunk_hash = hashlib.sha256(chunk).hexdigest()
+                    digest.update(chunk)
+                    connection.execute(INSERT_CHUNK_SQL, (chunk_hash, len(chunk)))
+                    connection.execute(
+                        INSERT_UPLOAD_SESSION_CHUNK_SQL, (session_id, seq, chunk_hash, len(chunk))
+                    )
+                    if self._chunks.put_bytes(chunk_hash, chunk):
+                        written += len(chunk)
+                    connection.commit()
+                    seq += 1
+                    offset += len(chunk)
+                    if on_progress is not None:
+                        on_progress(offset, size)
+
+            blob_hash = digest.hexdigest()
+            created = self._finish_session(connection, session_id, blob_hash, size, written)
+            logging.info(
+                f"Stored blob '{blob_hash}' of {size} bytes as {seq} chunks, {written} bytes new"
+            )
+            if not created:
+                return self._describe(connection, blob_hash, size)
+            return StoredBlob(blob_hash, size, True, CHUNKED_CODEC, written)
+        except sqlite3.Error as error:
+            connection.rollback()
+            raise Exception(f"Error: chunked upload of '{file_path}' failed: {error}")
+        finally:
+            connection.close()
+
+    def _open_session(self, connection, file_path, stat):
+        """Return the session id, next chunk number and byte offset to resume at."""
+        source_path = os.path.abspath(file_path)
+        key = (source_path, stat.st_size, stat.st_mtime_ns)
+        row = connection.execute(FETCH_UPLOAD_SESSION_SQL, key).fetchone()
+        if row is None:
+            session_id = connection.execute(INSERT_UPLOAD_SESSION_SQL, key).lastrowid
+        else:
+            session_id = row[0]
+        connection.execute(DELETE_STALE_UPLOAD_SESSION_CHUNKS_SQL, (source_path, session_id))
+        connection.execute(DELETE_STALE_UPLOAD_SESSIONS_SQL, (source_path, session_id))
+        connection.commit()
+        seq, offset = connection.execute(
+            FETCH_UPLOAD_SESSION_PROGRESS_SQL, (session_id,)
+        ).fetchone()
+        return session_id, seq, offset
+
+    def _describe(self, connection, blob_hash, size):
+        """StoredBlob of content already stored, as its row records it."""
+        codec, stored_size = connection.execute(FETCH_BLOB_STORAGE_SQL, (blob_hash,)).fetchone()
+        if stored_size is None and codec != CHUNKED_CODEC:
+            # A row from before stored_size was recorded, the blob file tells
+            return self._blobs.describe(blob_hash, size)
+        return StoredBlob(blob_hash, size, False, codec, stored_size)
+
+    def _finish_session(self, connection, session_id, blob_hash, size, written):
+        """Turn the session into the blob's manifest, False when the blob exists."""
+        created = connection.execute(
+            INSERT_CHUNKED_BLOB_SQL, (blob_hash, size, CHUNKED_CODEC, written)
+        ).rowcount == 1
+        abandoned = []
+        if created:
+            connection.execute(INSERT_BLOB_CHUNKS_SQL, (blob_hash, session_id))
+            connection.execute(REFERENCE_BLOB_CHUNKS_SQL, (blob_hash,))
+        else:
+            abandoned = [
+                chunk_hash
+                for chunk_hash, in connection.execute(
+                    FETCH_UPLOAD_SESSION_CHUNK_HASHES_SQL, (session_id,)
+                )
+            ]
+        connection.execute(DELETE_UPLOAD_SESSION_CHUNKS_SQL, (session_id,))
+        connection.execute(DELETE_UPLOAD_SESSION_SQL, (session_id,))
+        # Chunks this upload wrote that no blob took, such as when the
+        # content is stored raw, would stay until the scrubber finds them
+        released = [
+            chunk_hash
+            for chunk_hash in abandoned
+            if connection.execute(DELETE_ABANDONED_CHUNK_SQL, {"hash": chunk_hash}).rowcount
+        ]
+        connection.commit()
+        for chunk_hash in released:
+            self._chunks.remove(chunk_hash)
+        return created
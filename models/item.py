@@ -1,27 +1,69 @@
 import logging
 import os.path
-import shutil
 import sqlite3
 import sys
+import tempfile
 import traceback
 import uuid
 from dataclasses import dataclass
 
-from PyQt6.QtGui import QStandardItemModel, QStandardItem, QColor, QFont, QIcon
-from PyQt6.QtWidgets import QApplication, QMainWindow, QTreeView, QFileIconProvider
+from PyQt6.QtCore import QThreadPool
+from PyQt6.QtWidgets import QApplication, QMainWindow, QTreeView
 
-from common import session
+from common.chunking import assemble_chunks
+from common.compression import decompress_file, get_codec
 from common.file import get_file_type
 from common.model import NativeSqlite3Model
-from common.time import convert_utc_time_to_timezone
-from configs import DATABASE_NAME, FILES_ROOT_PATH, FILE_TREE_VIEW_COLUMNS, TIMEZONE
-from messages.permissions import FILE_VIEW, FOLDER_VIEW
+from common.storage import BlobStore
+from configs import CHUNKED_STORAGE, DATABASE_NAME, FILES_ROOT_PATH
+from models.chunk_store import ChunkStore
+from models.item_export import FileExporter
+from models.item_import import DirectoryImporter
+from models.item_tree import ItemTreeModel
+from models.item_upload import UploadManager
+from sql_statements.blob import (
+    CREATE_BLOB_TABLE_SQL,
+    ADD_ITEM_BLOB_HASH_COLUMN_SQL,
+    REFERENCE_BLOB_SQL,
+    RELEASE_BLOB_SQL,
+    DELETE_UNREFERENCED_BLOB_SQL,
+    BLOB_REFERENCED_SQL,
+    ADD_BLOB_COMPRESSION_COLUMNS_SQL,
+    FETCH_BLOB_CODEC_SQL,
+    COMPRESSION_REPORT_SQL,
+    FETCH_UNMIGRATED_FILES_SQL,
+)
+from sql_statements.chunk import (
+    CHUNKED_CODEC,
+    CREATE_CHUNK_TABLE_SQL,
+    CREATE_BLOB_CHUNK_TABLE_SQL,
+    CREATE_UPLOAD_SESSION_TABLE_SQL,
+    CREATE_UPLOAD_SESSION_CHUNK_TABLE_SQL,
+    CREATE_UPLOAD_SESSION_CHUNK_INDEX_SQL,
+    RELEASE_BLOB_CHUNKS_SQL,
+    FETCH_UNREFERENCED_BLOB_CHUNKS_SQL,
+    DELETE_BLOB_CHUNKS_SQL,
+    DELETE_UNREFERENCED_CHUNK_SQL,
+    FETCH_BLOB_CHUNKS_SQL,
+)
 from sql_statements.item import (
     CREATE_ITEM_TABLE_SQL,
     CREATE_PERMISSION_USER_ITEM_TABLE_SQL,
+    CREATE_ITEM_PARENT_NAME_INDEX_SQL,
+    CREATE_ITEM_PARENT_CREATED_AT_INDEX_SQL,
+    CREATE_ITEM_CLOSURE_TABLE_SQL,
+    CREATE_ITEM_CLOSURE_DESCENDANT_INDEX_SQL,
+    BACKFILL_ITEM_CLOSURE_SQL,
+    INSERT_ITEM_CLOSURE_SQL,
+    DELETE_ITEM_CLOSURE_SQL,
+    FETCH_VISIBLE_CHILDREN_SQL,
+    DROP_ITEM_PARENT_INDEX_SQL,
+    DUPLICATE_SIBLING_NAMES_SQL,
     INIT_DATA,
 )
 
+ROOT_ITEM_ID = 0
+
 
 @dataclass
 class ItemDTO:
@@ -31,59 +73,81 @@ class ItemDTO:
     user_id: int
     type: str
     original_name: str
-    created_at: str
-    updated_at: str
-
-
-def build_tree(items: list[ItemDTO]):
-    item_dict = {item.id: item for item in items}
-    root_node = []
-    for item in items:
-        if item.parent_id == -1:
-            root_node = item
-        else:
-            parent = item_dict[item.parent_id]
-            if not hasattr(parent, "children"):
-                parent.children = []
-            parent.children.append(item)
-
-    return root_node
-
-
-class CustomItem(QStandardItem):
-    def __init__(
-        self, content, font_size=12, bold=False, color=QColor(0, 0, 0), *args, **kwargs
-    ):
-        super().__init__(*args, **kwargs)
+    created_at: int
+    updated_at: int
+    fullname: str = None
+    blob_hash: str = None
 
-        font = QFont("Open Sans", font_size)
-        font.setBold(bold)
 
-        self.setEditable(False)
-        self.setForeground(color)
-        self.setFont(font)
-        self.setText(content)
+@dataclass
+class CompressionReportRow:
+    category: str
+    blobs: int
+    size: int
+    stored_size: int
 
-    def set_custom_icon(self, icon):
-        self.setIcon(icon)
+    @property
+    def saved(self):
+        return self.size - self.stored_size
 
 
 class ItemModel(NativeSqlite3Model):
     _junction_table_sql = CREATE_PERMISSION_USER_ITEM_TABLE_SQL
+    _index_sql = CREATE_ITEM_PARENT_NAME_INDEX_SQL
     _init_data_sql = INIT_DATA
     _root_path = FILES_ROOT_PATH
     _fetch_sql = """
-    SELECT i.id, i.code, i.parent_id, i.user_id, i.type, i.original_name, i.created_at, i.updated_at FROM items AS i
+    SELECT i.id, i.code, i.parent_id, i.user_id, i.type, i.original_name, i.created_at, i.updated_at, p.fullname, i.blob_hash
+    FROM items AS i
+    LEFT JOIN profiles AS p ON p.user_id = i.user_id
+"""
+    _fetch_children_sql = (
+        _fetch_sql + "WHERE i.parent_id = ? ORDER BY {order_by} LIMIT ? OFFSET ?"
+    )
+    _fetch_item_sql = _fetch_sql + "WHERE i.id = ?"
+    _fetch_child_sql = _fetch_sql + "WHERE i.parent_id = ? AND i.original_name = ?"
+    _fetch_ancestors_sql = """
+    SELECT i.id, i.code, i.parent_id, i.user_id, i.type, i.original_name, i.created_at, i.updated_at, p.fullname, i.blob_hash
+    FROM item_closure AS c
+    JOIN items AS i ON i.id = c.ancestor
+    LEFT JOIN profiles AS p ON p.user_id = i.user_id
+    WHERE c.descendant = ? AND c.depth > 0
+    ORDER BY c.depth DESC
+"""
+    _fetch_descendants_sql = """
+    SELECT i.id, i.code, i.parent_id, i.user_id, i.type, i.original_name, i.created_at, i.updated_at, p.fullname, i.blob_hash
+    FROM item_closure AS c
+    JOIN items AS i ON i.id = c.descendant
+    LEFT JOIN profiles AS p ON p.user_id = i.user_id
+    WHERE c.ancestor = ? AND c.depth BETWEEN 1 AND ?
+    ORDER BY c.depth, i.id
 """
 
     def __init__(
-        self, database_name=DATABASE_NAME, table_create_sql=CREATE_ITEM_TABLE_SQL
+        self,
+        database_name=DATABASE_NAME,
+        table_create_sql=CREATE_ITEM_TABLE_SQL,
+        root_path=FILES_ROOT_PATH,
+        chunked_storage=CHUNKED_STORAGE,
     ):
         super().__init__(database_name, table_create_sql)
+        self._root_path = root_path
+        self._blob_store = BlobStore(root_path)
+        self._chunk_store = ChunkStore(database_name, root_path)
+        # New uploads go here, blobs stored either way stay readable
+        self._upload_store = self._chunk_store if chunked_storage else self._blob_store
+        self._migrate_timestamps("items")
+        self._init_blob_table()
         self._init_junction_table()
+        self._init_indexes()
         self._init_data()
-        self.model = QStandardItemModel(0, len(FILE_TREE_VIEW_COLUMNS))
-        self.model.setHorizontalHeaderLabels(FILE_TREE_VIEW_COLUMNS)
+        self._init_closure_table()
+        self.model = ItemTreeModel(self)
+        # File copies to and from the store, kept off the GUI thread
+        self._transfer_pool = QThreadPool()
+        self._transfer_pool.setMaxThreadCount(min(4, os.cpu_count() or 1))
+        # cancel event -> signals of each transfer in flight, kept alive until it is done
+        self._transfers = {}
 
     def _init_junction_table(self):
         cur = self.connection.cursor()
@@ -95,6 +159,84 @@ class ItemModel(NativeSqlite3Model):
         finally:
             cur.close()
 
+    def _init_blob_table(self):
+        cur = self.connection.cursor()
+        try:
+            cur.execute(CREATE_BLOB_TABLE_SQL)
+            cur.execute("PRAGMA table_info(blobs)")
+            if "codec" not in [row[1] for row in cur.fetchall()]:
+                for sql in ADD_BLOB_COMPRESSION_COLUMNS_SQL:
+                    cur.execute(sql)
+            cur.execute("PRAGMA table_info(items)")
+            if "blob_hash" not in [row[1] for row in cur.fetchall()]:
+                cur.execute(ADD_ITEM_BLOB_HASH_COLUMN_SQL)
+            cur.execute(CREATE_CHUNK_TABLE_SQL)
+            cur.execute(CREATE_BLOB_CHUNK_TABLE_SQL)
+            cur.execute(CREATE_UPLOAD_SESSION_TABLE_SQL)
+            cur.execute(CREATE_UPLOAD_SESSION_CHUNK_TABLE_SQL)
+            cur.execute(CREATE_UPLOAD_SESSION_CHUNK_INDEX_SQL)
+            self.connection.commit()
+        except sqlite3.Error as error:
+            raise Exception(f"Failed to create blob table: {error}")
+        finally:
+            cur.close()
+
+    def _init_indexes(self):
+        cur = self.connection.cursor()
+        try:
+            self._rename_duplicate_siblings(cur)
+            cur.execute(self._index_sql)
+            # Sorting a folder by "Ngày Tạo"
+            cur.execute(CREATE_ITEM_PARENT_CREATED_AT_INDEX_SQL)
+            # The unique index starts with parent_id, so it serves children queries too
+            cur.execute(DROP_ITEM_PARENT_INDEX_SQL)
+            self.connection.commit()
+        except sqlite3.Error as error:
+            raise Exception(f"Failed to create item indexes: {error}")
+        finally:
+            cur.close()
+
+    def _rename_duplicate_siblings(self, cur):
+        """Give items that share a name inside one folder distinct names.
+
+        Older databases allowed this, and the unique index cannot be built
+        until it is resolved. The oldest item keeps its name.
+        """
+        cur.execute(DUPLICATE_SIBLING_NAMES_SQL)
+        seen = set()
+        for item_id, parent_id, original_name in cur.fetchall():
+            if (parent_id, original_name) not in seen:
+                seen.add((parent_id, original_name))
+                continue
+            stem, extension = os.path.splitext(original_name)
+            new_name = f"{stem} ({item_id}){extension}"
+            cur.execute(
+                "UPDATE items SET original_name = ? WHERE id = ?", (new_name, item_id)
+            )
+            logging.warning(
+                f"Renamed duplicate item '{original_name}' with id '{item_id}' to '{new_name}'"
+            )
+
+    def _init_closure_table(self):
+        """Create the ancestor/descendant table, backfilling it on first run."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'item_closure'"
+            )
+            exists = cur.fetchone() is not None
+            cur.execute(CREATE_ITEM_CLOSURE_TABLE_SQL)
+            cur.execute(CREATE_ITEM_CLOSURE_DESCENDANT_INDEX_SQL)
+            if not exists:
+                cur.execute(BACKFILL_ITEM_CLOSURE_SQL)
+                logging.info(f"Backfilled item closure with {cur.rowcount} rows")
+            self.connection.commit()
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            raise Exception(f"Failed to create item closure table: {error}")
+        finally:
+            cur.close()
+
     def _init_data(self):
         cur = self.connection.cursor()
         try:
@@ -109,124 +251,221 @@ class ItemModel(NativeSqlite3Model):
         """Returns the file system model."""
         return self.model
 
-    def get_root_node(self):
-        return self.model.invisibleRootItem()
-
-    def populate_data(self):
-        items = self.fetch_data()
-        root_item_data = build_tree(items)
-        font_size = 14
-
-        # Initialize QFileIconProvider
-        icon_provider = QFileIconProvider()
-
-        # Get the root folder icon
-        root_icon = icon_provider.icon(QFileIconProvider.IconType.Folder)
-        root_node = CustomItem(root_item_data.original_name, font_size, True)
-        root_node.set_custom_icon(root_icon)
-
-        def traverse(parent_node: CustomItem, parent_data: ItemDTO, f_size):
-            for index, child in enumerate(getattr(parent_data, "children", [])):
-                try:
-                    permission = FOLDER_VIEW if child.type == "folder" else FILE_VIEW
-                    if (
-                        child.original_name != "root"
-                        and not session.SESSION.match_permissions(permission)
-                        and not session.SESSION.match_item_permissions(
-                            child.original_name, permission
-                        )
-                    ):
-                        continue
-
-                    icon = icon_provider.icon(
-                        QFileIconProvider.IconType.Folder
-                        if child.type == "folder"
-                        else QFileIconProvider.IconType.File
-                    )
-                    item = CustomItem(
-                        child.original_name, f_size - 1, child.type == "folder"
-                    )
-                    item.set_custom_icon(icon)
-                    item_type = CustomItem(
-                        get_file_type(child.original_name),
-                        f_size - 1,
-                        child.type == "folder",
-                    )
-                    created_at = convert_utc_time_to_timezone(
-                        child.created_at, TIMEZONE
-                    ).strftime("%Y-%m-%d %H:%M:%S")
-                    item_created_at = CustomItem(
-                        created_at, f_size - 1, child.type == "folder"
-                    )
-                    cur = self.connection.cursor()
-                    cur.execute(
-                        "SELECT fullname FROM profiles WHERE user_id = ?",
-                        (child.user_id,),
-                    )
-                    fullname = cur.fetchone()[0]
-                    item_created_by = CustomItem(
-                        fullname, f_size - 1, child.type == "folder"
-                    )
-                    parent_node.setChild(index, 0, item)
-                    parent_node.setChild(index, 1, item_type)
-                    parent_node.setChild(index, 2, item_created_at)
-                    parent_node.setChild(index, 3, item_created_by)
-                    traverse(item, child, f_size - 1)
-                except:
-                    logging.error(traceback.print_exc())
-
-        traverse(root_node, root_item_data, font_size)
-        self.get_root_node().appendRow(root_node)
-
     def refresh_model(self):
-        self.model = QStandardItemModel(0, len(FILE_TREE_VIEW_COLUMNS))
-        self.model.setHorizontalHeaderLabels(FILE_TREE_VIEW_COLUMNS)
-        self.populate_data()
+        self.model.reload()
         return self.model
 
+    def close_connection(self):
+        self.model.shutdown()
+        for cancel_event in self._transfers:
+            cancel_event.set()
+        self._transfer_pool.waitForDone()
+        super().close_connection()
+
     def get_root_path(self):
         return self._root_path
 
-    def create_file(
-        self, username: str, file_path: str, parent_original_name: str = None
-    ):
-        cur = self.connection.cursor()
+    def get_blob_store(self):
+        return self._blob_store
+
+    def get_chunk_store(self):
+        return self._chunk_store
+
+    def get_upload_store(self):
+        """The store new uploads are written to, see CHUNKED_STORAGE."""
+        return self._upload_store
+
+    def get_file_path(self, item: ItemDTO) -> str:
+        """Where the content of a file item is stored.
+
+        Files uploaded before the blob store are still named after their code.
+        """
+        if item.blob_hash is not None:
+            return self._blob_store.blob_path(item.blob_hash)
+        return os.path.join(self._root_path, item.code)
+
+    def _get_user_id(self, cur, username):
         cur.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_id = cur.fetchone()[0]
+        return cur.fetchone()[0]
+
+    def _get_folder(self, folder_id):
+        folder = self.get_item(folder_id)
+        if folder is None:
+            raise Exception(f"Error: folder with id '{folder_id}' not found")
+        if folder.type != "folder":
+            raise Exception(f"Error: item with id '{folder_id}' is not a folder")
+        return folder
+
+    def _insert_item(
+        self, cur, code, item_type, original_name, parent_id, user_id, blob_hash=None
+    ):
+        """Insert an item and its closure rows, returning the new id or None."""
+        try:
+            cur.execute(
+                "insert into items (code, type, original_name, parent_id, user_id, blob_hash) values (?, ?, ?, ?, ?, ?)",
+                (code, item_type, original_name, parent_id, user_id, blob_hash),
+            )
+        except sqlite3.IntegrityError:
+            self.connection.rollback()
+            cur.close()
+            raise Exception(f"Error: '{original_name}' already exists in this folder")
+        if cur.rowcount == 0:
+            return None
+        item_id = cur.lastrowid
         cur.execute(
-            "SELECT id FROM items WHERE original_name = ?", (parent_original_name,)
+            INSERT_ITEM_CLOSURE_SQL, {"item_id": item_id, "parent_id": parent_id}
         )
-        result = cur.fetchone()
-        if result:
-            parent_id = result[0]
-        else:
-            parent_id = 0
+        return item_id
+
+    def create_file(self, username: str, file_path: str, parent_id: int = ROOT_ITEM_ID):
+        self._get_folder(parent_id)
         original_name = os.path.basename(file_path)
-        code = str(uuid.uuid4())
-        cur.execute(
-            "insert into items (code, type, original_name, parent_id, user_id) values (?, ?, ?, ?, ?)",
-            (code, "file", original_name, parent_id, user_id),
+        if self.get_child(parent_id, original_name) is not None:
+            raise Exception(f"Error: '{original_name}' already exists in this folder")
+
+        stored = self._upload_store.put_file(file_path, get_codec(original_name))
+        try:
+            item = self.create_files(username, [(original_name, stored)], parent_id)[0]
+        except Exception:
+            if stored.created:
+                self.discard_blob(stored.blob_hash)
+            raise
+        logging.info(
+            f"Create file name '{original_name}' successfully"
+            + ("" if stored.created else f", content shared with blob '{stored.blob_hash}'")
         )
-        if cur.rowcount > 0:
+        return item
+
+    def upload_files(
+        self, username: str, file_paths, parent_id: int = ROOT_ITEM_ID
+    ) -> UploadManager:
+        """Prepare uploading ``file_paths`` into a folder in the background.
+
+        Connect to the returned manager's signals, then call its ``start``.
+        """
+        self._get_folder(parent_id)
+        return UploadManager(self, username, file_paths, parent_id)
+
+    def import_directory(
+        self, username: str, directory: str, parent_id: int = ROOT_ITEM_ID
+    ) -> DirectoryImporter:
+        """Prepare importing a local directory tree into a folder in the background.
+
+        Connect to the returned importer's signals, then call its ``start``.
+        """
+        self._get_folder(parent_id)
+        original_name = os.path.basename(os.path.normpath(directory))
+        if self.get_child(parent_id, original_name) is not None:
+            raise Exception(f"Error: '{original_name}' already exists in this folder")
+        return DirectoryImporter(self, username, directory, parent_id)
+
+    def get_transfer_thread_count(self):
+        return self._transfer_pool.maxThreadCount()
+
+    def create_files(
+        self, username: str, stored_files, parent_id: int = ROOT_ITEM_ID
+    ) -> list[ItemDTO]:
+        """Insert file items for blobs already in the store, in one transaction.
+
+        ``stored_files`` holds ``(original_name, StoredBlob)`` tuples.
+        Nothing is inserted when one of the names is taken in the folder.
+        """
+        self._get_folder(parent_id)
+        cur = self.connection.cursor()
+        try:
+            user_id = self._get_user_id(cur, username)
+            item_ids = []
+            for original_name, stored in stored_files:
+                item_id = self._insert_item(
+                    cur, str(uuid.uuid4()), "file", original_name, parent_id, user_id,
+                    stored.blob_hash,
+                )
+                if item_id is None:
+                    raise Exception(f"Error: create file name '{original_name}' failed")
+                self._reference_blob(cur, stored)
+                item_ids.append(item_id)
             self.connection.commit()
-            cur.close()
-            shutil.copy(file_path, os.path.join(self._root_path, code))
-            logging.info(f"Create file name '{original_name}' successfully")
-            return cur.lastrowid
-        else:
+        except Exception:
             self.connection.rollback()
+            raise
+        finally:
             cur.close()
-            raise Exception(f"Error: create file name '{original_name}' failed")
+        return [self.get_item(item_id) for item_id in item_ids]
+
+    def _reference_blob(self, cur, stored):
+        cur.execute(REFERENCE_BLOB_SQL, stored.reference_params())
 
-    def open_file(self, original_name):
+    def get_blob_codec(self, blob_hash: str) -> str:
+        """Codec a blob is compressed with, None for raw blobs."""
         cur = self.connection.cursor()
-        cur.execute(
-            "SELECT id, code, type FROM items WHERE original_name = ?", (original_name,)
-        )
-        item_id, code, file_type = cur.fetchone()
-        file_path = os.path.join(self._root_path, code)
-        if file_type != "file":
+        try:
+            cur.execute(FETCH_BLOB_CODEC_SQL, (blob_hash,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+        return None if row is None else row[0]
+
+    def discard_blob(self, blob_hash: str):
+        """Remove a blob stored for an upload that never got its item.
+
+        Another upload of the same content may have been committed meanwhile,
+        the blob is kept then.
+        """
+        cur = self.connection.cursor()
+        try:
+            cur.execute(BLOB_REFERENCED_SQL, (blob_hash,))
+            referenced = cur.fetchone() is not None
+            paths = [] if referenced else self._release_blob(cur, blob_hash)
+            self.connection.commit()
+        except sqlite3.Error:
+            self.connection.rollback()
+            raise
+        finally:
+            cur.close()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _release_blob(self, cur, blob_hash):
+        """Delete the row of an unreferenced blob and of the chunks only it used.
+
+        Returns the paths to remove once the transaction is committed, nothing
+        when the blob is still referenced.
+        """
+        cur.execute(FETCH_BLOB_CODEC_SQL, (blob_hash,))
+        row = cur.fetchone()
+        cur.execute(DELETE_UNREFERENCED_BLOB_SQL, (blob_hash,))
+        if row is None or cur.rowcount == 0:
+            return []
+        if row[0] != CHUNKED_CODEC:
+            return [self._blob_store.blob_path(blob_hash)]
+
+        cur.execute(RELEASE_BLOB_CHUNKS_SQL, (blob_hash,))
+        cur.execute(FETCH_UNREFERENCED_BLOB_CHUNKS_SQL, (blob_hash,))
+        chunk_hashes = [chunk_hash for chunk_hash, in cur.fetchall()]
+        cur.execute(DELETE_BLOB_CHUNKS_SQL, (blob_hash,))
+        cur.executemany(DELETE_UNREFERENCED_CHUNK_SQL, [(h,) for h in chunk_hashes])
+        return [self._chunk_store.chunk_path(chunk_hash) for chunk_hash in chunk_hashes]
+
+    def get_chunk_paths(self, blob_hash: str) -> list[str]:
+        """Paths of the chunks of a chunked blob, in order."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(FETCH_BLOB_CHUNKS_SQL, (blob_hash,))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        return [self._chunk_store.chunk_path(chunk_hash) for chunk_hash, in rows]
+
+    def open_file(self, item_id: int):
+        item = self.get_item(item_id)
+        if item is None or item.type != "file":
             return
+        file_path = self.get_file_path(item)
+        if item.blob_hash is not None:
+            codec = self.get_blob_codec(item.blob_hash)
+            if codec is not None:
+                file_path = self._get_temp_copy(item, codec)
 
         # Open the file using the default application based on the platform
         if sys.platform.startswith("win32"):
@@ -236,89 +475,110 @@ class ItemModel(NativeSqlite3Model):
         else:
             os.system(f'open "{file_path}"')  # Linux
 
-    def get_file_bytes(self, original_name):
-        cur = self.connection.cursor()
-        cur.execute(
-            "SELECT id, code, type FROM items WHERE original_name = ?", (original_name,)
-        )
-        item_id, code, file_type = cur.fetchone()
-        if file_type != "file":
+    def _get_temp_copy(self, item: ItemDTO, codec: str) -> str:
+        """Decompress or assemble a blob under its item name in the temp directory, once."""
+        directory = os.path.join(tempfile.gettempdir(), "app_quan_ly", item.blob_hash)
+        file_path = os.path.join(directory, item.original_name)
+        if not os.path.exists(file_path):
+            os.makedirs(directory, exist_ok=True)
+            part_path = f"{file_path}.part"
+            if codec == CHUNKED_CODEC:
+                assemble_chunks(self.get_chunk_paths(item.blob_hash), part_path)
+            else:
+                decompress_file(self.get_file_path(item), part_path, codec)
+            os.replace(part_path, file_path)
+        return file_path
+
+    def export_file(self, item_id: int, target_path: str) -> FileExporter:
+        """Prepare copying a file item to ``target_path``.
+
+        Connect to the returned exporter's signals, then hand it to
+        ``start_transfer``. ``cancel()`` stops it and removes the partial copy.
+        """
+        item = self.get_item(item_id)
+        if item is None or item.type != "file":
             return None
-        file_path = os.path.join(self._root_path, code)
-        with open(file_path, "rb") as f:
-            return f.read()
+        codec = None if item.blob_hash is None else self.get_blob_codec(item.blob_hash)
+        if codec == CHUNKED_CODEC:
+            return FileExporter(
+                None, target_path, item.blob_hash, codec,
+                chunk_paths=self.get_chunk_paths(item.blob_hash),
+            )
+        return FileExporter(self.get_file_path(item), target_path, item.blob_hash, codec)
+
+    def start_transfer(self, transfer):
+        """Run a file transfer on the transfer pool, cancelled on close."""
+        cancel_event = transfer.cancel_event
+        for name in ("finished", "failed", "cancelled"):
+            signal = getattr(transfer.signals, name, None)
+            if signal is not None:
+                signal.connect(lambda *_: self._transfers.pop(cancel_event, None))
+        self._transfers[cancel_event] = transfer.signals
+        self._transfer_pool.start(transfer)
 
     def create_folder(
-        self, username: str, original_name: str, parent_original_name: str = None
+        self, username: str, original_name: str, parent_id: int = ROOT_ITEM_ID
     ):
+        self._get_folder(parent_id)
         cur = self.connection.cursor()
-        cur.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_id = cur.fetchone()[0]
-        cur.execute(
-            "SELECT id FROM items WHERE original_name = ?", (parent_original_name,)
-        )
-        result = cur.fetchone()
-        if result:
-            parent_id = result[0]
-        else:
-            parent_id = 0
+        user_id = self._get_user_id(cur, username)
         code = str(uuid.uuid4())
-        cur.execute(
-            "insert into items (code, type, original_name, parent_id, user_id) values (?, ?, ?, ?, ?)",
-            (code, "folder", original_name, parent_id, user_id),
-        )
-        if cur.rowcount > 0:
+        item_id = self._insert_item(cur, code, "folder", original_name, parent_id, user_id)
+        if item_id is not None:
             self.connection.commit()
             cur.close()
             logging.info(f"Create folder name '{original_name}' successfully")
-            return cur.lastrowid
+            return self.get_item(item_id)
         else:
             self.connection.rollback()
             cur.close()
             raise Exception(f"Error: folder file name '{original_name}' failed")
 
-    def delete_file(self, original_name):
-        cur = self.connection.cursor()
-        cur.execute(
-            "SELECT id, code, type FROM items WHERE original_name = ?", (original_name,)
-        )
-        item_id, code, file_type = cur.fetchone()
-        if file_type != "file":
-            cur.close()
+    def delete_file(self, item_id: int):
+        item = self.get_item(item_id)
+        if item is None:
+            raise Exception(f"Error: item with id '{item_id}' not found")
+        if item.type != "file":
             raise Exception(f"Error: this is not a file")
-        file_path = os.path.join(self._root_path, code)
+        cur = self.connection.cursor()
+        cur.execute(DELETE_ITEM_CLOSURE_SQL, (item_id,))
         cur.execute("delete from items where id = ?", (item_id,))
         if cur.rowcount == 1:
+            paths = [self.get_file_path(item)]
+            if item.blob_hash is not None:
+                cur.execute(RELEASE_BLOB_SQL, (item.blob_hash,))
+                paths = self._release_blob(cur, item.blob_hash)
             self.connection.commit()
             cur.close()
-            os.remove(file_path)
+            # Blobs and chunks still used by other items stay on disk
+            for path in paths:
+                if os.path.exists(path):
+                    os.remove(path)
             logging.info(f"Delete file with id '{item_id}' successfully")
-            return item_id
+            return item
         else:
             self.connection.rollback()
             cur.close()
             raise Exception(f"Error: delete item with id '{item_id}' failed")
 
-    def delete_folder(self, original_name):
-        cur = self.connection.cursor()
-        cur.execute(
-            "SELECT id, code, type FROM items WHERE original_name = ?", (original_name,)
-        )
-        item_id, code, file_type = cur.fetchone()
-        if file_type != "folder":
-            cur.close()
+    def delete_folder(self, item_id: int):
+        item = self.get_item(item_id)
+        if item is None:
+            raise Exception(f"Error: item with id '{item_id}' not found")
+        if item.type != "folder":
             raise Exception(f"Error: this is not a folder")
-        cur.execute("SELECT count(*) FROM items WHERE parent_id = ?", (item_id,))
-        number_children = cur.fetchone()[0]
-        if number_children > 0:
+        cur = self.connection.cursor()
+        cur.execute("SELECT 1 FROM items WHERE parent_id = ? LIMIT 1", (item_id,))
+        if cur.fetchone() is not None:
             cur.close()
             raise Exception(f"Error: folder has content cannot be deleted")
+        cur.execute(DELETE_ITEM_CLOSURE_SQL, (item_id,))
         cur.execute("delete from items where id = ?", (item_id,))
         if cur.rowcount == 1:
             self.connection.commit()
             cur.close()
             logging.info(f"Delete folder with id '{item_id}' successfully")
-            return item_id
+            return item
         else:
             self.connection.rollback()
             cur.close()
@@ -334,27 +594,193 @@ class ItemModel(NativeSqlite3Model):
         cur.close()
         return data
 
-    def get_item_id_by_name(self, item_name):
-        # Connect to the SQLite database
+    def get_item(self, item_id: int) -> ItemDTO:
         cur = self.connection.cursor()
+        try:
+            cur.execute(self._fetch_item_sql, (item_id,))
+            row = cur.fetchone()
+            return ItemDTO(*row) if row else None
+        finally:
+            cur.close()
 
+    def get_child(self, parent_id: int, original_name: str) -> ItemDTO:
+        """Look up a direct child by name through the (parent_id, original_name) index."""
+        cur = self.connection.cursor()
         try:
-            # Execute the query to find the item ID
-            cur.execute("SELECT id FROM items WHERE original_name = ?", (item_name,))
-            result = cur.fetchone()
+            cur.execute(self._fetch_child_sql, (parent_id, original_name))
+            row = cur.fetchone()
+            return ItemDTO(*row) if row else None
+        finally:
+            cur.close()
 
-            # Check if a result was found
-            if result:
-                return result[0]  # Return the item ID
-            else:
-                logging.info("Item not found.")
+    def resolve_path(self, path: str) -> ItemDTO:
+        """Resolve a path such as ``/folder/sub/file.pdf`` one segment at a time.
+
+        The path is relative to the root folder, ``/`` resolves to the root
+        itself. Returns None when a segment does not exist.
+        """
+        item = self.get_item(ROOT_ITEM_ID)
+        for segment in path.split("/"):
+            if not segment:
+                continue
+            if item is None or item.type != "folder":
                 return None
-        except sqlite3.Error as e:
-            logging.error(f"Database error: {e}")
+            item = self.get_child(item.id, segment)
+        return item
+
+    def get_item_path(self, item_id: int) -> str:
+        """Build the ``/folder/sub/file.pdf`` path of an item."""
+        item = self.get_item(item_id)
+        if item is None or item.id == ROOT_ITEM_ID:
+            return "/"
+        segments = [
+            ancestor.original_name
+            for ancestor in self.get_ancestors(item_id)
+            if ancestor.id != ROOT_ITEM_ID
+        ]
+        segments.append(item.original_name)
+        return "/" + "/".join(segments)
+
+    def get_ancestors(self, item_id: int) -> list[ItemDTO]:
+        """Return the ancestors of an item from the root down to its parent."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(self._fetch_ancestors_sql, (item_id,))
+            return [ItemDTO(*row) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def get_descendants(self, item_id: int, max_depth: int = -1) -> list[ItemDTO]:
+        """Return everything below an item, level by level.
+
+        ``max_depth`` limits how many levels are returned, -1 means all of them.
+        """
+        if max_depth < 0:
+            max_depth = sys.maxsize
+        cur = self.connection.cursor()
+        try:
+            cur.execute(self._fetch_descendants_sql, (item_id, max_depth))
+            return [ItemDTO(*row) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def get_subtree_size(self, item_id: int) -> int:
+        """Count the items below an item, not including the item itself."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(
+                "SELECT count(*) FROM item_closure WHERE ancestor = ? AND depth > 0",
+                (item_id,),
+            )
+            return cur.fetchone()[0]
+        finally:
+            cur.close()
+
+    def get_children_sql(self, order_by: str = "i.id") -> str:
+        """SQL reading one page of children, bound to (parent_id, limit, offset)."""
+        return self._fetch_children_sql.format(order_by=order_by)
+
+    @staticmethod
+    def get_visible_children_sql(
+        sort_key: str = "i.id", descending: bool = False, after: bool = False
+    ) -> str:
+        """SQL reading one page of the children a user may see.
+
+        Bound by name to ``parent_id``, ``username``, ``folder_view``,
+        ``file_view`` and ``limit``. Rows end with their ``sort_key`` value.
+        With ``after`` the page starts past ``(:after_key, :after_id)``, the
+        sort value and id of the last row already read, so rows removed from
+        the tree meanwhile cannot shift the next page.
+        """
+        condition = "1"
+        if after:
+            operator = "<" if descending else ">"
+            condition = f"({sort_key}, i.id) {operator} (:after_key, :after_id)"
+        return FETCH_VISIBLE_CHILDREN_SQL.format(
+            sort_key=sort_key,
+            after=condition,
+            direction="DESC" if descending else "ASC",
+        )
+
+    @staticmethod
+    def to_item(row) -> ItemDTO:
+        return ItemDTO(*row)
+
+    def fetch_children(
+        self, parent_id: int, limit: int, offset: int = 0, order_by: str = "i.id"
+    ) -> list[ItemDTO]:
+        """Fetch one page of the direct children of ``parent_id``."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(self.get_children_sql(order_by), (parent_id, limit, offset))
+            return [ItemDTO(*row) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    def get_item_id_by_path(self, path):
+        item = self.resolve_path(path)
+        if item is None:
+            logging.info("Item not found.")
             return None
+        return item.id
+
+    def get_compression_report(self) -> list[CompressionReportRow]:
+        """Bytes stored and saved by compression, per category of get_file_type."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(COMPRESSION_REPORT_SQL)
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+        report = {}
+        for size, stored_size, original_name in rows:
+            category = get_file_type(original_name)
+            row = report.setdefault(category, CompressionReportRow(category, 0, 0, 0))
+            row.blobs += 1
+            row.size += size
+            row.stored_size += stored_size
+        return sorted(report.values(), key=lambda row: row.saved, reverse=True)
+
+    def migrate_to_blob_store(self, batch_size: int = 100) -> int:
+        """Move files stored under their item code into the blob store.
+
+        Each batch is linked into the store, committed, and only then are the
+        old files removed, so an interrupted run can simply be started again.
+        Returns the number of items migrated.
+        """
+        migrated = 0
+        last_id = -1
+        cur = self.connection.cursor()
+        try:
+            while True:
+                cur.execute(FETCH_UNMIGRATED_FILES_SQL, (last_id, batch_size))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                legacy_paths = []
+                for item_id, code in rows:
+                    last_id = item_id
+                    file_path = os.path.join(self._root_path, code)
+                    if not os.path.exists(file_path):
+                        logging.warning(f"File of item with id '{item_id}' is missing, skipped")
+                        continue
+                    stored = self._blob_store.adopt_file(file_path)
+                    cur.execute(
+                        "UPDATE items SET blob_hash = ? WHERE id = ?", (stored.blob_hash, item_id)
+                    )
+                    self._reference_blob(cur, stored)
+                    legacy_paths.append(file_path)
+                self.connection.commit()
+                for file_path in legacy_paths:
+                    os.remove(file_path)
+                migrated += len(legacy_paths)
+                logging.info(f"Migrated {migrated} files to the blob store")
+        except (sqlite3.Error, OSError) as error:
+            self.connection.rollback()
+            raise Exception(f"Error: migrate files to blob store failed: {error}")
         finally:
-            # Close the connection
             cur.close()
+        return migrated
 
 
 if __name__ == "__main__":
@@ -366,7 +792,7 @@ if __name__ == "__main__":
     window.resize(600, 600)
     view = QTreeView()
     view.setModel(model.get_model())
-    model.populate_data()
+    model.get_model().fetch_root()
     window.setCentralWidget(view)
     window.show()
     sys.exit(app.exec())
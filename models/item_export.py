@@ -0,0 +1,121 @@
+import logging
+import os
+import traceback
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from common.chunking import assemble_chunks
+from common.compression import decompress_file
+from common.file import copy_file
+from common.storage import hash_file
+from common.worker import CancellableRunnable
+
+
+class FileExporterSignals(QObject):
+    # bytes written, total bytes
+    progress = pyqtSignal(int, int)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class FileExporter(CancellableRunnable):
+    """Copies a stored file to a path chosen by the user on a pool thread.
+
+    The file is copied in fixed-size chunks by ``copy_file``, decompressed
+    for compressed blobs or assembled from ``chunk_paths`` for chunked blobs,
+    into ``<target>.part``, which is renamed over the
+    target only once the copy is verified: against the SHA-256 when the file
+    lives in the blob store, against the size for files stored before it.
+    Memory use does not depend on the file size.
+    """
+
+    def __init__(
+        self, source_path, target_path, blob_hash=None, codec=None, chunk_paths=None
+    ):
+        super().__init__()
+        self.signals = FileExporterSignals()
+        self._source_path = source_path
+        self._target_path = target_path
+        self._blob_hash = blob_hash
+        self._codec = codec
+        self._chunk_paths = chunk_paths
+
+    def run(self):
+        part_path = f"{self._target_path}.part"
+        try:
+            if self._chunk_paths is not None:
+                total = sum(os.path.getsize(path) for path in self._chunk_paths)
+            else:
+                total = os.path.getsize(self._source_path)
+            method = self._copy(part_path, total)
+            if method is None:
+                os.remove(part_path)
+                self.signals.cancelled.emit()
+                return
+            os.replace(part_path, self._target_path)
+            self.signals.finished.emit(self._target_path)
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            self.signals.failed.emit(str(error))
+
+    def _copy(self, part_path, total):
+        """Copy into ``part_path``, returning the method used or None if cancelled."""
+        if self._chunk_paths is not None:
+            return self._assemble(part_path, total)
+        if self._codec is not None:
+            return self._decompress(part_path, total)
+        method = copy_file(
+            self._source_path,
+            part_path,
+            on_progress=self.signals.progress.emit,
+            is_cancelled=self.is_cancelled,
+        )
+        if method is None:
+            return None
+
+        written = os.path.getsize(part_path)
+        if written != total:
+            raise Exception(f"Error: copied {written} of {total} bytes")
+        if self._blob_hash is not None:
+            # The kernel copy never passes through Python, so read the copy back
+            blob_hash, _ = hash_file(part_path)
+            if blob_hash != self._blob_hash:
+                raise Exception(f"Error: checksum mismatch for blob '{self._blob_hash}'")
+        logging.info(f"Exported '{self._source_path}' to '{self._target_path}' using {method}")
+        return method
+
+    def _decompress(self, part_path, total):
+        """Decompress into ``part_path``, checking the content hash on the way."""
+        decompressed = decompress_file(
+            self._source_path,
+            part_path,
+            self._codec,
+            on_progress=lambda read: self.signals.progress.emit(read, total),
+            is_cancelled=self.is_cancelled,
+        )
+        if decompressed is None:
+            return None
+        if decompressed[0] != self._blob_hash:
+            raise Exception(f"Error: checksum mismatch for blob '{self._blob_hash}'")
+        logging.info(f"Exported '{self._source_path}' to '{self._target_path}' using {self._codec}")
+        return self._codec
+
+    def _assemble(self, part_path, total):
+        """Concatenate the chunks into ``part_path``, checking the content hash on the way."""
+        assembled = assemble_chunks(
+            self._chunk_paths,
+            part_path,
+            on_progress=lambda written: self.signals.progress.emit(written, total),
+            is_cancelled=self.is_cancelled,
+        )
+        if assembled is None:
+            return None
+        if assembled[0] != self._blob_hash:
+            raise Exception(f"Error: checksum mismatch for blob '{self._blob_hash}'")
+        logging.info(
+            f"Exported {len(self._chunk_paths)} chunks of blob '{self._blob_hash}' to '{self._target_path}'"
+        )
+        return self._codec
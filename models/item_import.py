@@ -0,0 +1,345 @@
+import logging
+import os
+import queue
+import sqlite3
+import time
+import traceback
+import uuid
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from common.compression import get_codec
+from common.worker import CancellableRunnable
+from sql_statements.blob import REFERENCE_BLOB_SQL
+from sql_statements.item import INSERT_ITEM_CLOSURE_SQL, INSERT_ITEM_SQL, NEXT_ITEM_ID_SQL
+
+# Progress of the copies is reported at most this often
+PROGRESS_INTERVAL = 0.1
+
+
+class DirectoryScannerSignals(QObject):
+    # [(parent folder index, name)], [(folder index, name, path, size)], [(path, error)]
+    finished = pyqtSignal(object, object, object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+class DirectoryScanner(CancellableRunnable):
+    """Lists a local directory tree with ``os.scandir`` on a pool thread.
+
+    Folder 0 is the directory itself, its parent index is -1. A folder is
+    always listed before its subfolders, so rows can be inserted in list
+    order. Symbolic links are skipped, unreadable folders are reported.
+    """
+
+    def __init__(self, directory):
+        super().__init__()
+        self.signals = DirectoryScannerSignals()
+        self._directory = directory
+
+    def run(self):
+        try:
+            folders = [(-1, os.path.basename(os.path.normpath(self._directory)))]
+            files = []
+            failures = []
+            pending = [(0, self._directory)]
+            while pending:
+                if self.is_cancelled():
+                    self.signals.cancelled.emit()
+                    return
+                folder_index, path = pending.pop()
+                try:
+                    with os.scandir(path) as entries:
+                        for entry in entries:
+                            if entry.is_dir(follow_symlinks=False):
+                                folders.append((folder_index, entry.name))
+                                pending.append((len(folders) - 1, entry.path))
+                            elif entry.is_file(follow_symlinks=False):
+                                size = entry.stat(follow_symlinks=False).st_size
+                                files.append((folder_index, entry.name, entry.path, size))
+                except OSError as error:
+                    failures.append((path, str(error)))
+            self.signals.finished.emit(folders, files, failures)
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(str(error))
+
+
+class ImportCopierSignals(QObject):
+    # bytes copied since the last report
+    progress = pyqtSignal(int)
+    # [(file index, StoredBlob)], [(file index, error)], also sent when cancelled
+    finished = pyqtSignal(object, object)
+    failed = pyqtSignal(str)
+
+
+class ImportCopier(CancellableRunnable):
+    """Copies files into the upload store until the shared job queue is empty.
+
+    Several copiers share one queue, so a few large files do not hold up the
+    rest. Progress is reported in bytes at most every PROGRESS_INTERVAL, so
+    100k small files do not flood the GUI thread with signals.
+    """
+
+    def __init__(self, store, files, jobs: queue.SimpleQueue):
+        super().__init__()
+        self.signals = ImportCopierSignals()
+        self._store = store
+        self._files = files
+        self._jobs = jobs
+        self._copied = 0
+        self._reported = 0
+        self._reported_at = 0
+
+    def run(self):
+        stored = []
+        failures = []
+        try:
+            while not self.is_cancelled():
+                try:
+                    index = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                _, name, path, size = self._files[index]
+                base = self._copied
+                try:
+                    blob = self._store.put_file(
+                        path,
+                        get_codec(name),
+                        on_progress=lambda done, total: self._advance(
+                            base + (done * size // total if total else size)
+                        ),
+                        is_cancelled=self.is_cancelled,
+                    )
+                except Exception as error:
+                    failures.append((index, str(error)))
+                    self._advance(base + size)
+                    continue
+                if blob is None:
+                    break
+                stored.append((index, blob))
+                self._advance(base + size)
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(str(error))
+        if self._copied != self._reported:
+            self.signals.progress.emit(self._copied - self._reported)
+        # Always sent, the blobs stored so far are discarded when cancelled
+        self.signals.finished.emit(stored, failures)
+
+    def _advance(self, copied):
+        self._copied = copied
+        now = time.monotonic()
+        if now - self._reported_at >= PROGRESS_INTERVAL:
+            self.signals.progress.emit(self._copied - self._reported)
+            self._reported = self._copied
+            self._reported_at = now
+
+
+class ImportWriterSignals(QObject):
+    # id of the imported top folder
+    finished = pyqtSignal(int)
+    failed = pyqtSignal(str)
+
+
+class ImportWriter(CancellableRunnable):
+    """Inserts every folder and file row of an import in one transaction.
+
+    Runs on a pool thread with its own connection. Ids are assigned up front
+    under BEGIN IMMEDIATE, so items, closure rows and blob references all go
+    in with ``executemany``; the import shows up whole or not at all.
+    """
+
+    def __init__(self, database_name, username, parent_id, folders, files, stored):
+        super().__init__()
+        self.signals = ImportWriterSignals()
+        self._database_name = database_name
+        self._username = username
+        self._parent_id = parent_id
+        self._folders = folders
+        self._files = files
+        self._stored = stored
+
+    def run(self):
+        connection = None
+        try:
+            connection = sqlite3.connect(self._database_name, timeout=30)
+            connection.isolation_level = None
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                top_id = self._insert(connection)
+                connection.execute("COMMIT")
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+            logging.info(
+                f"Imported {len(self._folders)} folders and {len(self._stored)} files "
+                f"as item '{top_id}'"
+            )
+            self.signals.finished.emit(top_id)
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(str(error))
+        finally:
+            if connection is not None:
+                connection.close()
+
+    def _insert(self, connection):
+        user_id = connection.execute(
+            "SELECT id FROM users WHERE username = ?", (self._username,)
+        ).fetchone()[0]
+        next_id = connection.execute(NEXT_ITEM_ID_SQL).fetchone()[0]
+
+        folder_ids = [next_id + index for index in range(len(self._folders))]
+        file_ids = [next_id + len(self._folders) + index for index in range(len(self._stored))]
+        rows = []
+        closures = []
+        for folder_id, (parent_index, name) in zip(folder_ids, self._folders):
+            parent_id = self._parent_id if parent_index == -1 else folder_ids[parent_index]
+            rows.append((folder_id, str(uuid.uuid4()), "folder", name, parent_id, user_id, None))
+            closures.append({"item_id": folder_id, "parent_id": parent_id})
+        for file_id, (index, blob) in zip(file_ids, self._stored):
+            folder_index, name, _, _ = self._files[index]
+            parent_id = folder_ids[folder_index]
+            rows.append((file_id, str(uuid.uuid4()), "file", name, parent_id, user_id, blob.blob_hash))
+            closures.append({"item_id": file_id, "parent_id": parent_id})
+
+        connection.executemany(INSERT_ITEM_SQL, rows)
+        # In list order, every parent has its closure rows before its children
+        connection.executemany(INSERT_ITEM_CLOSURE_SQL, closures)
+        # Identical files copied in parallel dedup each other, every reference
+        # to a blob takes how it is stored from the copy that wrote it
+        blobs = {}
+        for _, blob in self._stored:
+            if blob.blob_hash not in blobs or blob.created:
+                blobs[blob.blob_hash] = blob
+        connection.executemany(
+            REFERENCE_BLOB_SQL,
+            [blobs[blob.blob_hash].reference_params() for _, blob in self._stored],
+        )
+        return folder_ids[0]
+
+
+class DirectoryImporter(QObject):
+    """Imports a local directory tree into a folder.
+
+    The tree is scanned, every file is copied into the store by copiers
+    running in parallel on the item model's transfer pool, then all rows are
+    inserted in one transaction. Files that cannot be read are left out and
+    reported. Connect the signals, then call ``start``. ``cancel`` stops the
+    scan or the copies and removes blobs that no committed item uses.
+    """
+
+    # folder count, file count
+    scanned = pyqtSignal(int, int)
+    # bytes copied, total bytes
+    progress = pyqtSignal(int, int)
+    # the copies are done and the rows are being inserted
+    writing = pyqtSignal()
+    # imported top folder ItemDTO or None, [(path, error)], cancelled
+    finished = pyqtSignal(object, object, bool)
+
+    def __init__(self, item_model, username, directory, parent_id, parent=None):
+        super().__init__(parent)
+        self._item_model = item_model
+        self._username = username
+        self._directory = directory
+        self._parent_id = parent_id
+        self._folders = []
+        self._files = []
+        self._stored = []
+        self._failures = []
+        self._cancel_events = []
+        self._copiers = 0
+        self._done = 0
+        self._total = 0
+        self._cancelled = False
+
+    def start(self):
+        scanner = DirectoryScanner(self._directory)
+        scanner.signals.finished.connect(self._on_scanned)
+        scanner.signals.failed.connect(self._on_failed)
+        scanner.signals.cancelled.connect(lambda: self._finish(None))
+        self._cancel_events.append(scanner.cancel_event)
+        self._item_model.start_transfer(scanner)
+
+    def cancel(self):
+        self._cancelled = True
+        for cancel_event in self._cancel_events:
+            cancel_event.set()
+
+    def _on_scanned(self, folders, files, failures):
+        self._folders = folders
+        self._files = files
+        self._failures.extend(failures)
+        self._total = sum(size for _, _, _, size in files)
+        self.scanned.emit(len(folders), len(files))
+        if self._cancelled:
+            self._finish(None)
+            return
+        if not files:
+            self._write()
+            return
+
+        jobs = queue.SimpleQueue()
+        for index in range(len(files)):
+            jobs.put(index)
+        self._copiers = min(self._item_model.get_transfer_thread_count(), len(files))
+        store = self._item_model.get_upload_store()
+        for _ in range(self._copiers):
+            copier = ImportCopier(store, files, jobs)
+            copier.signals.progress.connect(self._on_progress)
+            copier.signals.finished.connect(self._on_copied)
+            copier.signals.failed.connect(
+                lambda error: self._failures.append((self._directory, error))
+            )
+            self._cancel_events.append(copier.cancel_event)
+            self._item_model.start_transfer(copier)
+
+    def _on_progress(self, copied):
+        self._done += copied
+        self.progress.emit(self._done, self._total)
+
+    def _on_copied(self, stored, failures):
+        self._stored.extend(stored)
+        self._failures.extend((self._files[index][2], error) for index, error in failures)
+        self._copiers -= 1
+        if self._copiers:
+            return
+        if self._cancelled:
+            self._discard()
+            self._finish(None)
+        else:
+            self._write()
+
+    def _write(self):
+        self.writing.emit()
+        # Rows go in folder by folder, in the order the files were listed
+        self._stored.sort(key=lambda entry: entry[0])
+        writer = ImportWriter(
+            self._item_model.database_name,
+            self._username,
+            self._parent_id,
+            self._folders,
+            self._files,
+            self._stored,
+        )
+        writer.signals.finished.connect(
+            lambda top_id: self._finish(self._item_model.get_item(top_id))
+        )
+        writer.signals.failed.connect(self._on_failed)
+        self._item_model.start_transfer(writer)
+
+    def _on_failed(self, error):
+        self._discard()
+        self._failures.append((self._directory, error))
+        self._finish(None)
+
+    def _discard(self):
+        for _, blob in self._stored:
+            if blob.created:
+                self._item_model.discard_blob(blob.blob_hash)
+        self._stored = []
+
+    def _finish(self, folder):
+        self.finished.emit(folder, self._failures, self._cancelled)
@@ -0,0 +1,440 @@
+import logging
+import sqlite3
+import traceback
+
+from PyQt6.QtCore import (
+    QAbstractItemModel,
+    QCoreApplication,
+    QModelIndex,
+    QObject,
+    QThreadPool,
+    Qt,
+    pyqtSignal,
+)
+
+from common import session
+from common.file import get_item_category
+from common.style import get_icon, get_style
+from common.worker import CancellableRunnable
+from common.time import format_utc_timestamp
+from configs import FILE_TREE_VIEW_COLUMNS, TIMEZONE
+from messages.permissions import FILE_VIEW, FOLDER_VIEW
+from models.thumbnail import ThumbnailCache
+
+ROOT_PARENT_ID = -1
+THUMBNAIL_CATEGORY = "Hình Ảnh"
+
+
+class TreeNode:
+    """A loaded row of the file tree, created only when its parent is fetched."""
+
+    __slots__ = (
+        "item", "parent", "children", "row", "depth", "fetched", "loading",
+        "category", "created_at",
+    )
+
+    def __init__(self, item, parent=None, row=0):
+        self.item = item
+        self.parent = parent
+        self.children: list[TreeNode] = []
+        self.row = row
+        self.depth = parent.depth + 1 if parent is not None else -1
+        self.fetched = False
+        self.loading = False
+        self.category = None
+        self.created_at = None
+
+    @property
+    def item_id(self):
+        return self.item.id if self.item is not None else ROOT_PARENT_ID
+
+    @property
+    def is_folder(self):
+        return self.item is None or self.item.type == "folder"
+
+    def get_category(self):
+        if self.category is None:
+            self.category = get_item_category(self.item.type, self.item.original_name)
+        return self.category
+
+
+class ChildrenLoaderSignals(QObject):
+    # generation, parent id, [row], last batch
+    batch_loaded = pyqtSignal(int, int, object, bool)
+    failed = pyqtSignal(int, int, str)
+
+
+class ChildrenLoader(CancellableRunnable):
+    """Reads the children of one folder on a pool thread.
+
+    The loader opens its own SQLite connection and hands plain row tuples
+    back in batches, the first one small so the folder shows up quickly.
+    Each batch after the first is read with ``next_sql`` from the sort value
+    and id of the last row read, which the queries return as their last
+    column.
+    """
+
+    _first_batch_size = 256
+    _max_batch_size = 4096
+
+    def __init__(self, database_name, first_sql, next_sql, parent_id, generation, username):
+        super().__init__()
+        self.signals = ChildrenLoaderSignals()
+        self._database_name = database_name
+        self._first_sql = first_sql
+        self._next_sql = next_sql
+        self._parent_id = parent_id
+        self._generation = generation
+        self._username = username
+
+    def run(self):
+        connection = None
+        try:
+            connection = sqlite3.connect(self._database_name)
+            sql = self._first_sql
+            params = {
+                "parent_id": self._parent_id,
+                "username": self._username,
+                "folder_view": FOLDER_VIEW,
+                "file_view": FILE_VIEW,
+            }
+            batch_size = self._first_batch_size
+            while not self.is_cancelled():
+                params["limit"] = batch_size
+                rows = connection.execute(sql, params).fetchall()
+                done = len(rows) < batch_size
+                if self.is_cancelled():
+                    break
+                if rows:
+                    sql = self._next_sql
+                    params["after_key"], params["after_id"] = rows[-1][-1], rows[-1][0]
+                self.signals.batch_loaded.emit(
+                    self._generation, self._parent_id, [row[:-1] for row in rows], done
+                )
+                if done:
+                    break
+                batch_size = min(batch_size * 2, self._max_batch_size)
+        except Exception:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(
+                self._generation, self._parent_id, traceback.format_exc()
+            )
+        finally:
+            if connection is not None:
+                connection.close()
+
+
+class ItemTreeModel(QAbstractItemModel):
+    """Tree model that loads the children of a folder only when it is expanded.
+
+    Children are read per parent by a ``ChildrenLoader`` on a thread pool and
+    inserted as their batches arrive, so the GUI thread never waits on SQL.
+    The loader query only returns the rows the session user may see.
+    The column values are computed in ``data`` for the rows being shown;
+    image rows show the category icon until their thumbnail is ready.
+    """
+
+    # Emitted once the top level row has been inserted
+    root_loaded = pyqtSignal()
+
+    _root_font_size = 14
+    _min_font_size = 8
+    _sort_columns = {
+        0: "i.original_name",
+        1: "i.type",
+        2: "i.created_at",
+        3: "coalesce(p.fullname, '')",
+    }
+
+    def __init__(self, item_model, parent=None):
+        super().__init__(parent)
+        self._item_model = item_model
+        self._root = TreeNode(None)
+        self._nodes: dict[int, TreeNode] = {}
+        self._sort_key = "i.id"
+        self._descending = False
+        # Batches from loaders started before the last reset are dropped
+        self._generation = 0
+        self._loads = {}
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(2)
+        self._thumbnails = ThumbnailCache(item_model, self)
+        self._thumbnails.thumbnail_ready.connect(self._on_thumbnail_ready)
+        # thumbnail key -> nodes shown while it was loading
+        self._thumbnail_nodes: dict[str, set[TreeNode]] = {}
+
+    def _node(self, index: QModelIndex) -> TreeNode:
+        if index.isValid():
+            return index.internalPointer()
+        return self._root
+
+    def _index_for(self, node: TreeNode):
+        if node is self._root:
+            return QModelIndex()
+        return self.createIndex(node.row, 0, node)
+
+    def _style(self, node: TreeNode):
+        size = max(self._root_font_size - node.depth, self._min_font_size)
+        return get_style(size, node.is_folder)
+
+    @staticmethod
+    def _is_visible(item):
+        if item.original_name == "root":
+            return True
+        permission = FOLDER_VIEW if item.type == "folder" else FILE_VIEW
+        return session.SESSION.match_permissions(
+            permission
+        ) or session.SESSION.match_item_permissions(item.id, permission)
+
+    def item(self, index):
+        """Return the ItemDTO shown at ``index``, whatever its column."""
+        if not index.isValid():
+            return None
+        return index.internalPointer().item
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        parent_node = self._node(parent)
+        return self.createIndex(row, column, parent_node.children[row])
+
+    def parent(self, index=QModelIndex()):
+        if not index.isValid():
+            return QModelIndex()
+        parent_node = index.internalPointer().parent
+        if parent_node is None or parent_node is self._root:
+            return QModelIndex()
+        return self.createIndex(parent_node.row, 0, parent_node)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        return len(self._node(parent).children)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(FILE_TREE_VIEW_COLUMNS)
+
+    def hasChildren(self, parent=QModelIndex()):
+        if parent.column() > 0:
+            return False
+        node = self._node(parent)
+        if not node.is_folder:
+            return False
+        return not node.fetched or len(node.children) > 0
+
+    def canFetchMore(self, parent):
+        if parent.column() > 0:
+            return False
+        node = self._node(parent)
+        return node.is_folder and not node.fetched and not node.loading
+
+    def fetchMore(self, parent):
+        node = self._node(parent)
+        if node.loading or node.fetched:
+            return
+        node.loading = True
+        loader = ChildrenLoader(
+            self._item_model.database_name,
+            self._item_model.get_visible_children_sql(self._sort_key, self._descending),
+            self._item_model.get_visible_children_sql(
+                self._sort_key, self._descending, after=True
+            ),
+            node.item_id,
+            self._generation,
+            session.SESSION.get_username(),
+        )
+        loader.signals.batch_loaded.connect(self._on_batch_loaded)
+        loader.signals.failed.connect(self._on_load_failed)
+        self._loads[node.item_id] = loader.cancel_event
+        self._thread_pool.start(loader)
+
+    def _loading_node(self, generation, parent_id):
+        if generation != self._generation:
+            return None
+        if parent_id == ROOT_PARENT_ID:
+            return self._root
+        # None when the folder was removed while its children were loading
+        return self._nodes.get(parent_id)
+
+    def _on_batch_loaded(self, generation, parent_id, batch, done):
+        node = self._loading_node(generation, parent_id)
+        if node is None:
+            return
+
+        if done:
+            node.fetched = True
+            node.loading = False
+            self._loads.pop(parent_id, None)
+
+        # Rows inserted by insert_item may show up again in a batch
+        visible = []
+        for row in batch:
+            item = self._item_model.to_item(row)
+            if item.id not in self._nodes:
+                visible.append(item)
+        if not visible:
+            return
+
+        parent = self._index_for(node)
+        first = len(node.children)
+        self.beginInsertRows(parent, first, first + len(visible) - 1)
+        for row, item in enumerate(visible, start=first):
+            child = TreeNode(item, node, row)
+            node.children.append(child)
+            self._nodes[item.id] = child
+        self.endInsertRows()
+
+        if node is self._root and first == 0:
+            self.root_loaded.emit()
+
+    def _on_load_failed(self, generation, parent_id, error):
+        node = self._loading_node(generation, parent_id)
+        if node is not None:
+            node.fetched = True
+            node.loading = False
+            self._loads.pop(parent_id, None)
+
+    def cancel_loads(self):
+        """Stop every load in flight, their remaining batches are discarded."""
+        self._generation += 1
+        for cancel_event in self._loads.values():
+            cancel_event.set()
+        self._loads = {}
+
+    def shutdown(self):
+        self.cancel_loads()
+        self._thread_pool.waitForDone()
+        self._thumbnails.shutdown()
+
+    def wait_for_loads(self, msecs=-1):
+        """Block until the loads in flight are done and their batches inserted."""
+        self._thread_pool.waitForDone(msecs)
+        QCoreApplication.processEvents()
+
+    def insert_item(self, item):
+        """Add a newly created row under its parent if that parent is loaded.
+
+        Parents that were never expanded pick the row up on their first fetch.
+        """
+        parent_node = self._nodes.get(item.parent_id)
+        if (
+            parent_node is None
+            or (not parent_node.fetched and not parent_node.loading)
+            or item.id in self._nodes
+            or not self._is_visible(item)
+        ):
+            return
+
+        row = len(parent_node.children)
+        self.beginInsertRows(self._index_for(parent_node), row, row)
+        child = TreeNode(item, parent_node, row)
+        parent_node.children.append(child)
+        self._nodes[item.id] = child
+        self.endInsertRows()
+
+    def remove_item(self, item_id):
+        """Remove a deleted row and everything loaded below it."""
+        node = self._nodes.get(item_id)
+        if node is None:
+            return
+
+        parent_node = node.parent
+        self.beginRemoveRows(self._index_for(parent_node), node.row, node.row)
+        del parent_node.children[node.row]
+        for row in range(node.row, len(parent_node.children)):
+            parent_node.children[row].row = row
+
+        pending = [node]
+        while pending:
+            current = pending.pop()
+            self._nodes.pop(current.item.id, None)
+            cancel_event = self._loads.pop(current.item.id, None)
+            if cancel_event is not None:
+                cancel_event.set()
+            pending.extend(current.children)
+        self.endRemoveRows()
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        node: TreeNode = index.internalPointer()
+        column = index.column()
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            item = node.item
+            if column == 0:
+                return item.original_name
+            if column == 1:
+                return node.get_category()
+            if column == 2:
+                if node.created_at is None:
+                    node.created_at = format_utc_timestamp(item.created_at, TIMEZONE)
+                return node.created_at
+            if column == 3:
+                return item.fullname or ""
+        elif role == Qt.ItemDataRole.DecorationRole and column == 0:
+            category = node.get_category()
+            if category == THUMBNAIL_CATEGORY:
+                return self._thumbnail(node) or get_icon(category)
+            return get_icon(category)
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 0:
+            if node.get_category() == THUMBNAIL_CATEGORY:
+                thumbnail_path = self._thumbnails.cached_path(node.item)
+                if thumbnail_path is not None:
+                    return f'<img src="{thumbnail_path}">'
+            return None
+        elif role == Qt.ItemDataRole.FontRole:
+            return self._style(node).font
+        elif role == Qt.ItemDataRole.ForegroundRole:
+            return self._style(node).foreground
+        return None
+
+    def _thumbnail(self, node: TreeNode):
+        icon = self._thumbnails.icon(node.item)
+        if icon is None:
+            self._thumbnail_nodes.setdefault(ThumbnailCache.key(node.item), set()).add(node)
+        return icon
+
+    def _on_thumbnail_ready(self, key):
+        for node in self._thumbnail_nodes.pop(key, ()):
+            # Skip rows removed or reloaded while the thumbnail was made
+            if self._nodes.get(node.item.id) is node:
+                index = self._index_for(node)
+                self.dataChanged.emit(index, index, [Qt.ItemDataRole.DecorationRole])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return FILE_TREE_VIEW_COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        return Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        sort_key = self._sort_columns.get(column, "i.id")
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_key, descending) == (self._sort_key, self._descending):
+            return
+        self._sort_key = sort_key
+        self._descending = descending
+        self.reload()
+
+    def reload(self):
+        """Drop every loaded row and fetch the top level again."""
+        self.cancel_loads()
+        self._thumbnails.cancel_loads()
+        self.beginResetModel()
+        self._root = TreeNode(None)
+        self._nodes = {}
+        self._thumbnail_nodes = {}
+        self.endResetModel()
+        self.fetch_root()
+
+    def fetch_root(self):
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
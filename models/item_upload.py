@@ -0,0 +1,205 @@
+import logging
+import os
+import traceback
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from common.compression import get_codec
+from common.worker import CancellableRunnable
+
+
+class FileUploaderSignals(QObject):
+    # job id, bytes done, total bytes
+    progress = pyqtSignal(int, int, int)
+    # job id, StoredBlob
+    finished = pyqtSignal(int, object)
+    failed = pyqtSignal(int, str)
+    cancelled = pyqtSignal(int)
+
+
+class FileUploader(CancellableRunnable):
+    """Copies one selected file into the upload store on a pool thread.
+
+    Only the blob is written here, the item row is inserted by the
+    UploadManager on the GUI thread, which owns the database connection.
+    """
+
+    def __init__(self, blob_store, job_id, file_path):
+        super().__init__()
+        self.signals = FileUploaderSignals()
+        self._blob_store = blob_store
+        self._job_id = job_id
+        self._file_path = file_path
+
+    def run(self):
+        try:
+            if self.is_cancelled():
+                self.signals.cancelled.emit(self._job_id)
+                return
+            stored = self._blob_store.put_file(
+                self._file_path,
+                get_codec(os.path.basename(self._file_path)),
+                on_progress=lambda done, total: self.signals.progress.emit(
+                    self._job_id, done, total
+                ),
+                is_cancelled=self.is_cancelled,
+            )
+            if stored is None:
+                self.signals.cancelled.emit(self._job_id)
+            else:
+                self.signals.finished.emit(self._job_id, stored)
+        except Exception as error:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(self._job_id, str(error))
+
+
+class UploadManager(QObject):
+    """Uploads a selection of files into one folder.
+
+    Files are copied concurrently on the item model's transfer pool, and the
+    rows of the copied files are inserted in batches, one transaction each.
+    Connect the signals, then call ``start``. ``cancel`` stops the copies in
+    flight and removes blobs that no committed item uses.
+    """
+
+    # job id, file name, bytes done, total bytes
+    file_progress = pyqtSignal(int, str, int, int)
+    # bytes done, total bytes over all files
+    total_progress = pyqtSignal(int, int)
+    # [ItemDTO] of a committed batch
+    items_created = pyqtSignal(object)
+    # file name, error
+    file_failed = pyqtSignal(str, str)
+    # created count, [(file name, error)], cancelled
+    finished = pyqtSignal(int, object, bool)
+
+    _batch_size = 50
+    _flush_interval_msecs = 200
+
+    def __init__(self, item_model, username, file_paths, parent_id, parent=None):
+        super().__init__(parent)
+        self._item_model = item_model
+        self._username = username
+        self._parent_id = parent_id
+        self._file_paths = list(file_paths)
+        self._names = [os.path.basename(path) for path in self._file_paths]
+        # Hashing and copying both count in BlobStore.put_file, the first
+        # progress of a file corrects its total for other stores
+        self._totals = [os.path.getsize(path) * 2 for path in self._file_paths]
+        self._total = sum(self._totals)
+        self._done = [0] * len(self._file_paths)
+        self._done_total = 0
+        self._cancel_events = {}
+        self._remaining = set()
+        self._stored = []
+        self._created = 0
+        self._failures = []
+        self._cancelled = False
+        self._started = False
+        self._finished = False
+        self._flush_timer = QTimer(self)
+        self._flush_timer.setSingleShot(True)
+        self._flush_timer.timeout.connect(self._flush)
+
+    def start(self):
+        taken = set()
+        for job_id, (file_path, name) in enumerate(zip(self._file_paths, self._names)):
+            # Fail name clashes before copying anything
+            if name in taken or self._item_model.get_child(self._parent_id, name) is not None:
+                self._fail(job_id, "already exists in this folder")
+                continue
+            taken.add(name)
+            uploader = FileUploader(self._item_model.get_upload_store(), job_id, file_path)
+            uploader.signals.progress.connect(self._on_progress)
+            uploader.signals.finished.connect(self._on_stored)
+            uploader.signals.failed.connect(self._fail)
+            uploader.signals.cancelled.connect(self._on_cancelled)
+            self._cancel_events[job_id] = uploader.cancel_event
+            self._remaining.add(job_id)
+            self._item_model.start_transfer(uploader)
+        self._started = True
+        self._finish_if_done()
+
+    def cancel(self):
+        self._cancelled = True
+        for cancel_event in self._cancel_events.values():
+            cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancelled
+
+    def _on_progress(self, job_id, done, total):
+        if total != self._totals[job_id]:
+            self._total += total - self._totals[job_id]
+            self._totals[job_id] = total
+        self._set_done(job_id, done)
+        self.file_progress.emit(job_id, self._names[job_id], done, total)
+
+    def _set_done(self, job_id, done):
+        self._done_total += done - self._done[job_id]
+        self._done[job_id] = done
+        self.total_progress.emit(self._done_total, self._total)
+
+    def _on_stored(self, job_id, stored):
+        self._remaining.discard(job_id)
+        self._stored.append((job_id, stored))
+        if len(self._stored) >= self._batch_size or not self._remaining:
+            self._flush()
+        elif not self._flush_timer.isActive():
+            self._flush_timer.start(self._flush_interval_msecs)
+
+    def _on_cancelled(self, job_id):
+        self._remaining.discard(job_id)
+        self._finish_if_done()
+
+    def _fail(self, job_id, error):
+        self._remaining.discard(job_id)
+        self._set_done(job_id, self._totals[job_id])
+        self._failures.append((self._names[job_id], error))
+        self.file_failed.emit(self._names[job_id], error)
+        self._finish_if_done()
+
+    def _flush(self):
+        self._flush_timer.stop()
+        stored, self._stored = self._stored, []
+        if stored and self._cancelled:
+            self._discard(stored)
+        elif stored:
+            self._create(stored)
+        self._finish_if_done()
+
+    def _create(self, stored):
+        try:
+            items = self._item_model.create_files(
+                self._username,
+                [(self._names[job_id], blob) for job_id, blob in stored],
+                self._parent_id,
+            )
+        except Exception as error:
+            if len(stored) > 1:
+                # Such as a name taken since start, only that file fails
+                logging.warning(
+                    f"Upload batch of {len(stored)} files failed, inserting them one by one: {error}"
+                )
+                for entry in stored:
+                    self._create([entry])
+                return
+            job_id, _ = stored[0]
+            logging.error(f"Error: upload of '{self._names[job_id]}' failed: {error}")
+            self._discard(stored)
+            self._failures.append((self._names[job_id], str(error)))
+            self.file_failed.emit(self._names[job_id], str(error))
+        else:
+            self._created += len(items)
+            self.items_created.emit(items)
+
+    def _discard(self, stored):
+        for _, blob in stored:
+            if blob.created:
+                self._item_model.discard_blob(blob.blob_hash)
+
+    def _finish_if_done(self):
+        if not self._started or self._finished or self._remaining or self._stored:
+            return
+        self._finished = True
+        self.finished.emit(self._created, self._failures, self._cancelled)
@@ -1,11 +1,35 @@
 import logging
 import sqlite3
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 
 from common.model import NativeSqlite3Model
-from common.time import convert_utc_time_to_timezone
-from configs import DATABASE_NAME, TIMEZONE
-from sql_statements.log import CREATE_TABLE_SQL
+from common.time import format_utc_timestamps
+from configs import DATABASE_NAME, LOG_ARCHIVE_PATH, LOG_SEARCH_WINDOW, TIMEZONE
+from models.log_archive import attached_archives, connect_logs, split_history_range
+from models.log_writer import get_log_writer
+from sql_statements.log import (
+    CREATE_TABLE_SQL,
+    CREATE_CREATED_AT_INDEX_SQL,
+    CREATE_FTS_TABLE_SQL,
+    CREATE_FTS_TRIGGERS_SQL,
+    CREATE_USER_CREATED_AT_INDEX_SQL,
+    FETCH_LOG_PAGE_SQL,
+    FETCH_LOG_USERS_SQL,
+    FETCH_USER_LOGS_SQL,
+    FTS_TABLE_EXISTS_SQL,
+    HISTORY_SOURCE_SQL,
+    LOG_SEARCH_BEYOND_WINDOW_SQL,
+    LOG_SEARCH_WINDOW_SQL,
+    POPULATE_FTS_SQL,
+    SEARCH_LOG_PAGE_SQL,
+    SEARCH_LOG_SQL,
+)
+
+# Sort keys of the log viewer, by name so no column text reaches the SQL.
+# Only keys with an index, sorting on another column reads the whole table
+LOG_SORT_KEYS = {
+    "created_at": "l.created_at",
+}
 
 
 @dataclass
@@ -13,8 +37,14 @@ class LogDto:
     id: int
     user_id: int
     message: str
-    created_at: str
-    updated_at: str
+    created_at: int
+    updated_at: int
+
+
+@dataclass
+class LogSearchResult(LogDto):
+    # The matching part of the message, matched words between « and »
+    snippet: str
 
 
 @dataclass
@@ -22,67 +52,292 @@ class LogTableData:
     username: int
     message: str
     created_at: str
+    snippet: str = None
+
+
+@dataclass
+class LogQuery:
+    """Which log rows to show and in which order."""
+
+    user_id: int = None
+    # Epoch seconds, ``since`` inclusive and ``until`` exclusive
+    since: int = None
+    until: int = None
+    sort_key: str = "created_at"
+    descending: bool = True
+    # Full-text search, matches are ranked by relevance instead of sorted
+    text: str = None
+
+
+def build_match_query(text):
+    """FTS5 query matching every word of ``text``.
+
+    Words are quoted so characters of the query syntax typed by the user are
+    searched for, not interpreted; only a trailing ``*`` is kept, to match
+    words starting with the rest. Returns None when there is no word.
+    """
+    terms = []
+    for word in text.replace("đ", "d").replace("Đ", "D").split():
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    return " ".join(terms) or None
+
+
+def build_log_page_sql(query: LogQuery, cursor=None, limit=100, archives=()):
+    """SQL and parameters of the page after ``cursor``.
+
+    ``cursor`` is the ``(sort value, id)`` of the last row already shown, so
+    each page starts where the previous one ended instead of skipping an
+    ever larger OFFSET. When searching it is the offset of the next match.
+    ``archives`` are the schemas of attached archives read along with
+    main.logs; searches only read main.logs, which alone is indexed.
+    """
+    params = {"limit": limit}
+    conditions = _filter_conditions(query, params)
+    if query.text:
+        params["match"] = build_match_query(query.text)
+        params["window"] = LOG_SEARCH_WINDOW
+        params["offset"] = cursor or 0
+        where = " AND ".join(conditions) or "1"
+        sql = SEARCH_LOG_PAGE_SQL.format(
+            window=LOG_SEARCH_WINDOW_SQL.format(where=where), where=where
+        )
+        return sql, params
+
+    sort_key = LOG_SORT_KEYS[query.sort_key]
+    if cursor is not None:
+        operator = "<" if query.descending else ">"
+        conditions.append(f"({sort_key}, l.id) {operator} (:cursor_key, :cursor_id)")
+        params["cursor_key"], params["cursor_id"] = cursor
+    where = " AND ".join(conditions) or "1"
+    logs = "logs"
+    if archives:
+        sources = [
+            HISTORY_SOURCE_SQL.format(schema=schema, where=where)
+            for schema in ("main", *archives)
+        ]
+        logs = f"({'UNION ALL'.join(sources)})"
+    sql = FETCH_LOG_PAGE_SQL.format(
+        logs=logs,
+        sort_key=sort_key,
+        where=where,
+        direction="DESC" if query.descending else "ASC",
+    )
+    return sql, params
+
+
+def _filter_conditions(query: LogQuery, params):
+    conditions = []
+    if query.user_id is not None:
+        conditions.append("l.user_id = :user_id")
+        params["user_id"] = query.user_id
+    if query.since is not None:
+        conditions.append("l.created_at >= :since")
+        params["since"] = query.since
+    if query.until is not None:
+        conditions.append("l.created_at < :until")
+        params["until"] = query.until
+    return conditions
+
+
+def fetch_log_page(connection, query: LogQuery, cursor=None, limit=100):
+    """One page of log rows for the viewer and the cursor of the next page.
+
+    Returns ``[LogTableData]`` with formatted times, and None as the cursor
+    after the last page. Takes a connection so pool threads can use their own.
+    """
+    if query.text and build_match_query(query.text) is None:
+        return [], None
+    archives = () if query.text else attached_archives(connection)
+    sql, params = build_log_page_sql(query, cursor, limit, archives)
+    rows = connection.execute(sql, params).fetchall()
+    created_at = format_utc_timestamps([row[3] for row in rows], TIMEZONE)
+    if query.text:
+        page = [
+            LogTableData(fullname, message, formatted, snippet)
+            for (_, fullname, message, _, snippet), formatted in zip(rows, created_at)
+        ]
+        next_cursor = params["offset"] + len(rows) if len(rows) == limit else None
+        return page, next_cursor
+    page = [
+        LogTableData(fullname, message, formatted)
+        for (_, fullname, message, _, _), formatted in zip(rows, created_at)
+    ]
+    next_cursor = (rows[-1][4], rows[-1][0]) if len(rows) == limit else None
+    return page, next_cursor
+
+
+def search_beyond_window(database_name, query: LogQuery):
+    """Whether ``query`` matches logs older than the LOG_SEARCH_WINDOW it ranks.
+
+    Those are left out of every page, the viewer says so.
+    """
+    match = build_match_query(query.text or "")
+    if match is None:
+        return False
+    params = {"match": match, "window": LOG_SEARCH_WINDOW}
+    where = " AND ".join(_filter_conditions(query, params)) or "1"
+    connection = connect_logs(database_name)
+    try:
+        sql = LOG_SEARCH_BEYOND_WINDOW_SQL.format(where=where)
+        return connection.execute(sql, params).fetchone() is not None
+    finally:
+        connection.close()
+
+
+def fetch_history_page(
+    database_name, query: LogQuery, cursor=None, limit=100, archive_path=LOG_ARCHIVE_PATH
+):
+    """fetch_log_page over main.logs and the archives of the query's time range.
+
+    The range is read part by part, each part on its own connection with its
+    archives attached, and a page carries on into the next part when one
+    runs out; the (created_at, id) cursor holds across parts since they do
+    not overlap in time. Searches read the main database only, archived logs
+    are not in the search index.
+    """
+    if query.since is None or query.text:
+        connection = connect_logs(database_name)
+        try:
+            return fetch_log_page(connection, query, cursor, limit)
+        finally:
+            connection.close()
+
+    parts = split_history_range(query.since, query.until, archive_path)
+    if query.descending:
+        parts.reverse()
+    page = []
+    for since, until in parts:
+        # Parts wholly on the side of the cursor already shown
+        if cursor is not None and (
+            since > cursor[0]
+            if query.descending
+            else until is not None and until <= cursor[0]
+        ):
+            continue
+        connection = connect_logs(database_name, since, until, archive_path)
+        try:
+            rows, next_cursor = fetch_log_page(
+                connection, replace(query, since=since, until=until), cursor, limit - len(page)
+            )
+        finally:
+            connection.close()
+        page.extend(rows)
+        if next_cursor is not None:
+            return page, next_cursor
+    return page, None
 
 
 class LogModel(NativeSqlite3Model):
     _fetch_sql = """
         SELECT id, user_id, message, created_at, updated_at FROM logs
     """
-    _fetch_table_sql = """
-        SELECT p.fullname, l.message, l.created_at FROM logs l INNER JOIN profiles p on l.user_id = p.user_id
-    """
 
     def __init__(self, database_name=DATABASE_NAME, table_create_sql=CREATE_TABLE_SQL):
         super().__init__(database_name, table_create_sql)
+        self._migrate_timestamps("logs")
+        self._init_indexes()
+        self._init_search()
 
-    def fetch_table_log(self):
+    def _init_indexes(self):
         cur = self.connection.cursor()
-        cur.execute(self._fetch_table_sql)
-        results = []
-        for row in cur.fetchall():
-            username, message, created_at = row
-            created_at = convert_utc_time_to_timezone(created_at, TIMEZONE).strftime(
-                "%Y-%m-%d %H:%M:%S"
-            )
-            results.append(LogTableData(username, message, created_at))
-        return results
+        try:
+            cur.execute(CREATE_CREATED_AT_INDEX_SQL)
+            cur.execute(CREATE_USER_CREATED_AT_INDEX_SQL)
+            self.connection.commit()
+        except sqlite3.Error as error:
+            raise Exception(f"Failed to create log indexes: {error}")
+        finally:
+            cur.close()
+
+    def _init_search(self):
+        """Create the full-text index of the log messages, indexing the existing logs once."""
+        cur = self.connection.cursor()
+        try:
+            if cur.execute(FTS_TABLE_EXISTS_SQL).fetchone() is not None:
+                return
+            # One transaction, so no log is written between filling the index
+            # and creating the triggers that keep it up to date
+            cur.execute("BEGIN IMMEDIATE")
+            cur.execute(CREATE_FTS_TABLE_SQL)
+            cur.execute(POPULATE_FTS_SQL)
+            for trigger_sql in CREATE_FTS_TRIGGERS_SQL:
+                cur.execute(trigger_sql)
+            self.connection.commit()
+            logging.info("Log search index created")
+        except sqlite3.Error as error:
+            self.connection.rollback()
+            raise Exception(f"Failed to create log search index: {error}")
+        finally:
+            cur.close()
+
+    def fetch_log_users(self):
+        """``(user_id, fullname)`` of every user the viewer can filter on."""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(FETCH_LOG_USERS_SQL)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    @staticmethod
+    def flush_logs():
+        """Wait until the events queued so far are in the database."""
+        get_log_writer().flush()
+
+    def query_logs(self, query: LogQuery, cursor=None, limit=500):
+        """One page of the logs ``query`` selects and the cursor of the next, see fetch_log_page.
+
+        Reads the archives when the time range reaches back to them.
+        """
+        if query.since is None:
+            return fetch_log_page(self.connection, query, cursor, limit)
+        return fetch_history_page(self.database_name, query, cursor, limit)
+
+    def iter_logs(self, query: LogQuery, page_size=500):
+        """Every log ``query`` selects, read page by page, such as for an export."""
+        cursor = None
+        while True:
+            page, cursor = self.query_logs(query, cursor, page_size)
+            yield from page
+            if cursor is None:
+                return
+
+    def fetch_table_log(self, query: LogQuery = None) -> list[LogTableData]:
+        self.flush_logs()
+        return list(self.iter_logs(query or LogQuery(descending=False)))
 
     @staticmethod
     def write_log(username, message):
-        connection = sqlite3.connect(DATABASE_NAME)
-        cur = connection.cursor()
+        """Queue an audit log event, it is written in the background by the LogWriter."""
+        get_log_writer().write(username, message)
+
+    def search_log(self, text, limit=100, offset=0) -> list[LogSearchResult]:
+        """Logs whose message holds every word of ``text``, best match first.
+
+        Diacritics and case are ignored. Only the LOG_SEARCH_WINDOW most
+        recent matches are ranked; page through them with ``offset``.
+        """
+        match = build_match_query(text)
+        if match is None:
+            return []
+        self.flush_logs()
+        cur = self.connection.cursor()
         try:
-            cur.execute("SELECT id FROM users WHERE username = ?", (username,))
-            user_id = cur.fetchone()[0]
             cur.execute(
-                "insert into logs (user_id, message) values (?, ?)", (user_id, message)
+                SEARCH_LOG_SQL,
+                {"match": match, "window": LOG_SEARCH_WINDOW, "limit": limit, "offset": offset},
             )
-            if cur.rowcount > 0:
-                connection.commit()
-                logging.info(f"Log for user '{username}' successfully")
-            else:
-                connection.rollback()
-                logging.error(f"Error: Log for user '{username}' failed")
-        except Exception as e:
-            logging.error(f"Error: Log for user '{username}' failed: {str(e)}")
+            return [LogSearchResult(*item) for item in cur.fetchall()]
         finally:
             cur.close()
-            connection.close()
-
-    def search_log(self, message_pattern):
-        cur = self.connection.cursor()
-        cur.execute(
-            "SELECT id, user_id, message, created_at, updated_at FROM logs WHERE message LIKE %?%",
-            (message_pattern,),
-        )
-        return [LogDto(*item) for item in cur.fetchall()]
 
     def get_log_for_user(self, username):
         cur = self.connection.cursor()
-        cur.execute("SELECT id FROM users WHERE username = ?", (username,))
-        user_id = cur.fetchone()[0]
-        cur.execute(
-            "SELECT id, user_id, message, created_at, updated_at FROM logs WHERE user_id = ?",
-            (user_id,),
-        )
-        return [LogDto(*item) for item in cur.fetchall()]
+        try:
+            cur.execute(FETCH_USER_LOGS_SQL, (username,))
+            return [LogDto(*item) for item in cur.fetchall()]
+        finally:
+            cur.close()
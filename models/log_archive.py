@@ -0,0 +1,277 @@
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from common.time import get_timezone
+from configs import (
+    DATABASE_NAME,
+    LOG_ARCHIVE_BATCH_SIZE,
+    LOG_ARCHIVE_PATH,
+    LOG_PURGE_DAYS,
+    LOG_RETENTION_DAYS,
+    TIMEZONE,
+)
+from sql_statements.log import (
+    ARCHIVE_BATCH_SQL,
+    CREATE_CREATED_AT_INDEX_SQL,
+    CREATE_TABLE_SQL,
+    CREATE_USER_CREATED_AT_INDEX_SQL,
+    DELETE_LOG_BATCH_SQL,
+    FETCH_ARCHIVE_BATCH_SQL,
+    OLDEST_LOG_SQL,
+)
+
+_ARCHIVE_NAME = re.compile(r"^logs_(\d{4})_(\d{2})\.db$")
+_DAY = 24 * 60 * 60
+# Databases SQLite attaches to one connection unless built with a higher
+# SQLITE_MAX_ATTACHED
+MAX_ATTACHED_ARCHIVES = 10
+
+
+def month_start(timestamp, zone=TIMEZONE):
+    """Epoch seconds of the first instant of the local month holding ``timestamp``."""
+    moment = datetime.datetime.fromtimestamp(timestamp, get_timezone(zone))
+    return int(moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0).timestamp())
+
+
+def next_month_start(start, zone=TIMEZONE):
+    moment = datetime.datetime.fromtimestamp(start, get_timezone(zone))
+    following = (moment.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    return int(following.timestamp())
+
+
+def archive_file_name(start, zone=TIMEZONE):
+    moment = datetime.datetime.fromtimestamp(start, get_timezone(zone))
+    return f"logs_{moment.year:04d}_{moment.month:02d}.db"
+
+
+def list_archives(archive_path=LOG_ARCHIVE_PATH, zone=TIMEZONE):
+    """``(month start, month end, path)`` of every archive file, oldest first."""
+    archives = []
+    if not os.path.isdir(archive_path):
+        return archives
+    timezone = get_timezone(zone)
+    for name in os.listdir(archive_path):
+        match = _ARCHIVE_NAME.match(name)
+        if match is None:
+            continue
+        start = int(
+            datetime.datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone).timestamp()
+        )
+        archives.append((start, next_month_start(start, zone), os.path.join(archive_path, name)))
+    return sorted(archives)
+
+
+def split_history_range(
+    since, until=None, archive_path=LOG_ARCHIVE_PATH, limit=MAX_ATTACHED_ARCHIVES
+):
+    """[since, until) cut at month starts into ``(since, until)`` parts, oldest first.
+
+    Each part overlaps at most ``limit`` archives, so connect_logs can
+    attach all of them; a range over fewer archives is a single part.
+    """
+    starts = [
+        start
+        for start, end, _ in list_archives(archive_path)
+        if end > since and (until is None or start < until)
+    ]
+    bounds = [since, *starts[limit::limit], until]
+    return list(zip(bounds, bounds[1:]))
+
+
+def connect_logs(database_name=DATABASE_NAME, since=None, until=None, archive_path=LOG_ARCHIVE_PATH):
+    """A connection on which ``logs`` holds every log logged in [since, until).
+
+    Without ``since`` only the main database is read. Otherwise the archive
+    of each month overlapping the range is attached read-only as
+    ``archive_<n>``, which fetch_log_page reads along with main.logs. Ranges
+    over more archives than can be attached are read in parts, see
+    split_history_range.
+    """
+    connection = sqlite3.connect(database_name, uri=True)
+    if since is None:
+        return connection
+    archives = [
+        archive
+        for start, end, archive in list_archives(archive_path)
+        if end > since and (until is None or start < until)
+    ]
+    if not archives:
+        return connection
+    limit = (
+        connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if hasattr(connection, "getlimit")
+        else MAX_ATTACHED_ARCHIVES
+    )
+    if len(archives) > limit:
+        connection.close()
+        raise Exception(
+            f"Error: the range spans {len(archives)} archived months, at most {limit} can be read at once"
+        )
+    for index, archive in enumerate(archives):
+        connection.execute(
+            f"ATTACH DATABASE ? AS archive_{index}",
+            (f"{Path(archive).absolute().as_uri()}?mode=ro",),
+        )
+    return connection
+
+
+def attached_archives(connection):
+    """Schema names of the archives connect_logs attached to ``connection``."""
+    return [
+        name
+        for _, name, _ in connection.execute("PRAGMA database_list")
+        if name.startswith("archive_")
+    ]
+
+
+@dataclass
+class ArchiveReport:
+    # archive file name -> rows moved into it
+    archived: dict[str, int] = field(default_factory=dict)
+    # rows past the purge horizon deleted without being archived
+    purged: int = 0
+    removed_files: list[str] = field(default_factory=list)
+
+
+class LogArchiver:
+    """Moves old audit logs out of the main database.
+
+    Logs older than ``retention_days`` are copied into one archive database
+    per local month, ``logs_YYYY_MM.db`` in ``archive_path``, and deleted
+    from the main table. Logs and archive files older than ``purge_days``
+    are deleted outright. Rows move in short batches of ``batch_size``, each
+    its own transaction with a pause after it, so the log writer and the
+    application never wait long for the database. The pages freed in the
+    main database are reused by new rows; VACUUM gives them back to the disk.
+    """
+
+    def __init__(
+        self,
+        database_name=DATABASE_NAME,
+        archive_path=LOG_ARCHIVE_PATH,
+        retention_days=LOG_RETENTION_DAYS,
+        purge_days=LOG_PURGE_DAYS,
+        batch_size=LOG_ARCHIVE_BATCH_SIZE,
+        pause=0.05,
+        zone=TIMEZONE,
+    ):
+        if (
+            retention_days is not None
+            and purge_days is not None
+            and purge_days < retention_days
+        ):
+            raise Exception("Error: logs must be kept at least as long as they stay in the main database")
+        self._database_name = database_name
+        self._archive_path = archive_path
+        self._retention_days = retention_days
+        self._purge_days = purge_days
+        self._batch_size = batch_size
+        self._pause = pause
+        self._zone = zone
+        self.report = ArchiveReport()
+        self.connection = None
+
+    def run(self, now=None) -> ArchiveReport:
+        now = int(time.time()) if now is None else now
+        self.connection = sqlite3.connect(self._database_name, timeout=30)
+        try:
+            if self._purge_days is not None:
+                self._purge(now - self._purge_days * _DAY)
+            if self._retention_days is not None:
+                self._archive(now - self._retention_days * _DAY)
+        finally:
+            self.connection.close()
+        logging.info(
+            f"Archived {sum(self.report.archived.values())} logs, purged {self.report.purged}, "
+            f"removed {len(self.report.removed_files)} archive files"
+        )
+        return self.report
+
+    def _batches(self, before):
+        """``(last created_at, last id)`` of each batch of logs older than ``before``."""
+        while True:
+            rows = self.connection.execute(
+                FETCH_ARCHIVE_BATCH_SQL, {"before": before, "batch_size": self._batch_size}
+            ).fetchall()
+            if not rows:
+                return
+            yield rows[-1], len(rows)
+            time.sleep(self._pause)
+
+    def _purge(self, horizon):
+        for (last_created_at, last_id), count in self._batches(horizon):
+            with self.connection:
+                self.connection.execute(
+                    DELETE_LOG_BATCH_SQL,
+                    {"before": horizon, "last_created_at": last_created_at, "last_id": last_id},
+                )
+            self.report.purged += count
+        for _, end, archive in list_archives(self._archive_path, self._zone):
+            if end <= horizon:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(archive + suffix):
+                        os.remove(archive + suffix)
+                self.report.removed_files.append(os.path.basename(archive))
+
+    def _archive(self, cutoff):
+        while True:
+            oldest = self.connection.execute(OLDEST_LOG_SQL, {"before": cutoff}).fetchone()[0]
+            if oldest is None:
+                return
+            start = month_start(oldest, self._zone)
+            before = min(next_month_start(start, self._zone), cutoff)
+            self._archive_month(start, before)
+
+    def _archive_month(self, start, before):
+        """Move the logs of the month starting at ``start`` logged before ``before``."""
+        os.makedirs(self._archive_path, exist_ok=True)
+        name = archive_file_name(start, self._zone)
+        archive = os.path.join(self._archive_path, name)
+        self._init_archive(archive)
+        self.connection.execute("ATTACH DATABASE ? AS archive", (archive,))
+        try:
+            for (last_created_at, last_id), count in self._batches(before):
+                params = {"before": before, "last_created_at": last_created_at, "last_id": last_id}
+                # Copied and committed before the delete, a crash in between
+                # leaves rows in both and the next run finishes the move
+                with self.connection:
+                    self.connection.execute(ARCHIVE_BATCH_SQL, params)
+                with self.connection:
+                    self.connection.execute(DELETE_LOG_BATCH_SQL, params)
+                self.report.archived[name] = self.report.archived.get(name, 0) + count
+        finally:
+            self.connection.execute("DETACH DATABASE archive")
+
+    @staticmethod
+    def _init_archive(archive):
+        connection = sqlite3.connect(archive)
+        try:
+            connection.execute(CREATE_TABLE_SQL)
+            connection.execute(CREATE_CREATED_AT_INDEX_SQL)
+            connection.execute(CREATE_USER_CREATED_AT_INDEX_SQL)
+            connection.commit()
+        except sqlite3.Error as error:
+            raise Exception(f"Failed to create log archive '{archive}': {error}")
+        finally:
+            connection.close()
+
+
+def archive_logs_in_background():
+    """Run the LogArchiver on a daemon thread, an interrupted run is finished by the next one."""
+
+    def run():
+        try:
+            LogArchiver().run()
+        except Exception as error:
+            logging.error(f"Error: log archival failed: {error}")
+
+    thread = threading.Thread(target=run, name="log-archiver", daemon=True)
+    thread.start()
+    return thread
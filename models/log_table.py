@@ -0,0 +1,219 @@
+import dataclasses
+import logging
+import traceback
+
+from PyQt6.QtCore import (
+    QAbstractTableModel,
+    QModelIndex,
+    QObject,
+    QThreadPool,
+    Qt,
+    pyqtSignal,
+)
+
+from common.worker import CancellableRunnable
+from configs import LOG_TABLE_COLUMNS
+from models.log import LogQuery, fetch_history_page, search_beyond_window
+
+
+class LogPageLoaderSignals(QObject):
+    # generation, [LogTableData], cursor of the next page or None after the last
+    page_loaded = pyqtSignal(int, object, object)
+    # generation, whether matches older than the search window are left out
+    window_checked = pyqtSignal(int, bool)
+    failed = pyqtSignal(int, str)
+
+
+class LogPageLoader(CancellableRunnable):
+    """Reads one page of the log viewer on a pool thread, on its own connection."""
+
+    def __init__(self, database_name, query, cursor, limit, generation):
+        super().__init__()
+        self.signals = LogPageLoaderSignals()
+        self._database_name = database_name
+        self._query = query
+        self._cursor = cursor
+        self._limit = limit
+        self._generation = generation
+
+    def run(self):
+        try:
+            # Archived months are read when the time range reaches them
+            page, cursor = fetch_history_page(
+                self._database_name, self._query, self._cursor, self._limit
+            )
+            if not self.is_cancelled():
+                self.signals.page_loaded.emit(self._generation, page, cursor)
+            # Checked once per search, after its first page is shown
+            if self._query.text and self._cursor is None and not self.is_cancelled():
+                self.signals.window_checked.emit(
+                    self._generation, search_beyond_window(self._database_name, self._query)
+                )
+        except Exception:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(self._generation, traceback.format_exc())
+
+
+class LogTableModel(QAbstractTableModel):
+    """Table model of the audit log that loads pages as the view scrolls.
+
+    Pages are read with keyset pagination on (sort column, id) by a
+    ``LogPageLoader``, so the cost of a page does not grow with how far the
+    user has scrolled and the GUI thread never waits on SQL. The first page
+    is small so the dialog fills at once whatever the size of the table.
+    Sorting by time and filtering change the query and start over from the top.
+    While searching, rows are ranked by relevance whatever the sort column.
+    """
+
+    # Traceback of a page that could not be read, paging stops until the
+    # query changes
+    load_failed = pyqtSignal(str)
+    # True while the search matches more logs than it ranks, see LOG_SEARCH_WINDOW
+    search_limited = pyqtSignal(bool)
+
+    _first_page_size = 100
+    _page_size = 500
+    _sort_keys = {2: "created_at"}
+
+    def __init__(self, log_model, parent=None):
+        super().__init__(parent)
+        self._database_name = log_model.database_name
+        self._query = LogQuery()
+        self._rows = []
+        self._cursor = None
+        self._done = False
+        self._loading = False
+        # Pages from loaders started before the last reset are dropped
+        self._generation = 0
+        self._cancel_event = None
+        # Keeps the signals of the running loader alive until its page arrives
+        self._loader_signals = None
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(1)
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(LOG_TABLE_COLUMNS)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        column = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return row.username
+            if column == 1:
+                # Search results show the part of the message that matched
+                return row.snippet or row.message
+            if column == 2:
+                return row.created_at
+        elif role == Qt.ItemDataRole.ToolTipRole and column == 1:
+            return row.message
+        return None
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return LOG_TABLE_COLUMNS[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return False
+        return not self._done and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._done or self._loading:
+            return
+        self._loading = True
+        loader = LogPageLoader(
+            self._database_name,
+            self._query,
+            self._cursor,
+            self._page_size if self._rows else self._first_page_size,
+            self._generation,
+        )
+        loader.signals.page_loaded.connect(self._on_page_loaded)
+        loader.signals.window_checked.connect(self._on_window_checked)
+        loader.signals.failed.connect(self._on_load_failed)
+        self._cancel_event = loader.cancel_event
+        self._loader_signals = loader.signals
+        self._thread_pool.start(loader)
+
+    def _on_page_loaded(self, generation, page, cursor):
+        if generation != self._generation:
+            return
+        self._loading = False
+        self._cursor = cursor
+        self._done = cursor is None
+        if page:
+            first = len(self._rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self._rows.extend(page)
+            self.endInsertRows()
+
+    def _on_window_checked(self, generation, beyond_window):
+        if generation == self._generation:
+            self.search_limited.emit(beyond_window)
+
+    def _on_load_failed(self, generation, error):
+        if generation == self._generation:
+            self._loading = False
+            self._done = True
+            self.load_failed.emit(error)
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        sort_key = self._sort_keys.get(column)
+        if sort_key is None:
+            # Only sort keys with an index, see LOG_SORT_KEYS
+            return
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_key, descending) == (self._query.sort_key, self._query.descending):
+            return
+        self.set_query(dataclasses.replace(self._query, sort_key=sort_key, descending=descending))
+
+    def set_filter(self, user_id=None, since=None, until=None):
+        """Only show the rows of ``user_id`` logged in [since, until), None for no limit."""
+        self.set_query(
+            dataclasses.replace(self._query, user_id=user_id, since=since, until=until)
+        )
+
+    def set_search(self, text):
+        """Only show the logs matching ``text``, by relevance; empty shows every log."""
+        self.set_query(dataclasses.replace(self._query, text=text.strip() or None))
+
+    def get_query(self) -> LogQuery:
+        return self._query
+
+    def set_query(self, query: LogQuery):
+        self._query = query
+        self.reload()
+
+    def reload(self):
+        """Drop every loaded row and fetch the first page again."""
+        self._generation += 1
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self.beginResetModel()
+        self._rows = []
+        self._cursor = None
+        self._done = False
+        self._loading = False
+        self.endResetModel()
+        self.search_limited.emit(False)
+        self.fetchMore()
+
+    def shutdown(self):
+        self._generation += 1
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._thread_pool.waitForDone()
@@ -0,0 +1,163 @@
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import traceback
+
+from configs import DATABASE_NAME, LOG_BATCH_SIZE, LOG_QUEUE_SIZE
+from sql_statements.log import INSERT_LOG_SQL
+
+_STOP = object()
+
+
+class LogWriter:
+    """Writes audit log events on a thread of its own, in batches.
+
+    ``write`` only queues the event with the time it happened, so callers on
+    the GUI thread never wait on SQLite. The writer thread takes whatever is
+    queued, up to ``batch_size`` events, and inserts it with ``executemany``
+    in one transaction; user ids are looked up once per username. The queue
+    is bounded: when the writer falls that far behind, ``write`` waits for
+    room rather than dropping audit events. A batch that fails is logged and
+    dropped, the thread goes on with the next one; should the thread stop
+    anyway, events are written on the caller's thread instead of waiting on
+    it. ``close`` writes what is still queued and stops the thread.
+    """
+
+    def __init__(
+        self,
+        database_name=DATABASE_NAME,
+        queue_size=LOG_QUEUE_SIZE,
+        batch_size=LOG_BATCH_SIZE,
+    ):
+        self._database_name = database_name
+        self._batch_size = batch_size
+        self._queue = queue.Queue(queue_size)
+        self._user_ids = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, username, message):
+        if self._closed:
+            logging.error(f"Error: Log for user '{username}' failed: the log writer is closed")
+            return
+        event = (username, message, int(time.time()))
+        if not self._put(event):
+            self._write_directly([event])
+
+    def flush(self):
+        """Block until every event queued so far is written."""
+        pending = self._queue.all_tasks_done
+        with pending:
+            while self._queue.unfinished_tasks and self._thread.is_alive():
+                pending.wait(1)
+        if self._queue.unfinished_tasks:
+            self._write_directly(self._drain())
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._put(_STOP)
+        self._thread.join()
+        if self._queue.unfinished_tasks:
+            self._write_directly(self._drain())
+
+    def _drain(self):
+        events = []
+        while True:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                return events
+            self._queue.task_done()
+            if event is not _STOP:
+                events.append(event)
+
+    def _write_directly(self, events):
+        logging.error("Error: the log writer thread has stopped, writing logs directly")
+        connection = sqlite3.connect(self._database_name, timeout=30)
+        try:
+            self._write_batch(connection, events)
+        finally:
+            connection.close()
+
+    def _put(self, event):
+        """Queue ``event`` unless the thread stops first, False if it has."""
+        while self._thread.is_alive():
+            try:
+                self._queue.put(event, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        connection = sqlite3.connect(self._database_name, timeout=30)
+        try:
+            stopping = False
+            while True:
+                # Wait for the first event, then take what is already queued.
+                # Once stopping, only what is left in the queue is written
+                events = [] if stopping else [self._queue.get()]
+                while len(events) < self._batch_size:
+                    try:
+                        events.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not events:
+                    return
+                stopping = stopping or any(event is _STOP for event in events)
+                try:
+                    self._write_batch(connection, [event for event in events if event is not _STOP])
+                except Exception:
+                    logging.error(traceback.format_exc())
+                finally:
+                    for _ in events:
+                        self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _write_batch(self, connection, events):
+        try:
+            rows = []
+            for username, message, created_at in events:
+                user_id = self._get_user_id(connection, username)
+                if user_id is None:
+                    logging.error(f"Error: Log for user '{username}' failed: user not found")
+                    continue
+                rows.append((user_id, message, created_at, created_at))
+            if not rows:
+                return
+            with connection:
+                connection.executemany(INSERT_LOG_SQL, rows)
+        except sqlite3.Error as error:
+            logging.error(f"Error: writing {len(events)} logs failed: {error}")
+
+    def _get_user_id(self, connection, username):
+        user_id = self._user_ids.get(username)
+        if user_id is None:
+            row = connection.execute(
+                "SELECT id FROM users WHERE username = ?", (username,)
+            ).fetchone()
+            if row is None:
+                return None
+            user_id = self._user_ids[username] = row[0]
+        return user_id
+
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """The application's log writer, started on first use and closed at exit."""
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = LogWriter()
+            atexit.register(_log_writer.close)
+        return _log_writer
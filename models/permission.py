@@ -33,7 +33,7 @@ class PermissionDTO:
 @dataclass
 class PermissionItemDTO:
     username: str
-    permissions: dict[str, list[str]]
+    permissions: dict[int, list[str]]
 
 
 @dataclass
@@ -115,12 +115,12 @@ class PermissionModel(NativeSqlite3Model):
         cur = self.connection.cursor()
         cur.execute(self._get_item_permission_by_username, (username,))
         rows = cur.fetchall()
-        permissions: dict[str, list[str]] = {}
-        for item, permission in rows:
-            if item not in permissions.keys():
-                permissions[item] = [permission]
+        permissions: dict[int, list[str]] = {}
+        for item_id, permission in rows:
+            if item_id not in permissions.keys():
+                permissions[item_id] = [permission]
             else:
-                permissions[item].append(permission)
+                permissions[item_id].append(permission)
         cur.close()
         return PermissionItemDTO(username, permissions)
 
@@ -253,26 +253,24 @@ class PermissionModel(NativeSqlite3Model):
         return PermissionDTO(username, [r[0] for r in rows], "admin" in username)
 
     def assign_permissions_to_users_for_file(
-        self, item_name: str, username: str, permissions: list[str]
+        self, item_id: int, username: str, permissions: list[str]
     ):
         """
         Assign multiple users and permissions to a single file.
 
-        :param item_name: Path to the SQLite database.
-        :param username: The name of the file (original_name in the items table).
-        :param permissions: List of usernames to assign permissions to.
+        :param item_id: The id of the file or folder in the items table.
+        :param username: The user receiving the permissions.
+        :param permissions: List of permissions to assign.
         """
 
         cur = self.connection.cursor()
 
         try:
-            # Fetch item_id using the item's original name
-            cur.execute("SELECT id FROM items WHERE original_name = ?", (item_name,))
-            item = cur.fetchone()
-            if not item:
-                logging.warning(f"Item '{item_name}' not found.")
+            # Make sure the item still exists
+            cur.execute("SELECT id FROM items WHERE id = ?", (item_id,))
+            if not cur.fetchone():
+                logging.warning(f"Item with id '{item_id}' not found.")
                 return
-            item_id = item[0]
 
             # Fetch user_id using the username
             cur.execute("SELECT id FROM users WHERE username = ?", (username,))
@@ -310,7 +308,7 @@ class PermissionModel(NativeSqlite3Model):
             self.connection.commit()
             cur.close()
             logging.info(
-                f"Permissions successfully assigned to users for item '{item_name}'."
+                f"Permissions successfully assigned to users for item '{item_id}'."
             )
 
         except sqlite3.Error as e:
@@ -321,17 +319,15 @@ class PermissionModel(NativeSqlite3Model):
             cur.close()
 
     def unassign_permissions_to_users_for_file(
-        self, item_name: str, username: str, permissions: list[str]
+        self, item_id: int, username: str, permissions: list[str]
     ):
         cur = self.connection.cursor()
         try:
-            # Fetch item_id using the item's original name
-            cur.execute("SELECT id FROM items WHERE original_name = ?", (item_name,))
-            item = cur.fetchone()
-            if not item:
-                logging.warning(f"Item '{item_name}' not found.")
+            # Make sure the item still exists
+            cur.execute("SELECT id FROM items WHERE id = ?", (item_id,))
+            if not cur.fetchone():
+                logging.warning(f"Item with id '{item_id}' not found.")
                 return
-            item_id = item[0]
 
             # Fetch user_id using the username
             cur.execute("SELECT id FROM users WHERE username = ?", (username,))
@@ -369,7 +365,7 @@ class PermissionModel(NativeSqlite3Model):
             self.connection.commit()
             cur.close()
             logging.info(
-                f"Permissions successfully unassigned to users for item '{item_name}'."
+                f"Permissions successfully unassigned to users for item '{item_id}'."
             )
 
         except sqlite3.Error as e:
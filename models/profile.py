@@ -4,7 +4,7 @@ from dataclasses import dataclass
 
 from common.model import NativeSqlite3Model
 from configs import DATABASE_NAME
-from sql_statements.profile import CREATE_TABLE_SQL, INIT_DATA
+from sql_statements.profile import CREATE_TABLE_SQL, CREATE_USER_ID_INDEX_SQL, INIT_DATA
 
 
 @dataclass
@@ -14,8 +14,8 @@ class ProfileDto:
     fullname: str
     position: int
     phone_number: str
-    created_at: str
-    updated_at: str
+    created_at: int
+    updated_at: int
 
 
 class ProfileModel(NativeSqlite3Model):
@@ -28,11 +28,14 @@ class ProfileModel(NativeSqlite3Model):
 
     def __init__(self, database_name=DATABASE_NAME, table_create_sql=CREATE_TABLE_SQL):
         super().__init__(database_name, table_create_sql)
+        self._migrate_timestamps("profiles")
         self._init_data()
 
     def _init_data(self):
         cur = self.connection.cursor()
         try:
+            # Items and logs join profiles on user_id
+            cur.execute(CREATE_USER_ID_INDEX_SQL)
             cur.execute(self._init_data_sql)
             self.connection.commit()
         except sqlite3.Error as error:
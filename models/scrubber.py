@@ -0,0 +1,301 @@
+import json
+import logging
+import lzma
+import os
+import sqlite3
+import time
+import zlib
+from dataclasses import asdict, dataclass, field
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from common.compression import decompress_file
+from common.storage import BLOB_NAME_PATTERN, FANOUT_NAME_PATTERN, BlobStore, hash_file
+from configs import DATABASE_NAME, FILES_ROOT_PATH
+from models.chunk_store import CHUNKS_DIRECTORY, ChunkStore
+from sql_statements.blob import (
+    FETCH_BLOB_BATCH_SQL,
+    FETCH_LEGACY_FILE_CODES_SQL,
+    BLOB_REFCOUNT_MISMATCH_SQL,
+    DANGLING_ITEMS_SQL,
+)
+from sql_statements.chunk import (
+    CHUNKED_CODEC,
+    BLOB_EXISTS_SQL,
+    FETCH_CHUNK_BATCH_SQL,
+    CHUNK_EXISTS_SQL,
+    CHUNK_REFCOUNT_MISMATCH_SQL,
+    MANIFEST_SIZE_MISMATCH_SQL,
+)
+
+# Files younger than this may belong to an upload whose row is not committed yet
+STALE_UPLOAD_SECONDS = 24 * 60 * 60
+_CORRUPT_STREAM_ERRORS = (zlib.error, lzma.LZMAError, EOFError)
+if zstandard is not None:
+    _CORRUPT_STREAM_ERRORS += (zstandard.ZstdError,)
+
+
+@dataclass
+class ScrubReport:
+    started_at: int
+    finished_at: int = None
+    interrupted: bool = False
+    # Metrics
+    blobs_checked: int = 0
+    chunks_checked: int = 0
+    legacy_files_checked: int = 0
+    files_walked: int = 0
+    bytes_read: int = 0
+    # Problems, one dict each
+    missing: list = field(default_factory=list)
+    corrupt: list = field(default_factory=list)
+    orphans: list = field(default_factory=list)
+    mismatches: list = field(default_factory=list)
+
+    @property
+    def problems(self):
+        return len(self.missing) + len(self.corrupt) + len(self.orphans) + len(self.mismatches)
+
+    def to_dict(self):
+        report = asdict(self)
+        elapsed = max((self.finished_at or int(time.time())) - self.started_at, 1)
+        report["seconds"] = elapsed
+        report["bytes_per_second"] = self.bytes_read // elapsed
+        return report
+
+    def write(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as report_file:
+            json.dump(self.to_dict(), report_file, indent=2)
+
+
+class _Throttle:
+    """Sleeps so reads average at most ``rate`` bytes per second, no limit when None."""
+
+    def __init__(self, rate):
+        self._rate = rate
+        self._started = time.monotonic()
+        self._consumed = 0
+
+    def consume(self, size):
+        if not self._rate:
+            return
+        self._consumed += size
+        ahead = self._consumed / self._rate - (time.monotonic() - self._started)
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _drop_cache(file_path):
+    """Keep scrubbed files out of the page cache, where they would evict hot data."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+
+class StorageScrubber:
+    """Reconciles files_storage with the database and re-reads every blob.
+
+    Every blob and chunk is stored under the SHA-256 of its content, which
+    is checked against a fresh read; compressed blobs are decompressed on the
+    fly, chunked blobs are checked chunk by chunk and against their manifest.
+    Files nothing in the database points at are reported as orphans, rows
+    whose file is gone as missing. Nothing is repaired, the report says what
+    to look at.
+
+    Rows are read in keyset batches on a connection of its own and reads are
+    throttled to ``rate`` bytes per second with a pause after each batch, so
+    the application stays responsive while a large store is verified.
+    ``is_cancelled()`` stops it between files, ``report`` then holds what was
+    found so far.
+    """
+
+    def __init__(
+        self,
+        database_name=DATABASE_NAME,
+        root_path=FILES_ROOT_PATH,
+        rate=None,
+        batch_size=500,
+        pause=0.1,
+        is_cancelled=None,
+    ):
+        self._database_name = database_name
+        self._root_path = root_path
+        self._blob_store = BlobStore(root_path)
+        self._chunk_store = ChunkStore(database_name, root_path)
+        self._throttle = _Throttle(rate)
+        self._batch_size = batch_size
+        self._pause = pause
+        self._is_cancelled = is_cancelled or (lambda: False)
+        self.report = ScrubReport(int(time.time()))
+        self.connection = None
+
+    def run(self) -> ScrubReport:
+        self.connection = sqlite3.connect(self._database_name, timeout=30)
+        try:
+            for check in (
+                self._check_references,
+                self._check_blobs,
+                self._check_chunks,
+                self._check_legacy_files,
+                self._check_orphans,
+            ):
+                if self._is_cancelled():
+                    self.report.interrupted = True
+                    break
+                check()
+        finally:
+            self.connection.close()
+            self.report.finished_at = int(time.time())
+        logging.info(
+            f"Scrubbed {self.report.blobs_checked} blobs, {self.report.chunks_checked} chunks "
+            f"and {self.report.legacy_files_checked} legacy files, {self.report.bytes_read} bytes "
+            f"read, {self.report.problems} problems found"
+        )
+        return self.report
+
+    def _query(self, sql, params=()):
+        cur = self.connection.cursor()
+        try:
+            cur.execute(sql, params)
+            return cur.fetchall()
+        finally:
+            cur.close()
+
+    def _batches(self, sql):
+        """Rows of a keyset query on the hash, one short read per batch."""
+        last_hash = ""
+        while not self._is_cancelled():
+            rows = self._query(sql, (last_hash, self._batch_size))
+            if not rows:
+                return
+            yield rows
+            last_hash = rows[-1][0]
+            time.sleep(self._pause)
+        self.report.interrupted = True
+
+    def _check_references(self):
+        for blob_hash, refcount, items in self._query(BLOB_REFCOUNT_MISMATCH_SQL):
+            self.report.mismatches.append(
+                {"kind": "blob refcount", "hash": blob_hash, "recorded": refcount, "actual": items}
+            )
+        for chunk_hash, refcount, blobs in self._query(CHUNK_REFCOUNT_MISMATCH_SQL):
+            self.report.mismatches.append(
+                {"kind": "chunk refcount", "hash": chunk_hash, "recorded": refcount, "actual": blobs}
+            )
+        for blob_hash, size, chunk_size in self._query(MANIFEST_SIZE_MISMATCH_SQL):
+            self.report.mismatches.append(
+                {"kind": "manifest size", "hash": blob_hash, "recorded": size, "actual": chunk_size}
+            )
+        for item_id, blob_hash in self._query(DANGLING_ITEMS_SQL):
+            self.report.missing.append({"kind": "blob row", "hash": blob_hash, "item_id": item_id})
+
+    def _check_blobs(self):
+        for rows in self._batches(FETCH_BLOB_BATCH_SQL):
+            for blob_hash, size, codec in rows:
+                if self._is_cancelled():
+                    return
+                if codec == CHUNKED_CODEC:
+                    # Its chunks are verified on their own
+                    continue
+                self._verify("blob", self._blob_store.blob_path(blob_hash), blob_hash, size, codec)
+                self.report.blobs_checked += 1
+
+    def _check_chunks(self):
+        for rows in self._batches(FETCH_CHUNK_BATCH_SQL):
+            for chunk_hash, size in rows:
+                if self._is_cancelled():
+                    return
+                self._verify("chunk", self._chunk_store.chunk_path(chunk_hash), chunk_hash, size)
+                self.report.chunks_checked += 1
+
+    def _check_legacy_files(self):
+        """Files from before the blob store have no checksum, only their presence is checked."""
+        for code, in self._query(FETCH_LEGACY_FILE_CODES_SQL):
+            file_path = os.path.join(self._root_path, code)
+            if not os.path.exists(file_path):
+                self.report.missing.append({"kind": "legacy file", "path": file_path})
+            self.report.legacy_files_checked += 1
+
+    def _verify(self, kind, file_path, expected_hash, size, codec=None):
+        if not os.path.exists(file_path):
+            self.report.missing.append({"kind": kind, "hash": expected_hash, "path": file_path})
+            return
+
+        read = [0]
+
+        def on_progress(done):
+            self._throttle.consume(done - read[0])
+            read[0] = done
+
+        try:
+            if codec is None:
+                verified = hash_file(file_path, on_progress=on_progress, is_cancelled=self._is_cancelled)
+            else:
+                verified = decompress_file(
+                    file_path, os.devnull, codec, on_progress, is_cancelled=self._is_cancelled
+                )
+        except _CORRUPT_STREAM_ERRORS as error:
+            verified = (None, None)
+            reason = f"{codec} stream: {error}"
+        else:
+            reason = "checksum"
+        finally:
+            self.report.bytes_read += read[0]
+        if verified is None:
+            return
+        _drop_cache(file_path)
+        if verified != (expected_hash, size):
+            logging.warning(f"Scrub: {kind} '{expected_hash}' is corrupt ({reason})")
+            self.report.corrupt.append(
+                {"kind": kind, "hash": expected_hash, "path": file_path, "reason": reason}
+            )
+
+    def _check_orphans(self):
+        """Walk the store for files no row points at."""
+        legacy_codes = {code for code, in self._query(FETCH_LEGACY_FILE_CODES_SQL)}
+        chunks_root = os.path.join(self._root_path, CHUNKS_DIRECTORY)
+        stale_before = time.time() - STALE_UPLOAD_SECONDS
+        pending = []
+        for directory, dirnames, filenames in os.walk(self._root_path):
+            dirnames[:] = [
+                name for name in dirnames
+                if FANOUT_NAME_PATTERN.fullmatch(name)
+                or (directory == self._root_path and name == CHUNKS_DIRECTORY)
+            ]
+            in_chunks = directory.startswith(chunks_root)
+            for filename in filenames:
+                if self._is_cancelled():
+                    self.report.interrupted = True
+                    return
+                file_path = os.path.join(directory, filename)
+                self.report.files_walked += 1
+                if filename.startswith(".upload-"):
+                    if os.path.getmtime(file_path) < stale_before:
+                        self.report.orphans.append({"kind": "upload temp", "path": file_path})
+                elif BLOB_NAME_PATTERN.fullmatch(filename):
+                    pending.append((in_chunks, filename, file_path))
+                elif directory != self._root_path or filename not in legacy_codes:
+                    self.report.orphans.append({"kind": "unknown", "path": file_path})
+                if len(pending) == self._batch_size:
+                    self._check_orphan_batch(pending, stale_before)
+                    pending = []
+        self._check_orphan_batch(pending, stale_before)
+
+    def _check_orphan_batch(self, pending, stale_before):
+        for in_chunks, file_hash, file_path in pending:
+            sql = CHUNK_EXISTS_SQL if in_chunks else BLOB_EXISTS_SQL
+            if self._query(sql, (file_hash,)):
+                continue
+            if os.path.getmtime(file_path) < stale_before:
+                self.report.orphans.append(
+                    {"kind": "chunk" if in_chunks else "blob", "hash": file_hash, "path": file_path}
+                )
+        if pending:
+            time.sleep(self._pause)
@@ -0,0 +1,277 @@
+import logging
+import os
+import sqlite3
+import traceback
+import uuid
+from collections import OrderedDict
+
+from PyQt6.QtCore import QBuffer, QFile, QIODevice, QObject, QThreadPool, Qt, pyqtSignal
+from PyQt6.QtGui import QIcon, QImage, QImageReader, QPixmap
+
+from common.compression import CODECS
+from common.worker import CancellableRunnable
+from configs import (
+    THUMBNAIL_CACHE_BYTES,
+    THUMBNAIL_MEMORY_COUNT,
+    THUMBNAIL_PATH,
+    THUMBNAIL_SIZE,
+)
+from sql_statements.blob import FETCH_BLOB_CODEC_SQL
+from sql_statements.chunk import CHUNKED_CODEC, FETCH_BLOB_CHUNKS_SQL
+
+
+class ThumbnailLoaderSignals(QObject):
+    # key, thumbnail, bytes written to the disk cache (0 when read from it)
+    loaded = pyqtSignal(str, QImage, int)
+    failed = pyqtSignal(str)
+
+
+class ThumbnailLoader(CancellableRunnable):
+    """Makes the thumbnail of one image item on a pool thread.
+
+    The thumbnail is read from the disk cache when ``cached`` is set, else
+    the image is decoded at thumbnail size by ``QImageReader``, which for
+    JPEG decodes a downscaled image directly instead of the full one, and
+    written to the cache. A QImage goes back to the GUI thread, pixmaps can
+    only be made there.
+    """
+
+    def __init__(self, item_model, item, key, cache_path, cached, size=THUMBNAIL_SIZE):
+        super().__init__()
+        self.signals = ThumbnailLoaderSignals()
+        self._database_name = item_model.database_name
+        self._root_path = item_model.get_root_path()
+        self._blob_store = item_model.get_blob_store()
+        self._chunk_store = item_model.get_chunk_store()
+        self._item = item
+        self._key = key
+        self._cache_path = cache_path
+        self._cached = cached
+        self._size = size
+
+    def run(self):
+        try:
+            if self.is_cancelled():
+                return
+            written = 0
+            image = QImage()
+            if self._cached and image.load(self._cache_path):
+                # The modification time orders the disk cache for eviction
+                os.utime(self._cache_path)
+            else:
+                image = self._decode()
+                if self.is_cancelled():
+                    return
+                written = self._save(image)
+            self.signals.loaded.emit(self._key, image, written)
+        except Exception:
+            logging.error(traceback.format_exc())
+            self.signals.failed.emit(self._key)
+
+    def _decode(self):
+        device = self._open_content()
+        try:
+            reader = QImageReader(device)
+            reader.setAutoTransform(True)
+            size = reader.size()
+            if size.isValid() and (size.width() > self._size or size.height() > self._size):
+                reader.setScaledSize(
+                    size.scaled(self._size, self._size, Qt.AspectRatioMode.KeepAspectRatio)
+                )
+            image = reader.read()
+            if image.isNull():
+                raise Exception(
+                    f"Error: cannot decode '{self._item.original_name}': {reader.errorString()}"
+                )
+            return image
+        finally:
+            device.close()
+
+    def _open_content(self):
+        """The stored image as a QIODevice, in memory for compressed and chunked blobs."""
+        if self._item.blob_hash is None:
+            return self._open_file(os.path.join(self._root_path, self._item.code))
+        connection = sqlite3.connect(self._database_name)
+        try:
+            row = connection.execute(FETCH_BLOB_CODEC_SQL, (self._item.blob_hash,)).fetchone()
+            codec = None if row is None else row[0]
+            if codec is None:
+                return self._open_file(self._blob_store.blob_path(self._item.blob_hash))
+            if codec == CHUNKED_CODEC:
+                chunks = []
+                for chunk_hash, in connection.execute(
+                    FETCH_BLOB_CHUNKS_SQL, (self._item.blob_hash,)
+                ):
+                    with open(self._chunk_store.chunk_path(chunk_hash), "rb") as chunk_file:
+                        chunks.append(chunk_file.read())
+                data = b"".join(chunks)
+            else:
+                decompressor = CODECS[codec][1]()
+                with open(self._blob_store.blob_path(self._item.blob_hash), "rb") as blob_file:
+                    data = decompressor.decompress(blob_file.read())
+                if hasattr(decompressor, "flush"):
+                    data += decompressor.flush()
+        finally:
+            connection.close()
+        buffer = QBuffer()
+        buffer.setData(data)
+        buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+        return buffer
+
+    @staticmethod
+    def _open_file(file_path):
+        device = QFile(file_path)
+        if not device.open(QIODevice.OpenModeFlag.ReadOnly):
+            raise Exception(f"Error: cannot open '{file_path}': {device.errorString()}")
+        return device
+
+    def _save(self, image):
+        """Write the thumbnail to the disk cache, returning its size in bytes."""
+        part_path = f"{self._cache_path}.{uuid.uuid4()}.part"
+        try:
+            image_format = "PNG" if image.hasAlphaChannel() else "JPG"
+            if not image.save(part_path, image_format):
+                raise Exception(f"Error: cannot write thumbnail '{self._cache_path}'")
+            os.replace(part_path, self._cache_path)
+        finally:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        return os.path.getsize(self._cache_path)
+
+
+class ThumbnailCache(QObject):
+    """Thumbnails of image items, keyed by blob so identical images share one.
+
+    ``icon`` only ever looks in memory: on a miss it queues a loader and
+    returns None, and ``thumbnail_ready`` is emitted once the icon is there.
+    Loaders requested last run first, so the rows on screen are served
+    before the ones scrolled past, and the oldest requests are cancelled
+    when too many are waiting. Both the in-memory icons and the thumbnail
+    files on disk are bounded and evicted least recently used first.
+    """
+
+    thumbnail_ready = pyqtSignal(str)
+
+    _max_pending = 256
+
+    def __init__(
+        self,
+        item_model,
+        parent=None,
+        cache_path=THUMBNAIL_PATH,
+        size=THUMBNAIL_SIZE,
+        cache_bytes=THUMBNAIL_CACHE_BYTES,
+        memory_count=THUMBNAIL_MEMORY_COUNT,
+    ):
+        super().__init__(parent)
+        self._item_model = item_model
+        self._cache_path = cache_path
+        self._size = size
+        self._cache_bytes = cache_bytes
+        self._memory_count = memory_count
+        self._memory: OrderedDict[str, QIcon] = OrderedDict()
+        # key -> file size, least recently used first
+        self._disk: OrderedDict[str, int] = OrderedDict()
+        self._disk_bytes = 0
+        # key -> (cancel event, signals) of each loader waiting or running
+        self._pending = OrderedDict()
+        self._failed = set()
+        self._priority = 0
+        self._thread_pool = QThreadPool(self)
+        self._thread_pool.setMaxThreadCount(2)
+        self._scan_disk()
+
+    def _scan_disk(self):
+        os.makedirs(self._cache_path, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self._cache_path):
+            if entry.is_file() and not entry.name.endswith(".part"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._disk[name] = size
+            self._disk_bytes += size
+
+    @staticmethod
+    def key(item):
+        """Blobs are named after their content, files from before the blob store after their code."""
+        return item.blob_hash or item.code
+
+    def _file_name(self, key):
+        return f"{key}_{self._size}"
+
+    def cached_path(self, item):
+        """Path of the thumbnail file of ``item``, None until it was generated."""
+        file_name = self._file_name(self.key(item))
+        if file_name not in self._disk:
+            return None
+        return os.path.join(self._cache_path, file_name)
+
+    def icon(self, item):
+        key = self.key(item)
+        icon = self._memory.get(key)
+        if icon is not None:
+            self._memory.move_to_end(key)
+            return icon
+        if key not in self._pending and key not in self._failed:
+            self._load(item, key)
+        return None
+
+    def _load(self, item, key):
+        file_name = self._file_name(key)
+        loader = ThumbnailLoader(
+            self._item_model,
+            item,
+            key,
+            os.path.join(self._cache_path, file_name),
+            file_name in self._disk,
+            self._size,
+        )
+        loader.signals.loaded.connect(self._on_loaded)
+        loader.signals.failed.connect(self._on_failed)
+        self._pending[key] = (loader.cancel_event, loader.signals)
+        if len(self._pending) > self._max_pending:
+            # Requested long ago, the row has most likely been scrolled past
+            _, (cancel_event, _) = self._pending.popitem(last=False)
+            cancel_event.set()
+        self._priority += 1
+        self._thread_pool.start(loader, self._priority)
+
+    def _on_loaded(self, key, image, written):
+        self._pending.pop(key, None)
+        self._memory[key] = QIcon(QPixmap.fromImage(image))
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_count:
+            self._memory.popitem(last=False)
+
+        file_name = self._file_name(key)
+        if written:
+            self._disk_bytes += written - self._disk.get(file_name, 0)
+            self._disk[file_name] = written
+        if file_name in self._disk:
+            self._disk.move_to_end(file_name)
+        self._evict_disk()
+        self.thumbnail_ready.emit(key)
+
+    def _on_failed(self, key):
+        self._pending.pop(key, None)
+        # Not retried until the application restarts, the category icon stays
+        self._failed.add(key)
+
+    def _evict_disk(self):
+        while self._disk_bytes > self._cache_bytes and len(self._disk) > 1:
+            file_name, size = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(os.path.join(self._cache_path, file_name))
+            except FileNotFoundError:
+                pass
+
+    def cancel_loads(self):
+        for cancel_event, _ in self._pending.values():
+            cancel_event.set()
+        self._pending.clear()
+
+    def shutdown(self):
+        self.cancel_loads()
+        self._thread_pool.waitForDone()
@@ -1,17 +1,19 @@
 import logging
 import traceback
 
-from PyQt6.QtCore import QPointF
+from PyQt6.QtCore import QPointF, Qt
 from PyQt6.QtGui import QColor
-from PyQt6.QtWidgets import QFileDialog, QMessageBox, QInputDialog, QGraphicsDropShadowEffect, QDialog
+from PyQt6.QtWidgets import QFileDialog, QMessageBox, QInputDialog, QGraphicsDropShadowEffect, QDialog, \
+    QProgressDialog
 
 from common import session
 from common.presenter import Presenter
 from messages.messages import PERMISSION_DENIED, ADD_FILE_SUCCESS, ADD_FILE_ERROR, SELECTED_FILE_ERROR, \
     FILE_REMOVE_FAIL, FILE_REMOVE_SUCCESS, OPEN_FILE_FAIL, FOLDER_CREATE_ERROR, \
-    FOLDER_SELECTED_NOT_FOUND, FOLDER_CREATE_SUCCESS, FOLDER_REMOVE_SUCCESS, FOLDER_REMOVE_ERROR, FILE_NOT_FOUND
+    FOLDER_SELECTED_NOT_FOUND, FOLDER_CREATE_SUCCESS, FOLDER_REMOVE_SUCCESS, FOLDER_REMOVE_ERROR, FILE_NOT_FOUND, \
+    IMPORT_DIRECTORY_SUCCESS, IMPORT_DIRECTORY_ERROR
 from messages.permissions import FILE_CREATE, FILE_DELETE, FILE_DOWNLOAD, FOLDER_CREATE, FOLDER_DELETE
-from models.item import ItemModel
+from models.item import ItemModel, ROOT_ITEM_ID
 from models.log import LogModel
 from ui_components.cusom_input_dialog import CustomInputDialog
 
@@ -19,6 +21,7 @@ from ui_components.cusom_input_dialog import CustomInputDialog
 class ItemPresenter(Presenter):
     def __init__(self, view):
         super().__init__(view, ItemModel())
+        self.model.get_model().root_loaded.connect(self.expand_root)
 
     def setup_view(self):
         """Set up the view with the file model."""
@@ -35,18 +38,40 @@ class ItemPresenter(Presenter):
         self.view.treeView.setAnimated(False)
         self.view.treeView.setIndentation(20)
         self.view.treeView.setSortingEnabled(True)
-        self.view.treeView.expandAll()
         self.view.treeView.setColumnWidth(0, 300)  # Column 1 width
         self.view.treeView.setColumnWidth(2, 200)  # Column 1 width
 
         # Enable multi-selection in the QTreeView
         self.view.treeView.setSelectionMode(self.view.treeView.SelectionMode.ExtendedSelection)
 
-        self.model.populate_data()
+        # Only the top level is loaded, deeper folders are fetched on expand.
+        # The root row is expanded by root_loaded once it arrives.
+        self.model.get_model().fetch_root()
+
+    def expand_root(self):
+        model = self.model.get_model()
+        self.view.treeView.expand(model.index(0, 0))
 
     def refresh_model(self):
         return self.model.refresh_model()
 
+    def get_selected_items(self):
+        """Return the ItemDTO of every selected row, once per row."""
+        tree_model = self.model.get_model()
+        return [
+            tree_model.item(index)
+            for index in self.view.treeView.selectedIndexes()
+            if index.column() == 0
+        ]
+
+    def get_target_folder_id(self):
+        """Return the folder new items go into: the selected folder, the folder
+        of the selected file, or the root folder when nothing is selected."""
+        item = self.model.get_model().item(self.view.treeView.currentIndex())
+        if item is None:
+            return ROOT_ITEM_ID
+        return item.id if item.type == "folder" else item.parent_id
+
     def handle_add_files(self):
         """Handle adding multiple files to the root directory."""
         if not session.SESSION.match_permissions(FILE_CREATE):
@@ -60,75 +85,173 @@ class ItemPresenter(Presenter):
             if not file_paths:
                 return  # User canceled the dialog
 
-            selected_index = self.view.treeView.currentIndex()
-            model = self.view.treeView.model()
-            parent_original_name = model.data(selected_index)
+            parent_id = self.get_target_folder_id()
+            uploads = self.model.upload_files(session.SESSION.get_username(), file_paths, parent_id)
+            # Owned by the view until it finishes
+            uploads.setParent(self.view)
+            self.show_upload_progress(uploads)
+            uploads.start()
+        except Exception as e:
+            # Notify the view about the failure
+            self.view.display_error(f"{ADD_FILE_ERROR}: {e}")
 
-            for file_path in file_paths:
-                username = session.SESSION.get_username()
-                self.model.create_file(username, file_path, parent_original_name)
+    def show_upload_progress(self, uploads):
+        """Show the progress of ``uploads``, connect before starting it.
+
+        The bar follows the bytes of the whole selection and the label the
+        file last reported on.
+        """
+        tree_model = self.model.get_model()
+        progress = QProgressDialog("Đang tải lên...", "Hủy", 0, 1000, self.view)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(uploads.cancel)
+
+        def on_file_progress(job_id, name, done, total):
+            percent = int(done * 100 / total) if total else 100
+            progress.setLabelText(f"Đang tải lên '{name}': {percent}%")
+
+        def on_total_progress(done, total):
+            progress.setValue(int(done * 1000 / total) if total else 1000)
+
+        def on_items_created(items):
+            for item in items:
+                tree_model.insert_item(item)
+
+        def on_finished(created, failures, cancelled):
+            progress.close()
+            uploads.deleteLater()
+            username = session.SESSION.get_username()
+            if created:
+                message = f"{created} {ADD_FILE_SUCCESS} cho {self.model.get_root_path()}."
+                LogModel.write_log(username, message)
+            if failures:
+                errors = "\n".join(f"{name}: {error}" for name, error in failures)
+                LogModel.write_log(username, f"{ADD_FILE_ERROR}: {errors}")
+                self.view.display_error(f"{ADD_FILE_ERROR}:\n{errors}")
+            elif created and not cancelled:
+                self.view.display_success(message)
+
+        uploads.file_progress.connect(on_file_progress)
+        uploads.total_progress.connect(on_total_progress)
+        uploads.items_created.connect(on_items_created)
+        uploads.finished.connect(on_finished)
+
+    def handle_import_directory(self):
+        """Import a local directory with all its subfolders and files."""
+        if not (
+            session.SESSION.match_permissions(FILE_CREATE)
+            and session.SESSION.match_permissions(FOLDER_CREATE)
+        ):
+            self.view.display_error(PERMISSION_DENIED)
+            LogModel.write_log(session.SESSION.get_username(), f"{IMPORT_DIRECTORY_ERROR}: {PERMISSION_DENIED}")
+            return
 
-            # Notify the view about the success
-            self.view.display_success(f"{', '.join(file_paths)} {ADD_FILE_SUCCESS} cho {self.model.get_root_path()}.")
-            LogModel.write_log(session.SESSION.get_username(),
-                               f"{', '.join(file_paths)} {ADD_FILE_SUCCESS} cho {self.model.get_root_path()}.")
+        try:
+            directory = QFileDialog.getExistingDirectory(self.view, "Chọn thư mục")
+            if not directory:
+                return  # User canceled the dialog
 
-            # Refresh the view
-            self.view.refresh_tree_view()
+            parent_id = self.get_target_folder_id()
+            importer = self.model.import_directory(session.SESSION.get_username(), directory, parent_id)
+            # Owned by the view until it finishes
+            importer.setParent(self.view)
+            self.show_import_progress(importer, directory)
+            importer.start()
         except Exception as e:
-            # Notify the view about the failure
-            self.view.display_error(f"{ADD_FILE_ERROR}: {e}")
+            self.view.display_error(f"{IMPORT_DIRECTORY_ERROR}: {e}")
+
+    def show_import_progress(self, importer, directory):
+        """Show the progress of ``importer``, connect before starting it."""
+        progress = QProgressDialog(f"Đang quét '{directory}'...", "Hủy", 0, 0, self.view)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(importer.cancel)
+
+        def on_scanned(folders, files):
+            progress.setLabelText(f"Đang sao chép {files} tệp trong {folders} thư mục...")
+            progress.setRange(0, 1000)
+
+        def on_progress(done, total):
+            progress.setValue(int(done * 1000 / total) if total else 1000)
+
+        def on_writing():
+            progress.setLabelText("Đang lưu vào cơ sở dữ liệu...")
+            progress.setCancelButton(None)
+
+        def on_finished(folder, failures, cancelled):
+            progress.close()
+            importer.deleteLater()
+            username = session.SESSION.get_username()
+            if folder is not None:
+                self.model.get_model().insert_item(folder)
+                message = f"{IMPORT_DIRECTORY_SUCCESS} cho '{directory}'"
+                LogModel.write_log(username, message)
+            if failures:
+                # The first errors are enough to tell what went wrong
+                errors = "\n".join(f"{path}: {error}" for path, error in failures[:20])
+                if len(failures) > 20:
+                    errors += f"\n... {len(failures) - 20} lỗi khác"
+                LogModel.write_log(username, f"{IMPORT_DIRECTORY_ERROR}: {errors}")
+                self.view.display_error(f"{IMPORT_DIRECTORY_ERROR}:\n{errors}")
+            elif folder is not None and not cancelled:
+                self.view.display_success(message)
+
+        importer.scanned.connect(on_scanned)
+        importer.progress.connect(on_progress)
+        importer.writing.connect(on_writing)
+        importer.finished.connect(on_finished)
 
     def handle_remove_files(self):
         """Handle removing multiple selected files from the file system using QTreeView."""
 
         can_all_remove = session.SESSION.match_permissions(FILE_DELETE)
         try:
-            selected_indexes = self.view.treeView.selectedIndexes()
-            selected_indexes = [value for index, value in enumerate(selected_indexes) if index % 4 == 0]
+            selected_items = self.get_selected_items()
 
-            if not selected_indexes:
+            if not selected_items:
                 self.view.display_error(SELECTED_FILE_ERROR)
                 return
 
-            # Collect unique file paths from selected indexes (to avoid duplicates)
-            file_paths = set()
-            model = self.view.treeView.model()
+            # Collect the selected files by id so same-named files in other folders are untouched
+            files = {}
             not_deleted_files = set()
-            for index in selected_indexes:
-                original_name = model.data(index)
-                if can_all_remove or session.SESSION.match_item_permissions(original_name, FILE_DELETE):
-                    file_paths.add(original_name)
+            for item in selected_items:
+                if can_all_remove or session.SESSION.match_item_permissions(item.id, FILE_DELETE):
+                    files[item.id] = item.original_name
                 else:
-                    not_deleted_files.add(original_name)
+                    not_deleted_files.add(item.original_name)
 
             if len(not_deleted_files) > 0:
                 self.view.display_error(f"Xóa {', '.join(not_deleted_files)}: {PERMISSION_DENIED}")
 
-            if len(file_paths) > 0:
+            if len(files) > 0:
+                file_names = list(files.values())
                 # Confirmation dialog for batch file deletion
                 reply = QMessageBox.question(
                     self.view,
                     "Xác nhận xóa",
-                    f"Bạn chắc chắn muốn xóa {', '.join(file_paths)} ?",
+                    f"Bạn chắc chắn muốn xóa {', '.join(file_names)} ?",
                     QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
                     QMessageBox.StandardButton.No
                 )
 
                 if reply == QMessageBox.StandardButton.Yes:
-                    for file_path in file_paths:
+                    for item_id, file_name in files.items():
                         try:
-                            self.model.delete_file(file_path)  # Remove each file
-                            LogModel.write_log(session.SESSION.get_username(), f" {FILE_REMOVE_SUCCESS} cho {file_path} ")
+                            self.model.delete_file(item_id)  # Remove each file
+                            self.model.get_model().remove_item(item_id)
+                            LogModel.write_log(session.SESSION.get_username(), f" {FILE_REMOVE_SUCCESS} cho {file_name} ")
                         except Exception as e:
                             LogModel.write_log(session.SESSION.get_username(),
-                                               f"{FILE_REMOVE_FAIL} cho {file_path}: {e}")
-                            self.view.display_error(f"{FILE_REMOVE_FAIL} cho '{file_path}': {e}")
-
-                    self.view.display_success(f" {FILE_REMOVE_SUCCESS} cho {', '.join(file_paths)} ")
+                                               f"{FILE_REMOVE_FAIL} cho {file_name}: {e}")
+                            self.view.display_error(f"{FILE_REMOVE_FAIL} cho '{file_name}': {e}")
 
-                    # Refresh the view after deletion
-                    self.view.refresh_tree_view()
+                    self.view.display_success(f" {FILE_REMOVE_SUCCESS} cho {', '.join(file_names)} ")
                 else:
                     LogModel.write_log(session.SESSION.get_username(), FILE_REMOVE_FAIL)
                     self.view.display_error(FILE_REMOVE_FAIL)
@@ -142,29 +265,55 @@ class ItemPresenter(Presenter):
         can_all_download = session.SESSION.match_permissions(FILE_DOWNLOAD)
 
         try:
-            selected_index = self.view.treeView.currentIndex()
-            model = self.view.treeView.model()
-            original_name = model.data(selected_index)
+            item = self.model.get_model().item(self.view.treeView.currentIndex())
+            if item is None:
+                self.view.display_error(SELECTED_FILE_ERROR)
+                return
+            original_name = item.original_name
 
-            if not (can_all_download or session.SESSION.match_item_permissions(original_name, FILE_DOWNLOAD)):
+            if not (can_all_download or session.SESSION.match_item_permissions(item.id, FILE_DOWNLOAD)):
                 self.view.display_error(f"Lưu {original_name}: {PERMISSION_DENIED}")
                 LogModel.write_log(session.SESSION.get_username(), f"Lưu '{original_name}': {PERMISSION_DENIED}")
                 return
 
-            data_bytes = self.model.get_file_bytes(original_name)
-            if data_bytes is None:
+            if item.type != "file":
                 self.view.display_error(f"'{original_name}' không phải là tệp đơn")
                 return
 
             file_path, _ = QFileDialog.getSaveFileName(self.view, "Lưu tệp", original_name, "All Files (*)")
             if file_path:
-                with open(file_path, 'wb') as f:
-                    f.write(data_bytes)
-                self.view.display_success(f"Lưu '{original_name}' về {file_path} thành công")
+                exporter = self.model.export_file(item.id, file_path)
+                self.show_export_progress(exporter, original_name)
+                self.model.start_transfer(exporter)
         except Exception as e:
             self.view.display_error(f"Lưu thất bại: {str(e)}")
             logging.error(e)
 
+    def show_export_progress(self, exporter, original_name):
+        """Show a cancellable progress dialog for ``exporter``, connect before starting it."""
+        progress = QProgressDialog(f"Đang lưu '{original_name}'...", "Hủy", 0, 1000, self.view)
+        progress.setWindowModality(Qt.WindowModality.WindowModal)
+        progress.setMinimumDuration(500)
+        progress.setAutoClose(False)
+        progress.setAutoReset(False)
+        progress.canceled.connect(exporter.cancel_event.set)
+
+        def on_progress(written, total):
+            progress.setValue(int(written * 1000 / total) if total else 1000)
+
+        def on_finished(file_path):
+            progress.close()
+            self.view.display_success(f"Lưu '{original_name}' về {file_path} thành công")
+
+        def on_failed(error):
+            progress.close()
+            self.view.display_error(f"Lưu thất bại: {error}")
+
+        exporter.signals.progress.connect(on_progress)
+        exporter.signals.finished.connect(on_finished)
+        exporter.signals.failed.connect(on_failed)
+        exporter.signals.cancelled.connect(progress.close)
+
     def handle_add_folder(self):
         """Thêm một thư mục mới vào thư mục đã chọn dưới đường dẫn gốc."""
         if not session.SESSION.match_permissions(FOLDER_CREATE):
@@ -182,18 +331,14 @@ class ItemPresenter(Presenter):
                     self.view.display_error("Tên thư mục không được để trống.")  # Thông báo lỗi
                     return
 
-                selected_index = self.view.treeView.currentIndex()
-                model = self.view.treeView.model()
-                parent_original_name = model.data(selected_index)
+                parent_id = self.get_target_folder_id()
 
                 username = session.SESSION.get_username()
-                self.model.create_folder(username, folder_name, parent_original_name)
+                item = self.model.create_folder(username, folder_name, parent_id)
+                self.model.get_model().insert_item(item)
 
                 LogModel.write_log(username, f"Thành công: Tạo thư mục '{folder_name}'")
                 self.view.display_success(f"Thư mục '{folder_name}' đã được tạo thành công.")  # Thông báo thành công
-
-                # Refresh the view to show the new folder
-                self.view.refresh_tree_view()
             else:
                 LogModel.write_log(session.SESSION.get_username(),
                                    "Người dùng đã hủy việc tạo thư mục.")  # Nhật ký khi hủy
@@ -204,18 +349,16 @@ class ItemPresenter(Presenter):
     def handle_remove_folder(self):
         """Remove the selected folder."""
         can_all_remove = session.SESSION.match_permissions(FOLDER_DELETE)
-        selected_indexes = self.view.treeView.selectedIndexes()
-        if not selected_indexes:
+        selected_items = self.get_selected_items()
+        if not selected_items:
             LogModel.write_log(session.SESSION.get_username(), FOLDER_SELECTED_NOT_FOUND)
             self.view.display_error(FOLDER_SELECTED_NOT_FOUND)
             return
 
-        model = self.view.treeView.model()
-        index = selected_indexes[0]
-        original_name = model.data(index)
-        folder_path = original_name
+        folder = selected_items[0]
+        folder_path = self.model.get_item_path(folder.id)
 
-        if not (can_all_remove or session.SESSION.match_item_permissions(folder_path, FOLDER_DELETE)):
+        if not (can_all_remove or session.SESSION.match_item_permissions(folder.id, FOLDER_DELETE)):
             self.view.display_error(f"Xóa {folder_path}: {PERMISSION_DENIED}")
             LogModel.write_log(session.SESSION.get_username(), f"{FOLDER_REMOVE_ERROR}: {PERMISSION_DENIED}")
             return
@@ -231,12 +374,10 @@ class ItemPresenter(Presenter):
         if reply == QMessageBox.StandardButton.Yes:
             try:
                 # Remove the folder
-                self.model.delete_folder(folder_path)
+                self.model.delete_folder(folder.id)
+                self.model.get_model().remove_item(folder.id)
                 LogModel.write_log(session.SESSION.get_username(), f"{FOLDER_REMOVE_SUCCESS} cho '{folder_path}' .")
                 self.view.display_success(f"{FOLDER_REMOVE_SUCCESS} cho '{folder_path}' .")
-
-                # Refresh the view to remove the deleted folder
-                self.view.refresh_tree_view()
             except Exception as e:
                 LogModel.write_log(session.SESSION.get_username(), f"{FOLDER_REMOVE_ERROR}: {e}")
                 self.view.display_error(f"{FOLDER_REMOVE_ERROR}: {e}")
@@ -1,16 +1,19 @@
-from PyQt6.QtWidgets import QTableWidgetItem
+from PyQt6.QtCore import Qt, QTimer
 
 from common import session
 from common.presenter import Presenter
-from messages.messages import PERMISSION_DENIED
+from configs import LOG_SEARCH_WINDOW
+from messages.messages import LOG_LOAD_ERROR, LOG_SEARCH_LIMITED, PERMISSION_DENIED
 from messages.permissions import LOG_VIEW
-from models.log import LogModel, LogTableData
+from models.log import LogModel
+from models.log_table import LogTableModel
 
 
 class LogPresenter(Presenter):
 
     def __init__(self, view):
         super().__init__(view, LogModel())
+        self.table_model = None
 
     def populate_table(self):
         if not session.SESSION.match_permissions(LOG_VIEW):
@@ -18,14 +21,61 @@ class LogPresenter(Presenter):
             LogModel.write_log(session.SESSION.get_username(), PERMISSION_DENIED)
             return
 
-        logs: list[LogTableData] = self.model.fetch_table_log()
-        self.view.tableWidget.setRowCount(0)
+        # Show the events queued just before, such as opening this view
+        self.model.flush_logs()
+        self.table_model = LogTableModel(self.model, self.view)
+        self.table_model.load_failed.connect(self.handle_load_failed)
+        self.table_model.search_limited.connect(self.handle_search_limited)
+        self.view.searchStatus.setText(LOG_SEARCH_LIMITED.format(count=LOG_SEARCH_WINDOW))
+        self.view.tableView.setModel(self.table_model)
+        # Newest first, the model already starts in this order
+        header = self.view.tableView.horizontalHeader()
+        header.setSortIndicator(2, Qt.SortOrder.DescendingOrder)
+        header.sortIndicatorChanged.connect(self.handle_sort_indicator)
+        self.view.tableView.setColumnWidth(0, 180)
+        self.view.tableView.setColumnWidth(1, 400)
 
-        for row, log in enumerate(logs):
-            self.view.tableWidget.insertRow(row)
-            self.view.tableWidget.setItem(row, 0, QTableWidgetItem(log.username))
-            self.view.tableWidget.setItem(row, 1, QTableWidgetItem(log.message))
-            self.view.tableWidget.setItem(row, 2, QTableWidgetItem(log.created_at))
+        self.view.userFilter.addItem("Tất cả", None)
+        for user_id, fullname in self.model.fetch_log_users():
+            self.view.userFilter.addItem(fullname, user_id)
+        self.view.userFilter.currentIndexChanged.connect(self.handle_user_filter)
 
-        self.view.tableWidget.resizeColumnsToContents()
-        self.view.tableWidget.resizeRowsToContents()
+        # Searches once typing pauses rather than on every key
+        self.search_timer = QTimer(self.view)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.handle_search)
+        self.view.searchEdit.textChanged.connect(self.search_timer.start)
+
+        self.table_model.fetchMore()
+
+    def handle_user_filter(self):
+        query = self.table_model.get_query()
+        self.table_model.set_filter(
+            self.view.userFilter.currentData(), query.since, query.until
+        )
+
+    def handle_sort_indicator(self, section, order):
+        # Only the time column can be sorted, move the indicator back to it
+        if section != 2:
+            descending = self.table_model.get_query().descending
+            self.view.tableView.horizontalHeader().setSortIndicator(
+                2, Qt.SortOrder.DescendingOrder if descending else Qt.SortOrder.AscendingOrder
+            )
+
+    def handle_load_failed(self, error):
+        self.view.display_error(LOG_LOAD_ERROR)
+
+    def handle_search_limited(self, limited):
+        self.view.searchStatus.setVisible(limited)
+
+    def handle_search(self):
+        text = self.view.searchEdit.text()
+        # Matches are ranked by relevance, not by the sort column
+        self.view.tableView.horizontalHeader().setSortIndicatorShown(not text.strip())
+        self.table_model.set_search(text)
+
+    def close(self):
+        if self.table_model is not None:
+            self.table_model.shutdown()
+        super().close()
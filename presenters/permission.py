@@ -173,17 +173,17 @@ class PermissionPresenter(Presenter):
                 logging.error(f"Failed to assign permission '{permission}': {e}")
 
     def assign_permissions_to_users_for_file(
-        self, item_name: str, username: str, permissions: list[str]
+        self, item_id: int, username: str, permissions: list[str]
     ):
         return self.model.assign_permissions_to_users_for_file(
-            item_name, username, permissions
+            item_id, username, permissions
         )
 
     def unassign_permissions_to_users_for_file(
-        self, item_name: str, username: str, permissions: list[str]
+        self, item_id: int, username: str, permissions: list[str]
     ):
         return self.model.unassign_permissions_to_users_for_file(
-            item_name, username, permissions
+            item_id, username, permissions
         )
 
     def assign_permissions_to_user(
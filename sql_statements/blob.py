@@ -0,0 +1,77 @@
+CREATE_BLOB_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS blobs (
+        hash        TEXT    NOT NULL PRIMARY KEY,
+        size        INTEGER NOT NULL,
+        refcount    INTEGER NOT NULL DEFAULT 0,
+        codec       TEXT,
+        stored_size INTEGER,
+        created_at  integer default (CAST(strftime('%s', 'now') AS integer))
+    ) WITHOUT ROWID
+'''
+
+ADD_ITEM_BLOB_HASH_COLUMN_SQL = "ALTER TABLE items ADD COLUMN blob_hash TEXT;"
+
+# Bound by name: hash, size, codec, stored_size. For a stored blob the count
+# goes up, and a row missing how the blob is stored, written before
+# stored_size was recorded, gets it
+REFERENCE_BLOB_SQL = """
+INSERT INTO blobs (hash, size, refcount, codec, stored_size)
+VALUES (:hash, :size, 1, :codec, :stored_size)
+ON CONFLICT (hash) DO UPDATE SET
+    refcount = refcount + 1,
+    codec = coalesce(codec, excluded.codec),
+    stored_size = coalesce(stored_size, excluded.stored_size);
+"""
+
+ADD_BLOB_COMPRESSION_COLUMNS_SQL = [
+    "ALTER TABLE blobs ADD COLUMN codec TEXT;",
+    "ALTER TABLE blobs ADD COLUMN stored_size INTEGER;",
+]
+
+FETCH_BLOB_CODEC_SQL = "SELECT codec FROM blobs WHERE hash = ?;"
+
+FETCH_BLOB_STORAGE_SQL = "SELECT codec, stored_size FROM blobs WHERE hash = ?;"
+
+# One file name per blob, the category of the report is taken from it
+COMPRESSION_REPORT_SQL = """
+SELECT b.size, coalesce(b.stored_size, b.size), min(i.original_name)
+FROM blobs AS b
+JOIN items AS i ON i.blob_hash = b.hash
+GROUP BY b.hash;
+"""
+
+RELEASE_BLOB_SQL = "UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?;"
+
+# Removes the row once nothing points at it, rowcount tells whether to unlink the file
+DELETE_UNREFERENCED_BLOB_SQL = "DELETE FROM blobs WHERE hash = ? AND refcount <= 0;"
+
+BLOB_REFERENCED_SQL = "SELECT 1 FROM blobs WHERE hash = ? AND refcount > 0;"
+
+FETCH_UNMIGRATED_FILES_SQL = """
+SELECT id, code FROM items
+WHERE type = 'file' AND blob_hash IS NULL AND id > ?
+ORDER BY id
+LIMIT ?
+"""
+
+# Keyset batches for the scrubber, so a read never holds the database for long
+FETCH_BLOB_BATCH_SQL = "SELECT hash, size, codec FROM blobs WHERE hash > ? ORDER BY hash LIMIT ?;"
+
+FETCH_LEGACY_FILE_CODES_SQL = "SELECT code FROM items WHERE type = 'file' AND blob_hash IS NULL;"
+
+BLOB_REFCOUNT_MISMATCH_SQL = """
+SELECT b.hash, b.refcount, coalesce(r.items, 0)
+FROM blobs AS b
+LEFT JOIN (
+    SELECT blob_hash, count(*) AS items FROM items WHERE blob_hash IS NOT NULL GROUP BY blob_hash
+) AS r ON r.blob_hash = b.hash
+WHERE b.refcount != coalesce(r.items, 0);
+"""
+
+# Items whose blob has no row, their content cannot be found
+DANGLING_ITEMS_SQL = """
+SELECT i.id, i.blob_hash
+FROM items AS i
+LEFT JOIN blobs AS b ON b.hash = i.blob_hash
+WHERE i.blob_hash IS NOT NULL AND b.hash IS NULL;
+"""
@@ -0,0 +1,160 @@
+# Codec of blobs that are stored as a manifest of chunks rather than one file
+CHUNKED_CODEC = "chunks"
+
+CREATE_CHUNK_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS chunks (
+        hash       TEXT    NOT NULL PRIMARY KEY,
+        size       INTEGER NOT NULL,
+        refcount   INTEGER NOT NULL DEFAULT 0,
+        created_at integer default (CAST(strftime('%s', 'now') AS integer))
+    ) WITHOUT ROWID
+'''
+
+CREATE_BLOB_CHUNK_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS blob_chunks (
+        blob_hash  TEXT    NOT NULL,
+        seq        INTEGER NOT NULL,
+        chunk_hash TEXT    NOT NULL,
+        PRIMARY KEY (blob_hash, seq),
+        FOREIGN KEY (blob_hash) REFERENCES blobs (hash) ON DELETE CASCADE,
+        FOREIGN KEY (chunk_hash) REFERENCES chunks (hash)
+    ) WITHOUT ROWID
+'''
+
+CREATE_UPLOAD_SESSION_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS upload_sessions (
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        source_path TEXT    NOT NULL,
+        size        INTEGER NOT NULL,
+        mtime_ns    INTEGER NOT NULL,
+        created_at  integer default (CAST(strftime('%s', 'now') AS integer)),
+        UNIQUE (source_path, size, mtime_ns)
+    )
+'''
+
+CREATE_UPLOAD_SESSION_CHUNK_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS upload_session_chunks (
+        session_id INTEGER NOT NULL,
+        seq        INTEGER NOT NULL,
+        chunk_hash TEXT    NOT NULL,
+        size       INTEGER NOT NULL,
+        PRIMARY KEY (session_id, seq),
+        FOREIGN KEY (session_id) REFERENCES upload_sessions (id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+'''
+
+CREATE_UPLOAD_SESSION_CHUNK_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS upload_session_chunks_chunk_hash_index
+    ON upload_session_chunks (chunk_hash);
+"""
+
+FETCH_UPLOAD_SESSION_SQL = """
+SELECT id FROM upload_sessions WHERE source_path = ? AND size = ? AND mtime_ns = ?;
+"""
+
+INSERT_UPLOAD_SESSION_SQL = """
+INSERT INTO upload_sessions (source_path, size, mtime_ns) VALUES (?, ?, ?);
+"""
+
+# Sessions of an earlier version of the file can never resume
+DELETE_STALE_UPLOAD_SESSION_CHUNKS_SQL = """
+DELETE FROM upload_session_chunks WHERE session_id IN (
+    SELECT id FROM upload_sessions WHERE source_path = ? AND id != ?
+);
+"""
+
+DELETE_STALE_UPLOAD_SESSIONS_SQL = "DELETE FROM upload_sessions WHERE source_path = ? AND id != ?;"
+
+# Chunk count and bytes already committed by a session
+FETCH_UPLOAD_SESSION_PROGRESS_SQL = """
+SELECT count(*), coalesce(sum(size), 0) FROM upload_session_chunks WHERE session_id = ?;
+"""
+
+# Chunks are recorded unreferenced, a blob manifest takes the reference
+INSERT_CHUNK_SQL = "INSERT OR IGNORE INTO chunks (hash, size) VALUES (?, ?);"
+
+INSERT_UPLOAD_SESSION_CHUNK_SQL = """
+INSERT OR REPLACE INTO upload_session_chunks (session_id, seq, chunk_hash, size)
+VALUES (?, ?, ?, ?);
+"""
+
+BLOB_EXISTS_SQL = "SELECT 1 FROM blobs WHERE hash = ?;"
+
+INSERT_BLOB_CHUNKS_SQL = """
+INSERT INTO blob_chunks (blob_hash, seq, chunk_hash)
+SELECT ?, seq, chunk_hash FROM upload_session_chunks WHERE session_id = ?;
+"""
+
+# Inserts nothing when the blob is stored already, raw or by a concurrent upload
+INSERT_CHUNKED_BLOB_SQL = """
+INSERT INTO blobs (hash, size, refcount, codec, stored_size) VALUES (?, ?, 0, ?, ?)
+ON CONFLICT (hash) DO NOTHING;
+"""
+
+REFERENCE_BLOB_CHUNKS_SQL = """
+UPDATE chunks SET refcount = refcount + 1
+WHERE hash IN (SELECT chunk_hash FROM blob_chunks WHERE blob_hash = ?);
+"""
+
+RELEASE_BLOB_CHUNKS_SQL = """
+UPDATE chunks SET refcount = refcount - 1
+WHERE hash IN (SELECT chunk_hash FROM blob_chunks WHERE blob_hash = ?);
+"""
+
+FETCH_UNREFERENCED_BLOB_CHUNKS_SQL = """
+SELECT DISTINCT c.hash
+FROM blob_chunks AS bc
+JOIN chunks AS c ON c.hash = bc.chunk_hash
+WHERE bc.blob_hash = ? AND c.refcount <= 0
+  -- an upload in progress may be about to reference it
+  AND NOT EXISTS (SELECT 1 FROM upload_session_chunks AS usc WHERE usc.chunk_hash = c.hash);
+"""
+
+DELETE_BLOB_CHUNKS_SQL = "DELETE FROM blob_chunks WHERE blob_hash = ?;"
+
+DELETE_UNREFERENCED_CHUNK_SQL = "DELETE FROM chunks WHERE hash = ? AND refcount <= 0;"
+
+FETCH_BLOB_CHUNKS_SQL = "SELECT chunk_hash FROM blob_chunks WHERE blob_hash = ? ORDER BY seq;"
+
+FETCH_UPLOAD_SESSION_CHUNK_HASHES_SQL = """
+SELECT DISTINCT chunk_hash FROM upload_session_chunks WHERE session_id = ?;
+"""
+
+# A chunk written for an upload whose content was stored already, once no
+# blob and no other upload session uses it
+DELETE_ABANDONED_CHUNK_SQL = """
+DELETE FROM chunks
+WHERE hash = :hash AND refcount <= 0
+  AND NOT EXISTS (SELECT 1 FROM upload_session_chunks WHERE chunk_hash = :hash);
+"""
+
+DELETE_UPLOAD_SESSION_CHUNKS_SQL = "DELETE FROM upload_session_chunks WHERE session_id = ?;"
+
+DELETE_UPLOAD_SESSION_SQL = "DELETE FROM upload_sessions WHERE id = ?;"
+
+FETCH_CHUNK_BATCH_SQL = "SELECT hash, size FROM chunks WHERE hash > ? ORDER BY hash LIMIT ?;"
+
+CHUNK_EXISTS_SQL = "SELECT 1 FROM chunks WHERE hash = ?;"
+
+# Chunks in use by an upload session are not referenced yet and not counted
+# here. A chunk counts once per blob, as REFERENCE_BLOB_CHUNKS_SQL adds it,
+# however often the blob repeats it
+CHUNK_REFCOUNT_MISMATCH_SQL = """
+SELECT c.hash, c.refcount, coalesce(r.blobs, 0)
+FROM chunks AS c
+LEFT JOIN (
+    SELECT chunk_hash, count(DISTINCT blob_hash) AS blobs FROM blob_chunks GROUP BY chunk_hash
+) AS r ON r.chunk_hash = c.hash
+WHERE c.refcount != coalesce(r.blobs, 0);
+"""
+
+# Chunked blobs whose manifest does not add up to the size of the content
+MANIFEST_SIZE_MISMATCH_SQL = """
+SELECT b.hash, b.size, coalesce(sum(c.size), 0)
+FROM blobs AS b
+LEFT JOIN blob_chunks AS bc ON bc.blob_hash = b.hash
+LEFT JOIN chunks AS c ON c.hash = bc.chunk_hash
+WHERE b.codec = 'chunks'
+GROUP BY b.hash
+HAVING b.size != coalesce(sum(c.size), 0);
+"""
@@ -9,17 +9,129 @@ CREATE_ITEM_TABLE_SQL = '''
                 unique,
         type          TEXT    not null,
         original_name TEXT    not null,
-        created_at    TIMESTAMP default current_timestamp,
-        updated_at    TIMESTAMP default current_timestamp,
+        created_at    integer default (CAST(strftime('%s', 'now') AS integer)),
+        updated_at    integer default (CAST(strftime('%s', 'now') AS integer)),
         parent_id     integer DEFAULT 0
             constraint item_item_id_fk
                 references items,
         user_id       integer not null
             constraint item_users_id_fk
-                references users
+                references users,
+        blob_hash     TEXT
     );
 '''
 
+CREATE_ITEM_PARENT_NAME_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS item_parent_id_original_name_index
+    ON items (parent_id, original_name);
+"""
+
+CREATE_ITEM_PARENT_CREATED_AT_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS item_parent_id_created_at_index
+    ON items (parent_id, created_at);
+"""
+
+DROP_ITEM_PARENT_INDEX_SQL = "DROP INDEX IF EXISTS item_parent_id_index;"
+
+DUPLICATE_SIBLING_NAMES_SQL = """
+SELECT i.id, i.parent_id, i.original_name
+FROM items i
+JOIN (
+    SELECT parent_id, original_name FROM items
+    GROUP BY parent_id, original_name
+    HAVING count(*) > 1
+) d ON d.parent_id = i.parent_id AND d.original_name = i.original_name
+ORDER BY i.id;
+"""
+
+CREATE_ITEM_CLOSURE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS item_closure (
+        ancestor   INTEGER NOT NULL,
+        descendant INTEGER NOT NULL,
+        depth      INTEGER NOT NULL,
+        PRIMARY KEY (ancestor, descendant),
+        FOREIGN KEY (ancestor) REFERENCES items (id) ON DELETE CASCADE,
+        FOREIGN KEY (descendant) REFERENCES items (id) ON DELETE CASCADE
+    ) WITHOUT ROWID
+'''
+
+CREATE_ITEM_CLOSURE_DESCENDANT_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS item_closure_descendant_index
+    ON item_closure (descendant, depth);
+"""
+
+BACKFILL_ITEM_CLOSURE_SQL = """
+INSERT OR IGNORE INTO item_closure (ancestor, descendant, depth)
+WITH RECURSIVE tree (ancestor, descendant, depth) AS (
+    SELECT id, id, 0 FROM items
+    UNION ALL
+    SELECT t.ancestor, i.id, t.depth + 1
+    FROM tree t
+    JOIN items i ON i.parent_id = t.descendant
+)
+SELECT ancestor, descendant, depth FROM tree;
+"""
+
+INSERT_ITEM_CLOSURE_SQL = """
+INSERT INTO item_closure (ancestor, descendant, depth)
+SELECT ancestor, :item_id, depth + 1 FROM item_closure WHERE descendant = :parent_id
+UNION ALL
+SELECT :item_id, :item_id, 0;
+"""
+
+# Ids for rows inserted in bulk are assigned up front, past every id ever used.
+# Run inside BEGIN IMMEDIATE so no other connection takes them meanwhile
+NEXT_ITEM_ID_SQL = """
+SELECT max(
+    coalesce((SELECT seq FROM sqlite_sequence WHERE name = 'items'), 0),
+    coalesce((SELECT max(id) FROM items), 0)
+) + 1;
+"""
+
+INSERT_ITEM_SQL = """
+INSERT INTO items (id, code, type, original_name, parent_id, user_id, blob_hash)
+VALUES (?, ?, ?, ?, ?, ?, ?);
+"""
+
+DELETE_ITEM_CLOSURE_SQL = """
+DELETE FROM item_closure
+WHERE descendant IN (SELECT descendant FROM item_closure WHERE ancestor = ?);
+"""
+
+# Children of :parent_id the user :username may see, either through the
+# folder:view / file:view permission or a grant on the item itself. The root
+# folder is always visible. Bound by name, {order_by} is filled in by the model.
+FETCH_VISIBLE_CHILDREN_SQL = """
+WITH viewer AS (
+    SELECT id FROM users WHERE username = :username
+)
+SELECT i.id, i.code, i.parent_id, i.user_id, i.type, i.original_name, i.created_at, i.updated_at, p.fullname, i.blob_hash, {sort_key}
+FROM items AS i
+LEFT JOIN profiles AS p ON p.user_id = i.user_id
+WHERE i.parent_id = :parent_id
+  AND {after}
+  AND (
+      i.parent_id = -1
+      OR EXISTS (
+          SELECT 1
+          FROM user_permissions AS up
+          JOIN permissions AS pm ON pm.id = up.permission_id
+          WHERE up.user_id = (SELECT id FROM viewer)
+            AND pm.permission = CASE i.type WHEN 'folder' THEN :folder_view ELSE :file_view END
+      )
+      OR EXISTS (
+          SELECT 1
+          FROM user_item_permissions AS uip
+          JOIN permissions AS pm ON pm.id = uip.permission_id
+          WHERE uip.user_id = (SELECT id FROM viewer)
+            AND uip.item_id = i.id
+            AND pm.permission = CASE i.type WHEN 'folder' THEN :folder_view ELSE :file_view END
+      )
+  )
+ORDER BY {sort_key} {direction}, i.id {direction}
+LIMIT :limit
+"""
+
 INIT_DATA = """
 insert or ignore into items (id, code, type, original_name, parent_id, user_id)
     values (0, 'root', 'folder', 'root', -1, 1);
@@ -6,7 +6,182 @@ CREATE_TABLE_SQL = '''
                 primary key autoincrement,
         user_id       integer not null,
         message       TEXT    not null,
-        created_at    TIMESTAMP default current_timestamp,
-        updated_at    TIMESTAMP default current_timestamp
+        created_at    integer default (CAST(strftime('%s', 'now') AS integer)),
+        updated_at    integer default (CAST(strftime('%s', 'now') AS integer))
     );
-'''
\ No newline at end of file
+'''
+
+CREATE_CREATED_AT_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS log_created_at_index ON logs (created_at);
+"""
+
+# Serves the per-user filter in time order; with the rowid every index entry
+# carries, also the (created_at, id) keyset of the log pages
+CREATE_USER_CREATED_AT_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS log_user_id_created_at_index ON logs (user_id, created_at);
+"""
+
+# created_at is the time the event was queued, not the time it was written
+INSERT_LOG_SQL = """
+INSERT INTO logs (user_id, message, created_at, updated_at) VALUES (?, ?, ?, ?);
+"""
+
+# One page of the log viewer. Filled in by build_log_page_sql: {logs} is the
+# logs table or the union of HISTORY_SOURCE_SQL, {sort_key} the sort column,
+# {where} the filters and the keyset condition on ({sort_key}, l.id),
+# {direction} ASC or DESC. Bound by name. Users without a profile are shown
+# by their username
+FETCH_LOG_PAGE_SQL = """
+SELECT l.id, coalesce(p.fullname, u.username), l.message, l.created_at, {sort_key}
+FROM {logs} AS l
+LEFT JOIN profiles AS p ON p.user_id = l.user_id
+LEFT JOIN users AS u ON u.id = l.user_id
+WHERE {where}
+ORDER BY {sort_key} {direction}, l.id {direction}
+LIMIT :limit
+"""
+
+FETCH_LOG_USERS_SQL = """
+SELECT u.id, coalesce(p.fullname, u.username) AS name
+FROM users AS u
+LEFT JOIN profiles AS p ON p.user_id = u.id
+ORDER BY name, u.id;
+"""
+
+FETCH_USER_LOGS_SQL = """
+SELECT l.id, l.user_id, l.message, l.created_at, l.updated_at
+FROM logs AS l
+INNER JOIN users AS u ON u.id = l.user_id
+WHERE u.username = ?
+ORDER BY l.created_at, l.id;
+"""
+
+# Full-text index of the log messages, kept in sync with logs by the triggers
+# below. remove_diacritics 2 makes "dang nhap" match "Đăng nhập"; đ is a
+# letter of its own to the tokenizer, so it is folded to d by LOG_FTS_FOLD
+CREATE_FTS_TABLE_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+    message,
+    content = 'logs',
+    content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# The text indexed for {column}, the same in every trigger so deletes remove
+# exactly what was inserted
+LOG_FTS_FOLD = "replace(replace({column}, 'đ', 'd'), 'Đ', 'D')"
+
+CREATE_FTS_TRIGGERS_SQL = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS logs_fts_insert AFTER INSERT ON logs BEGIN
+        INSERT INTO logs_fts (rowid, message)
+        VALUES (new.id, {LOG_FTS_FOLD.format(column="new.message")});
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS logs_fts_delete AFTER DELETE ON logs BEGIN
+        INSERT INTO logs_fts (logs_fts, rowid, message)
+        VALUES ('delete', old.id, {LOG_FTS_FOLD.format(column="old.message")});
+    END;
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS logs_fts_update AFTER UPDATE OF message ON logs BEGIN
+        INSERT INTO logs_fts (logs_fts, rowid, message)
+        VALUES ('delete', old.id, {LOG_FTS_FOLD.format(column="old.message")});
+        INSERT INTO logs_fts (rowid, message)
+        VALUES (new.id, {LOG_FTS_FOLD.format(column="new.message")});
+    END;
+    """,
+)
+
+# Indexes the logs written before the full-text table existed
+POPULATE_FTS_SQL = f"""
+INSERT INTO logs_fts (rowid, message)
+SELECT id, {LOG_FTS_FOLD.format(column="message")} FROM logs;
+"""
+
+FTS_TABLE_EXISTS_SQL = """
+SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'logs_fts';
+"""
+
+# Only the :window most recent matches are ranked. bm25 has to score every
+# match before the best can be picked, which for a common word is most of
+# the table; the newest matches are found by walking the index backwards.
+# {where} holds the viewer filters on l, counted inside the window so
+# matches they drop do not take the place of older ones that pass
+LOG_SEARCH_WINDOW_SQL = """
+logs_fts.rowid >= coalesce(
+    (SELECT logs_fts.rowid FROM logs_fts
+     INNER JOIN logs AS l ON l.id = logs_fts.rowid
+     WHERE logs_fts MATCH :match AND {where}
+     ORDER BY logs_fts.rowid DESC LIMIT 1 OFFSET :window - 1),
+    0
+)
+"""
+
+# Whether matches older than the window exist, the ones no page can reach.
+# {where} holds the viewer filters, as in the window
+LOG_SEARCH_BEYOND_WINDOW_SQL = """
+SELECT 1 FROM logs_fts
+INNER JOIN logs AS l ON l.id = logs_fts.rowid
+WHERE logs_fts MATCH :match AND {where}
+ORDER BY logs_fts.rowid DESC LIMIT 1 OFFSET :window
+"""
+
+# One page of search matches, best first. {where} holds the viewer filters.
+# Ranked pages cannot be keyed on a column, they are read with OFFSET, which
+# the window keeps short
+SEARCH_LOG_PAGE_SQL = """
+SELECT l.id, coalesce(p.fullname, u.username), l.message, l.created_at,
+       snippet(logs_fts, 0, '«', '»', '…', 16)
+FROM logs_fts
+INNER JOIN logs AS l ON l.id = logs_fts.rowid
+LEFT JOIN profiles AS p ON p.user_id = l.user_id
+LEFT JOIN users AS u ON u.id = l.user_id
+WHERE logs_fts MATCH :match AND {window} AND {where}
+ORDER BY logs_fts.rank
+LIMIT :limit OFFSET :offset
+"""
+
+SEARCH_LOG_SQL = f"""
+SELECT l.id, l.user_id, l.message, l.created_at, l.updated_at,
+       snippet(logs_fts, 0, '«', '»', '…', 16)
+FROM logs_fts
+INNER JOIN logs AS l ON l.id = logs_fts.rowid
+WHERE logs_fts MATCH :match AND {LOG_SEARCH_WINDOW_SQL.format(where="1")}
+ORDER BY logs_fts.rank
+LIMIT :limit OFFSET :offset
+"""
+
+# Log archival. Rows move in batches in (created_at, id) order, a batch being
+# every row up to its last one; copying is idempotent, so a batch whose
+# delete did not commit is simply moved again by the next run
+FETCH_ARCHIVE_BATCH_SQL = """
+SELECT created_at, id FROM main.logs
+WHERE created_at < :before
+ORDER BY created_at, id
+LIMIT :batch_size
+"""
+
+OLDEST_LOG_SQL = """
+SELECT min(created_at) FROM main.logs WHERE created_at < :before
+"""
+
+ARCHIVE_BATCH_SQL = """
+INSERT OR IGNORE INTO archive.logs (id, user_id, message, created_at, updated_at)
+SELECT id, user_id, message, created_at, updated_at FROM main.logs
+WHERE created_at < :before AND (created_at, id) <= (:last_created_at, :last_id)
+"""
+
+DELETE_LOG_BATCH_SQL = """
+DELETE FROM main.logs
+WHERE created_at < :before AND (created_at, id) <= (:last_created_at, :last_id)
+"""
+
+# The rows of one database of a history connection, joined with UNION ALL.
+# Each carries the page's {where} itself, so every database is read by its
+# own index instead of relying on the planner to push the filters down
+HISTORY_SOURCE_SQL = """
+SELECT id, user_id, message, created_at FROM {schema}.logs AS l WHERE {where}
+"""
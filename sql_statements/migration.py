@@ -0,0 +1,7 @@
+# Converts a current_timestamp text value to epoch seconds and leaves integers alone
+TEXT_TIMESTAMP_TO_EPOCH_SQL = """
+CASE WHEN typeof({column}) = 'text'
+    THEN CAST(strftime('%s', {column}) AS integer)
+    ELSE {column}
+END
+"""
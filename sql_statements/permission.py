@@ -47,10 +47,9 @@ GET_PERMISSION_BY_USERNAME_SQL = """
 """
 
 GET_ITEM_PERMISSION_BY_USERNAME_SQL = """
-    SELECT DISTINCT i.original_name, p.permission
+    SELECT DISTINCT uip.item_id, p.permission
     FROM users u
     INNER JOIN user_item_permissions uip ON u.id = uip.user_id
-    INNER JOIN items i ON i.id = uip.item_id
     INNER JOIN permissions p ON uip.permission_id = p.id
     WHERE u.username = ?
 """
@@ -10,11 +10,15 @@ CREATE_TABLE_SQL = '''
         fullname          TEXT    not null,
         position TEXT    not null,
         phone_number  TEXT    not null,
-        created_at    TIMESTAMP default current_timestamp,
-        updated_at    TIMESTAMP default current_timestamp
+        created_at    integer default (CAST(strftime('%s', 'now') AS integer)),
+        updated_at    integer default (CAST(strftime('%s', 'now') AS integer))
     );
 '''
 
+CREATE_USER_ID_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS profile_user_id_index ON profiles (user_id);
+"""
+
 INIT_DATA = """
 insert or ignore into profiles (id, user_id, fullname, position, phone_number)
     values (0, 1, 'Admin', 'admin', '0987654321');
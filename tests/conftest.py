@@ -0,0 +1,73 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import session  # noqa: E402
+from common.session import UserSession  # noqa: E402
+from messages.permissions import ALL_PERMISSION  # noqa: E402
+from sql_statements.auth import CREATE_USER_TABLE_SQL, INSERT_USER_SQL  # noqa: E402
+from sql_statements.permission import (  # noqa: E402
+    ADD_PERMISSION_SQL,
+    ASSIGN_PERMISSION_BY_USERNAME_SQL,
+    CREATE_PERMISSION_TABLE_SQL,
+    CREATE_PERMISSION_USER_TABLE_SQL,
+)
+from sql_statements.profile import CREATE_TABLE_SQL as CREATE_PROFILE_TABLE_SQL  # noqa: E402
+from sql_statements.profile import CREATE_USER_ID_INDEX_SQL  # noqa: E402
+from sql_statements.profile import INIT_DATA as INIT_PROFILE_DATA  # noqa: E402
+
+USERNAME = "admin"
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    from PyQt6.QtWidgets import QApplication
+
+    return QApplication.instance() or QApplication(sys.argv)
+
+
+@pytest.fixture
+def database_name(tmp_path):
+    """A database with the tables every model expects and one admin user
+    holding every permission.
+    """
+    database_name = str(tmp_path / "app.db")
+    connection = sqlite3.connect(database_name)
+    try:
+        connection.execute(CREATE_USER_TABLE_SQL)
+        # The password is never checked here, skip the slow bcrypt hash
+        connection.execute(INSERT_USER_SQL, (USERNAME, "x", True))
+        connection.execute(CREATE_PROFILE_TABLE_SQL)
+        connection.execute(CREATE_USER_ID_INDEX_SQL)
+        connection.execute(INIT_PROFILE_DATA)
+        connection.execute(CREATE_PERMISSION_TABLE_SQL)
+        connection.execute(CREATE_PERMISSION_USER_TABLE_SQL)
+        for permission in ALL_PERMISSION:
+            connection.execute(ADD_PERMISSION_SQL, (permission,))
+            connection.execute(ASSIGN_PERMISSION_BY_USERNAME_SQL, (permission, USERNAME))
+        connection.commit()
+    finally:
+        connection.close()
+    session.SESSION = UserSession(USERNAME, list(ALL_PERMISSION))
+    return database_name
+
+
+@pytest.fixture
+def item_model(qapp, database_name, tmp_path):
+    from PyQt6.QtCore import QCoreApplication
+
+    from models.item import ItemModel
+
+    root_path = tmp_path / "files_storage"
+    root_path.mkdir()
+    model = ItemModel(database_name=database_name, root_path=str(root_path))
+    yield model
+    # Deliver the signals still queued by finished transfers before the
+    # model and the slots they call go away
+    QCoreApplication.processEvents()
+    model.close_connection()
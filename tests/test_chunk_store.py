@@ -0,0 +1,43 @@
+import os
+import sqlite3
+
+from tests.conftest import USERNAME
+
+
+def chunk_files(root_path):
+    return [
+        name
+        for _, _, names in os.walk(os.path.join(root_path, "chunks"))
+        for name in names
+    ]
+
+
+def test_chunks_of_content_stored_raw_are_released(item_model, tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(1024 * 1024))
+    raw = item_model.get_blob_store().put_file(str(source))
+    item_model.create_files(USERNAME, [("video.mp4", raw)])
+
+    stored = item_model.get_chunk_store().put_file(str(source))
+
+    assert not stored.created
+    assert (stored.codec, stored.stored_size) == (None, raw.size)
+    connection = sqlite3.connect(item_model.database_name)
+    assert connection.execute("SELECT count(*) FROM chunks").fetchone()[0] == 0
+    connection.close()
+    assert chunk_files(item_model.get_root_path()) == []
+
+
+def test_chunks_of_stored_chunked_content_are_kept(item_model, tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(1024 * 1024))
+    store = item_model.get_chunk_store()
+    first = store.put_file(str(source))
+    item_model.create_files(USERNAME, [("video.mp4", first)])
+    files = chunk_files(item_model.get_root_path())
+
+    second = store.put_file(str(source))
+
+    assert not second.created
+    assert (second.codec, second.stored_size) == (first.codec, first.stored_size)
+    assert sorted(chunk_files(item_model.get_root_path())) == sorted(files)
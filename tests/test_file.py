@@ -0,0 +1,63 @@
+import errno
+import filecmp
+
+import pytest
+
+from common import file
+from common.file import COPY_METHODS, copy_file
+
+
+@pytest.fixture
+def source(tmp_path, monkeypatch):
+    # Small chunks so the chunked copiers loop and report progress
+    monkeypatch.setattr(file, "COPY_CHUNK_SIZE", 4096)
+    path = tmp_path / "lesson.mp4"
+    path.write_bytes(bytes(range(256)) * 80)
+    return path
+
+
+@pytest.mark.parametrize("method", list(COPY_METHODS))
+def test_each_method_copies_the_whole_file(source, tmp_path, method):
+    target_path = tmp_path / "copy.mp4"
+    try:
+        used = copy_file(str(source), str(target_path), methods=[method])
+    except Exception:
+        pytest.skip(f"{method} is not supported on this filesystem")
+
+    assert used == method
+    assert filecmp.cmp(source, target_path, shallow=False)
+
+
+def test_unsupported_method_falls_back_to_the_next(source, tmp_path, monkeypatch):
+    def unsupported(source_file, target_file, total, on_progress, is_cancelled):
+        target_file.write(b"partial")
+        raise OSError(errno.EXDEV, "Invalid cross-device link")
+
+    monkeypatch.setitem(COPY_METHODS, "unsupported", unsupported)
+    target_path = tmp_path / "copy.mp4"
+    progress = []
+
+    used = copy_file(
+        str(source), str(target_path), lambda *args: progress.append(args),
+        methods=["unsupported", "buffered"],
+    )
+
+    assert used == "buffered"
+    assert filecmp.cmp(source, target_path, shallow=False)
+    assert progress[-1] == (20480, 20480)
+
+
+def test_other_errors_are_raised(source, tmp_path, monkeypatch):
+    def failing(source_file, target_file, total, on_progress, is_cancelled):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+    monkeypatch.setitem(COPY_METHODS, "failing", failing)
+
+    with pytest.raises(OSError):
+        copy_file(str(source), str(tmp_path / "copy.mp4"), methods=["failing", "buffered"])
+
+
+def test_cancelled_copy_returns_none(source, tmp_path):
+    assert copy_file(
+        str(source), str(tmp_path / "copy.mp4"), is_cancelled=lambda: True, methods=["buffered"]
+    ) is None
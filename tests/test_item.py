@@ -0,0 +1,64 @@
+import pytest
+
+from models.item import ROOT_ITEM_ID
+from tests.conftest import USERNAME
+
+
+def test_fetch_data_returns_items_with_their_creator(item_model):
+    folder = item_model.create_folder(USERNAME, "course")
+    item_model.create_folder(USERNAME, "chapter_1", folder.id)
+
+    items = {item.original_name: item for item in item_model.fetch_data()}
+
+    assert set(items) == {"root", "course", "chapter_1"}
+    assert items["chapter_1"].parent_id == folder.id
+    assert items["course"].parent_id == ROOT_ITEM_ID
+    assert {item.fullname for item in items.values()} == {"Admin"}
+
+
+def make_tree(item_model):
+    """/course/chapter_1/lesson_1 and /course/chapter_2"""
+    course = item_model.create_folder(USERNAME, "course")
+    chapter_1 = item_model.create_folder(USERNAME, "chapter_1", course.id)
+    chapter_2 = item_model.create_folder(USERNAME, "chapter_2", course.id)
+    lesson = item_model.create_folder(USERNAME, "lesson_1", chapter_1.id)
+    return course, chapter_1, chapter_2, lesson
+
+
+def test_items_are_addressed_by_path(item_model):
+    course, chapter_1, _, lesson = make_tree(item_model)
+
+    assert item_model.resolve_path("/").id == ROOT_ITEM_ID
+    assert item_model.resolve_path("/course/chapter_1/lesson_1").id == lesson.id
+    assert item_model.resolve_path("/course/missing") is None
+    assert item_model.get_item_path(lesson.id) == "/course/chapter_1/lesson_1"
+    assert item_model.get_child(course.id, "chapter_1").id == chapter_1.id
+
+
+def test_a_name_is_taken_once_per_folder(item_model):
+    course, _, _, _ = make_tree(item_model)
+
+    with pytest.raises(Exception):
+        item_model.create_folder(USERNAME, "chapter_1", course.id)
+    # The same name is free in another folder
+    assert item_model.create_folder(USERNAME, "chapter_1").parent_id == ROOT_ITEM_ID
+
+
+def test_closure_answers_ancestry_and_subtree_queries(item_model):
+    course, chapter_1, chapter_2, lesson = make_tree(item_model)
+
+    assert [item.id for item in item_model.get_ancestors(lesson.id)] == [
+        ROOT_ITEM_ID, course.id, chapter_1.id
+    ]
+    assert [item.id for item in item_model.get_descendants(course.id)] == [
+        chapter_1.id, chapter_2.id, lesson.id
+    ]
+    assert [item.id for item in item_model.get_descendants(course.id, 1)] == [
+        chapter_1.id, chapter_2.id
+    ]
+    assert item_model.get_subtree_size(course.id) == 3
+
+    item_model.delete_folder(lesson.id)
+
+    assert item_model.get_subtree_size(course.id) == 2
+    assert item_model.get_ancestors(lesson.id) == []
@@ -0,0 +1,71 @@
+import filecmp
+
+from tests.conftest import USERNAME
+from tests.test_storage import write_lesson
+
+
+def run_export(exporter):
+    events = {"progress": [], "finished": [], "failed": [], "cancelled": []}
+    exporter.signals.progress.connect(lambda *args: events["progress"].append(args))
+    exporter.signals.finished.connect(events["finished"].append)
+    exporter.signals.failed.connect(events["failed"].append)
+    exporter.signals.cancelled.connect(lambda: events["cancelled"].append(True))
+    exporter.run()
+    return events
+
+
+def test_raw_file_is_exported_with_progress(item_model, tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(bytes(range(256)) * 8192)
+    item = item_model.create_file(USERNAME, str(source))
+    target_path = tmp_path / "export.jpg"
+
+    events = run_export(item_model.export_file(item.id, str(target_path)))
+
+    assert events["failed"] == [] and events["finished"] == [str(target_path)]
+    assert filecmp.cmp(source, target_path, shallow=False)
+    assert events["progress"][-1] == (source.stat().st_size, source.stat().st_size)
+    assert not (tmp_path / "export.jpg.part").exists()
+
+
+def test_compressed_file_is_exported_decompressed(item_model, tmp_path):
+    source = write_lesson(tmp_path / "lesson.txt")
+    item = item_model.create_file(USERNAME, source)
+    target_path = tmp_path / "export.txt"
+
+    events = run_export(item_model.export_file(item.id, str(target_path)))
+
+    assert item_model.get_blob_codec(item.blob_hash) == "zlib"
+    assert events["failed"] == []
+    assert filecmp.cmp(source, target_path, shallow=False)
+
+
+def test_corrupt_blob_fails_without_touching_the_target(item_model, tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(bytes(range(256)) * 16)
+    item = item_model.create_file(USERNAME, str(source))
+    with open(item_model.get_file_path(item), "r+b") as blob_file:
+        blob_file.write(b"\xff")
+    target_path = tmp_path / "export.jpg"
+    target_path.write_bytes(b"previous download")
+
+    events = run_export(item_model.export_file(item.id, str(target_path)))
+
+    assert events["finished"] == [] and len(events["failed"]) == 1
+    assert target_path.read_bytes() == b"previous download"
+    assert not (tmp_path / "export.jpg.part").exists()
+
+
+def test_cancelled_export_leaves_nothing_behind(item_model, tmp_path):
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(bytes(range(256)) * 16)
+    item = item_model.create_file(USERNAME, str(source))
+    target_path = tmp_path / "export.jpg"
+    exporter = item_model.export_file(item.id, str(target_path))
+
+    exporter.cancel()
+    events = run_export(exporter)
+
+    assert events["cancelled"] == [True] and events["finished"] == []
+    assert not target_path.exists()
+    assert not (tmp_path / "export.jpg.part").exists()
@@ -0,0 +1,65 @@
+import filecmp
+import sqlite3
+
+from PyQt6.QtCore import QEventLoop, QTimer
+
+from common.storage import StoredBlob
+from models.item import ROOT_ITEM_ID
+from models.item_import import ImportWriter
+from tests.conftest import USERNAME
+from tests.test_storage import export, write_lesson
+
+
+def run_import(item_model, directory):
+    loop = QEventLoop()
+    result = []
+    importer = item_model.import_directory(USERNAME, str(directory))
+    importer.finished.connect(lambda *args: (result.extend(args), loop.quit()))
+    importer.start()
+    QTimer.singleShot(30000, loop.quit)
+    loop.exec()
+    return result
+
+
+def test_duplicate_files_import_readable(item_model, tmp_path):
+    course = tmp_path / "course"
+    for chapter in range(3):
+        (course / f"chapter_{chapter}").mkdir(parents=True)
+        for index in range(4):
+            write_lesson(course / f"chapter_{chapter}" / f"lesson_{index}.txt")
+
+    folder, failures, cancelled = run_import(item_model, course)
+
+    assert folder is not None and failures == [] and not cancelled
+    connection = sqlite3.connect(item_model.database_name)
+    items = connection.execute(
+        "SELECT id, blob_hash FROM items WHERE type = 'file'"
+    ).fetchall()
+    refcount, codec = connection.execute("SELECT refcount, codec FROM blobs").fetchone()
+    connection.close()
+    assert len({blob_hash for _, blob_hash in items}) == 1
+    assert (refcount, codec) == (12, item_model.get_blob_codec(items[0][1]))
+    assert codec is not None
+    for item_id, _ in items:
+        target_path = tmp_path / f"export_{item_id}.txt"
+        export(item_model, item_model.get_item(item_id), target_path)
+        assert filecmp.cmp(course / "chapter_0" / "lesson_0.txt", target_path, shallow=False)
+
+
+def test_writer_takes_the_codec_of_the_copy_that_wrote_the_blob(item_model):
+    blob_hash = "a" * 64
+    files = [(0, "lesson_0.txt", "", 100), (0, "lesson_1.txt", "", 100)]
+    stored = [
+        # Listed first, as when the copy of a later file wrote the blob
+        (0, StoredBlob(blob_hash, 100, False)),
+        (1, StoredBlob(blob_hash, 100, True, "zlib", 40)),
+    ]
+    writer = ImportWriter(
+        item_model.database_name, USERNAME, ROOT_ITEM_ID, [(-1, "course")], files, stored
+    )
+    errors = []
+    writer.signals.failed.connect(errors.append)
+    writer.run()
+
+    assert errors == []
+    assert item_model.get_blob_codec(blob_hash) == "zlib"
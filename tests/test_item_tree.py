@@ -0,0 +1,206 @@
+import sqlite3
+
+from PyQt6.QtCore import Qt
+
+from messages.permissions import FILE_VIEW, FOLDER_VIEW
+from models.item import ROOT_ITEM_ID
+from models.item_tree import ChildrenLoader
+from sql_statements.auth import INSERT_USER_SQL
+from sql_statements.permission import (
+    ASSIGN_PERMISSION_AND_USER_FOR_ITEM_SQL,
+    GET_PERMISSION_ID_SQL,
+)
+from tests.conftest import USERNAME
+
+
+def test_loader_pages_past_rows_removed_while_loading(item_model):
+    folder = item_model.create_folder(USERNAME, "course")
+    names = [f"lesson_{index:03}" for index in range(600)]
+    for name in names:
+        item_model.create_folder(USERNAME, name, folder.id)
+    loader = ChildrenLoader(
+        item_model.database_name,
+        item_model.get_visible_children_sql("i.original_name", descending=True),
+        item_model.get_visible_children_sql("i.original_name", descending=True, after=True),
+        folder.id,
+        0,
+        USERNAME,
+    )
+    loaded = []
+
+    def on_batch_loaded(generation, parent_id, rows, done):
+        items = [item_model.to_item(row) for row in rows]
+        if not loaded:
+            # As when a row of the first batch is deleted from the tree
+            item_model.delete_folder(items[0].id)
+        loaded.extend(item.original_name for item in items)
+
+    loader.signals.batch_loaded.connect(
+        on_batch_loaded, Qt.ConnectionType.DirectConnection
+    )
+    loader.run()
+
+    assert loaded == sorted(names, reverse=True)
+
+
+def test_tree_loads_children_sorted_by_fullname(item_model):
+    from models.item_tree import ItemTreeModel
+
+    folder = item_model.create_folder(USERNAME, "course")
+    for index in range(300):
+        item_model.create_folder(USERNAME, f"lesson_{index:03}", folder.id)
+    tree = ItemTreeModel(item_model)
+    try:
+        tree.sort(3, Qt.SortOrder.DescendingOrder)
+        tree.wait_for_loads()
+        root = tree.index(0, 0)
+        tree.fetchMore(root)
+        tree.wait_for_loads()
+        course = tree.index(0, 0, root)
+        tree.fetchMore(course)
+        tree.wait_for_loads()
+
+        names = [tree.index(row, 0, course).data() for row in range(tree.rowCount(course))]
+    finally:
+        tree.shutdown()
+    # Every row has the same owner, so the id breaks the tie
+    assert names == [f"lesson_{index:03}" for index in reversed(range(300))]
+
+
+def load_root(tree):
+    """Fetch the top level and the children of the root folder."""
+    tree.fetch_root()
+    tree.wait_for_loads()
+    root = tree.index(0, 0)
+    tree.fetchMore(root)
+    tree.wait_for_loads()
+    return root
+
+
+def test_tree_loads_a_folder_only_when_it_is_expanded(item_model, tmp_path):
+    from models.item_tree import ItemTreeModel
+
+    folder = item_model.create_folder(USERNAME, "course")
+    item_model.create_folder(USERNAME, "chapter_1", folder.id)
+    source = tmp_path / "notes.txt"
+    source.write_text("notes")
+    item_model.create_file(USERNAME, str(source))
+    tree = ItemTreeModel(item_model)
+    try:
+        root = load_root(tree)
+        rows = {tree.index(row, 0, root).data(): tree.index(row, 0, root)
+                for row in range(tree.rowCount(root))}
+        course = rows["course"]
+
+        assert set(rows) == {"course", "notes.txt"}
+        assert not tree.hasChildren(rows["notes.txt"])
+        # Not read until expanded, yet shown as expandable
+        assert tree.hasChildren(course) and tree.rowCount(course) == 0
+        assert tree.canFetchMore(course)
+
+        tree.fetchMore(course)
+        tree.wait_for_loads()
+
+        assert [tree.index(row, 0, course).data() for row in range(tree.rowCount(course))] == [
+            "chapter_1"
+        ]
+        assert not tree.canFetchMore(course)
+    finally:
+        tree.shutdown()
+
+
+def test_tree_shows_created_and_deleted_items_in_place(item_model):
+    from models.item_tree import ItemTreeModel
+
+    folder = item_model.create_folder(USERNAME, "course")
+    tree = ItemTreeModel(item_model)
+    try:
+        root = load_root(tree)
+        course = tree.index(0, 0, root)
+        resets = []
+        tree.modelReset.connect(lambda: resets.append(True))
+
+        created = item_model.create_folder(USERNAME, "exams")
+        tree.insert_item(created)
+        # Folders never expanded pick their new children up when fetched
+        tree.insert_item(item_model.create_folder(USERNAME, "chapter_1", folder.id))
+
+        assert [tree.index(row, 0, root).data() for row in range(tree.rowCount(root))] == [
+            "course", "exams"
+        ]
+        assert tree.rowCount(course) == 0
+
+        item_model.delete_folder(created.id)
+        tree.remove_item(created.id)
+
+        assert [tree.index(row, 0, root).data() for row in range(tree.rowCount(root))] == [
+            "course"
+        ]
+        tree.fetchMore(course)
+        tree.wait_for_loads()
+        assert tree.rowCount(course) == 1
+        assert resets == []
+    finally:
+        tree.shutdown()
+
+
+def test_loader_sends_a_small_first_batch(item_model):
+    folder = item_model.create_folder(USERNAME, "course")
+    for index in range(1000):
+        item_model.create_folder(USERNAME, f"lesson_{index:04}", folder.id)
+    loader = ChildrenLoader(
+        item_model.database_name,
+        item_model.get_visible_children_sql(),
+        item_model.get_visible_children_sql(after=True),
+        folder.id,
+        0,
+        USERNAME,
+    )
+    batches = []
+    loader.signals.batch_loaded.connect(
+        lambda generation, parent_id, rows, done: batches.append((len(rows), done)),
+        Qt.ConnectionType.DirectConnection,
+    )
+    loader.run()
+
+    assert batches == [(256, False), (512, False), (232, True)]
+
+
+def visible_children(item_model, parent_id, username):
+    connection = sqlite3.connect(item_model.database_name)
+    try:
+        rows = connection.execute(
+            item_model.get_visible_children_sql(),
+            {
+                "parent_id": parent_id,
+                "username": username,
+                "folder_view": FOLDER_VIEW,
+                "file_view": FILE_VIEW,
+                "limit": 100,
+            },
+        ).fetchall()
+    finally:
+        connection.close()
+    return [item_model.to_item(row[:-1]).original_name for row in rows]
+
+
+def test_children_query_returns_only_what_the_user_may_see(item_model):
+    shared = item_model.create_folder(USERNAME, "shared")
+    item_model.create_folder(USERNAME, "private")
+    connection = sqlite3.connect(item_model.database_name)
+    connection.execute(INSERT_USER_SQL, ("staff", "x", False))
+    connection.execute(
+        ASSIGN_PERMISSION_AND_USER_FOR_ITEM_SQL,
+        (
+            shared.id,
+            connection.execute("SELECT id FROM users WHERE username = 'staff'").fetchone()[0],
+            connection.execute(GET_PERMISSION_ID_SQL, (FOLDER_VIEW,)).fetchone()[0],
+        ),
+    )
+    connection.commit()
+    connection.close()
+
+    assert visible_children(item_model, ROOT_ITEM_ID, USERNAME) == ["shared", "private"]
+    assert visible_children(item_model, ROOT_ITEM_ID, "staff") == ["shared"]
+    # The top level row is shown to everyone
+    assert visible_children(item_model, -1, "staff") == ["root"]
@@ -0,0 +1,64 @@
+import sqlite3
+
+from PyQt6.QtCore import QEventLoop, QTimer
+
+from models.item import ROOT_ITEM_ID
+from tests.conftest import USERNAME
+from tests.test_storage import write_lesson
+
+
+def write_files(tmp_path, names):
+    paths = []
+    for index, name in enumerate(names):
+        (tmp_path / f"source_{index}").mkdir()
+        paths.append(write_lesson(tmp_path / f"source_{index}" / name, 1000 + index))
+    return paths
+
+
+def run_upload(manager, before_copies_land=None):
+    loop = QEventLoop()
+    result = []
+    manager.finished.connect(lambda *args: (result.extend(args), loop.quit()))
+    manager.start()
+    if before_copies_land is not None:
+        # The copies report back through the event loop, not yet running
+        before_copies_land()
+    QTimer.singleShot(30000, loop.quit)
+    loop.exec()
+    return result
+
+
+def blob_count(item_model):
+    connection = sqlite3.connect(item_model.database_name)
+    try:
+        return connection.execute("SELECT count(*) FROM blobs").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def test_upload_creates_every_file(item_model, tmp_path):
+    names = [f"lesson_{index}.txt" for index in range(5)]
+    manager = item_model.upload_files(USERNAME, write_files(tmp_path, names))
+
+    created, failures, cancelled = run_upload(manager)
+
+    assert (created, failures, cancelled) == (5, [], False)
+    for name in names:
+        assert item_model.get_child(ROOT_ITEM_ID, name) is not None
+    assert blob_count(item_model) == 5
+
+
+def test_upload_fails_only_the_file_whose_name_was_taken(item_model, tmp_path):
+    names = ["report.pdf", "notes.txt", "slides.txt"]
+    manager = item_model.upload_files(USERNAME, write_files(tmp_path, names))
+
+    created, failures, cancelled = run_upload(
+        manager, lambda: item_model.create_folder(USERNAME, "notes.txt")
+    )
+
+    assert (created, cancelled) == (2, False)
+    assert [name for name, _ in failures] == ["notes.txt"]
+    assert item_model.get_child(ROOT_ITEM_ID, "report.pdf") is not None
+    assert item_model.get_child(ROOT_ITEM_ID, "slides.txt") is not None
+    # The blob of the file that failed is not kept
+    assert blob_count(item_model) == 2
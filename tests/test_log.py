@@ -0,0 +1,200 @@
+import sqlite3
+
+import pytest
+
+from configs import LOG_SEARCH_WINDOW
+from models.log import LogModel, LogQuery, fetch_history_page, search_beyond_window
+from models.log_archive import MAX_ATTACHED_ARCHIVES, LogArchiver, list_archives
+from sql_statements.auth import INSERT_USER_SQL
+from sql_statements.log import INSERT_LOG_SQL
+from tests.conftest import USERNAME
+
+MESSAGE = "Đăng nhập thành công"
+DAY = 24 * 60 * 60
+NOW = 1_760_000_000
+
+
+@pytest.fixture
+def log_model(database_name):
+    model = LogModel(database_name)
+    model.connection.execute(INSERT_USER_SQL, ("staff", "x", False))
+    model.connection.commit()
+    yield model
+    model.close_connection()
+
+
+def user_id(log_model, username):
+    return log_model.connection.execute(
+        "SELECT id FROM users WHERE username = ?", (username,)
+    ).fetchone()[0]
+
+
+def write_logs(log_model, user_id, count, created_at):
+    log_model.connection.executemany(
+        INSERT_LOG_SQL,
+        [(user_id, MESSAGE, created_at + index, created_at + index) for index in range(count)],
+    )
+    log_model.connection.commit()
+
+
+def test_text_timestamps_are_migrated_to_epoch_seconds(database_name):
+    connection = sqlite3.connect(database_name)
+    # The table as created before timestamps were stored as epoch seconds
+    connection.execute(
+        """
+        CREATE TABLE logs (
+            id integer not null constraint log_pk primary key autoincrement,
+            user_id integer not null,
+            message TEXT not null,
+            created_at TIMESTAMP default current_timestamp,
+            updated_at TIMESTAMP default current_timestamp
+        )
+        """
+    )
+    connection.execute(
+        "INSERT INTO logs (user_id, message, created_at, updated_at) VALUES (1, ?, ?, ?)",
+        (MESSAGE, "2024-03-01 10:20:30", "2024-03-01 10:20:30"),
+    )
+    connection.commit()
+    connection.close()
+
+    model = LogModel(database_name)
+    try:
+        model.connection.execute("INSERT INTO logs (user_id, message) VALUES (1, ?)", (MESSAGE,))
+        rows = model.connection.execute(
+            "SELECT typeof(created_at), created_at, typeof(updated_at) FROM logs ORDER BY id"
+        ).fetchall()
+    finally:
+        model.close_connection()
+
+    assert rows[0] == ("integer", 1_709_288_430, "integer")
+    assert [row[0] for row in rows[1:]] == ["integer"]
+
+
+def test_search_finds_older_matches_of_the_filtered_user(log_model):
+    admin_id = user_id(log_model, USERNAME)
+    write_logs(log_model, admin_id, 5, 1_000)
+    # The newest matches are all by another user
+    write_logs(log_model, user_id(log_model, "staff"), LOG_SEARCH_WINDOW, 2_000)
+
+    page, _ = log_model.query_logs(LogQuery(user_id=admin_id, text="dang nhap"))
+
+    assert len(page) == 5
+
+
+def test_search_finds_matches_older_than_until(log_model):
+    staff_id = user_id(log_model, "staff")
+    write_logs(log_model, staff_id, 5, 1_000)
+    write_logs(log_model, staff_id, LOG_SEARCH_WINDOW, 100_000)
+
+    page, _ = log_model.query_logs(LogQuery(until=100_000, text="dang nhap"))
+
+    assert len(page) == 5
+
+
+def test_search_reports_matches_beyond_the_window(log_model):
+    admin_id = user_id(log_model, USERNAME)
+    staff_id = user_id(log_model, "staff")
+    write_logs(log_model, admin_id, 5, 1_000)
+    write_logs(log_model, staff_id, LOG_SEARCH_WINDOW, 2_000)
+    text = "dang nhap"
+
+    assert search_beyond_window(log_model.database_name, LogQuery(text=text))
+    assert not search_beyond_window(log_model.database_name, LogQuery(staff_id, text=text))
+    assert not search_beyond_window(log_model.database_name, LogQuery(admin_id, text=text))
+
+
+def test_table_model_reports_a_limited_search(qapp, log_model):
+    from PyQt6.QtCore import QCoreApplication
+
+    from models.log_table import LogTableModel
+
+    write_logs(log_model, user_id(log_model, "staff"), LOG_SEARCH_WINDOW + 1, 1_000)
+    table_model = LogTableModel(log_model)
+    limited = []
+    table_model.search_limited.connect(limited.append)
+    try:
+        table_model.set_search("dang nhap")
+        table_model._thread_pool.waitForDone()
+        QCoreApplication.processEvents()
+        table_model.set_search("")
+    finally:
+        table_model.shutdown()
+        QCoreApplication.processEvents()
+
+    # Cleared when each query starts, set once the search is checked
+    assert limited == [False, True, False]
+
+
+def load_all_pages(table_model):
+    from PyQt6.QtCore import QCoreApplication
+
+    pages = []
+
+    def on_rows_inserted(parent, first, last):
+        pages.append(last - first + 1)
+
+    table_model.rowsInserted.connect(on_rows_inserted)
+    table_model.reload()
+    while True:
+        table_model._thread_pool.waitForDone()
+        QCoreApplication.processEvents()
+        if not table_model.canFetchMore():
+            table_model.rowsInserted.disconnect(on_rows_inserted)
+            return pages
+        table_model.fetchMore()
+
+
+def test_table_model_loads_growing_pages_in_order(qapp, log_model):
+    from PyQt6.QtCore import QCoreApplication, Qt
+
+    from models.log_table import LogTableModel
+
+    write_logs(log_model, user_id(log_model, "staff"), 700, NOW)
+    table_model = LogTableModel(log_model)
+    try:
+        pages = load_all_pages(table_model)
+        newest_first = [table_model._rows[row].created_at for row in range(table_model.rowCount())]
+        table_model.sort(2, Qt.SortOrder.AscendingOrder)
+        pages_ascending = load_all_pages(table_model)
+        oldest_first = [table_model._rows[row].created_at for row in range(table_model.rowCount())]
+    finally:
+        table_model.shutdown()
+        QCoreApplication.processEvents()
+
+    assert pages == [100, 500, 100]
+    assert pages_ascending == [100, 500, 100]
+    assert len(newest_first) == 700 and newest_first == sorted(newest_first, reverse=True)
+    assert oldest_first == newest_first[::-1]
+
+
+def read_history(log_model, archive_path, descending):
+    query = LogQuery(since=NOW - 500 * DAY, descending=descending)
+    rows, cursor = [], None
+    while True:
+        page, cursor = fetch_history_page(
+            log_model.database_name, query, cursor, 7, str(archive_path)
+        )
+        rows.extend(row.created_at for row in page)
+        if cursor is None:
+            return rows
+
+
+def test_history_reads_more_archives_than_can_be_attached(log_model, tmp_path):
+    write_logs(log_model, user_id(log_model, USERNAME), 1, 0)
+    for day in range(0, 450, 9):
+        write_logs(log_model, user_id(log_model, USERNAME), 2, NOW - day * DAY)
+    count = log_model.connection.execute("SELECT count(*) FROM logs").fetchone()[0]
+    archive_path = tmp_path / "archives"
+    LogArchiver(
+        log_model.database_name, str(archive_path), retention_days=30, purge_days=None, pause=0
+    ).run(NOW)
+    assert len(list_archives(str(archive_path))) > MAX_ATTACHED_ARCHIVES
+
+    newest_first = read_history(log_model, archive_path, descending=True)
+    oldest_first = read_history(log_model, archive_path, descending=False)
+
+    # The log older than the range is left out
+    assert len(newest_first) == count - 1
+    assert newest_first == sorted(newest_first, reverse=True)
+    assert oldest_first == newest_first[::-1]
@@ -0,0 +1,101 @@
+"""No log query may read the whole logs table.
+
+Every query the log viewer, the exports, the search and the archiver can
+build is planned on a database created by LogModel, the page queries also on
+a history connection with archives attached. A plan fails when it scans logs
+without an index, sorts in a temporary B-tree or materializes the logs.
+"""
+import itertools
+import re
+import sqlite3
+
+import pytest
+
+from models.log import LogModel, LogQuery, build_log_page_sql
+from models.log_archive import LogArchiver, attached_archives, connect_logs
+from sql_statements.log import (
+    ARCHIVE_BATCH_SQL,
+    CREATE_TABLE_SQL,
+    DELETE_LOG_BATCH_SQL,
+    FETCH_ARCHIVE_BATCH_SQL,
+    FETCH_USER_LOGS_SQL,
+    INSERT_LOG_SQL,
+    OLDEST_LOG_SQL,
+)
+from tests.conftest import USERNAME
+
+FULL_SCAN = re.compile(r"^SCAN (l|logs)$|USE TEMP B-TREE|MATERIALIZE|AUTOMATIC")
+DAY = 24 * 60 * 60
+NOW = 1_760_000_000
+
+PAGE_QUERIES = [
+    (LogQuery(user_id, since, until, "created_at", descending, text), cursor)
+    for user_id, since, until, descending, cursor, text in itertools.product(
+        (None, 1), (None, 1000), (None, 2000), (True, False), (None, (1500, 10)), (None, "dang nhap")
+    )
+]
+BATCH_PARAMS = {"before": 2000, "batch_size": 100, "last_created_at": 1500, "last_id": 10}
+
+
+@pytest.fixture
+def log_model(database_name):
+    model = LogModel(database_name)
+    yield model
+    model.close_connection()
+
+
+@pytest.fixture
+def history_connection(log_model, tmp_path):
+    """A connection with the archives of three months attached."""
+    log_model.connection.executemany(
+        INSERT_LOG_SQL, [(1, "Đăng nhập", NOW - day * DAY, NOW) for day in range(0, 120, 5)]
+    )
+    log_model.connection.commit()
+    archive_path = str(tmp_path / "archives")
+    LogArchiver(
+        log_model.database_name, archive_path, retention_days=30, purge_days=None, pause=0
+    ).run(NOW)
+    connection = connect_logs(log_model.database_name, NOW - 120 * DAY, None, archive_path)
+    assert len(attached_archives(connection)) >= 3
+    yield connection
+    connection.close()
+
+
+def assert_indexed(connection, sql, params):
+    plan = [row[3] for row in connection.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+    assert not [detail for detail in plan if FULL_SCAN.search(detail)], "\n".join(plan)
+
+
+def page_sql(query, cursor, archives=()):
+    if query.text and cursor is not None:
+        cursor = 100
+    return build_log_page_sql(query, cursor, 100, archives)
+
+
+@pytest.mark.parametrize("query, cursor", PAGE_QUERIES)
+def test_page_query_uses_an_index(log_model, query, cursor):
+    assert_indexed(log_model.connection, *page_sql(query, cursor))
+
+
+@pytest.mark.parametrize("query, cursor", PAGE_QUERIES)
+def test_history_page_query_uses_an_index(history_connection, query, cursor):
+    archives = () if query.text else attached_archives(history_connection)
+    assert_indexed(history_connection, *page_sql(query, cursor, archives))
+
+
+@pytest.mark.parametrize(
+    "sql, params",
+    [
+        (FETCH_USER_LOGS_SQL, (USERNAME,)),
+        (OLDEST_LOG_SQL, BATCH_PARAMS),
+        (FETCH_ARCHIVE_BATCH_SQL, BATCH_PARAMS),
+        (ARCHIVE_BATCH_SQL, BATCH_PARAMS),
+        (DELETE_LOG_BATCH_SQL, BATCH_PARAMS),
+    ],
+)
+def test_log_query_uses_an_index(log_model, tmp_path, sql, params):
+    archive = str(tmp_path / "archive.db")
+    with sqlite3.connect(archive) as archive_connection:
+        archive_connection.execute(CREATE_TABLE_SQL)
+    log_model.connection.execute("ATTACH DATABASE ? AS archive", (archive,))
+    assert_indexed(log_model.connection, sql, params)
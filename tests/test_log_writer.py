@@ -0,0 +1,54 @@
+import sqlite3
+
+from models.log_writer import _STOP, LogWriter
+from sql_statements.auth import CREATE_USER_TABLE_SQL, INSERT_USER_SQL
+from sql_statements.log import CREATE_TABLE_SQL
+from tests.conftest import USERNAME
+
+
+def messages(database_name):
+    connection = sqlite3.connect(database_name)
+    try:
+        return [row[0] for row in connection.execute("SELECT message FROM logs ORDER BY id")]
+    finally:
+        connection.close()
+
+
+def test_writer_goes_on_after_a_failed_batch(tmp_path):
+    database_name = str(tmp_path / "logs.db")
+    connection = sqlite3.connect(database_name)
+    connection.execute(CREATE_TABLE_SQL)
+    connection.commit()
+    writer = LogWriter(database_name)
+    try:
+        # The users table is missing, the lookup of the user fails
+        writer.write(USERNAME, "lost")
+        writer.flush()
+        connection.execute(CREATE_USER_TABLE_SQL)
+        connection.execute(INSERT_USER_SQL, (USERNAME, "x", True))
+        connection.commit()
+
+        writer.write(USERNAME, "written")
+        writer.flush()
+
+        assert messages(database_name) == ["written"]
+    finally:
+        writer.close()
+        connection.close()
+
+
+def test_writer_writes_directly_once_its_thread_stopped(database_name):
+    connection = sqlite3.connect(database_name)
+    connection.execute(CREATE_TABLE_SQL)
+    connection.commit()
+    connection.close()
+    writer = LogWriter(database_name)
+    # As when the thread dies, it stops without the writer being closed
+    writer._queue.put(_STOP)
+    writer._thread.join()
+
+    writer.write(USERNAME, "written")
+    writer.flush()
+    writer.close()
+
+    assert messages(database_name) == ["written"]
@@ -0,0 +1,55 @@
+import os
+import sqlite3
+
+import pytest
+
+from common.compression import CODECS
+from models.scrubber import StorageScrubber
+from tests.conftest import USERNAME
+from tests.test_storage import write_lesson
+
+
+def scrub(item_model):
+    return StorageScrubber(
+        item_model.database_name, item_model.get_root_path(), pause=0
+    ).run()
+
+
+def test_scrub_counts_a_repeated_chunk_once(item_model, tmp_path):
+    source = tmp_path / "video.mp4"
+    source.write_bytes(os.urandom(1024 * 1024) * 4)
+    stored = item_model.get_chunk_store().put_file(str(source))
+    item_model.create_files(USERNAME, [("video.mp4", stored)])
+    connection = sqlite3.connect(item_model.database_name)
+    chunks, distinct = connection.execute(
+        "SELECT count(*), count(DISTINCT chunk_hash) FROM blob_chunks"
+    ).fetchone()
+    connection.close()
+    assert chunks > distinct
+
+    report = scrub(item_model)
+
+    assert report.problems == 0
+    assert report.chunks_checked == distinct
+
+
+@pytest.mark.parametrize("codec", ["zlib", "lzma", "zstd"])
+def test_scrub_reports_corrupt_and_missing_blobs(item_model, tmp_path, codec):
+    if codec not in CODECS:
+        pytest.skip(f"{codec} is not installed")
+    store = item_model.get_blob_store()
+    corrupt = store.put_file(write_lesson(tmp_path / "lesson_0.txt"), codec)
+    missing = store.put_file(write_lesson(tmp_path / "lesson_1.txt", 4000), codec)
+    item_model.create_files(USERNAME, [("lesson_0.txt", corrupt), ("lesson_1.txt", missing)])
+    corrupt_path = store.blob_path(corrupt.blob_hash)
+    with open(corrupt_path, "r+b") as blob_file:
+        blob_file.seek(8)
+        blob_file.write(b"\xff" * 64)
+    os.remove(store.blob_path(missing.blob_hash))
+
+    report = scrub(item_model)
+
+    assert [(entry["hash"], entry["reason"].split(":")[0]) for entry in report.corrupt] == [
+        (corrupt.blob_hash, f"{codec} stream")
+    ]
+    assert [entry["hash"] for entry in report.missing] == [missing.blob_hash]
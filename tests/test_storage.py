@@ -0,0 +1,149 @@
+import concurrent.futures
+import filecmp
+import os
+
+import pytest
+
+from common.storage import BlobStore, StoredBlob
+from tests.conftest import USERNAME
+
+
+def write_lesson(path, lines=5000):
+    """A text file zlib shrinks well, so it is stored compressed."""
+    path.write_text("".join(f"Dòng {index} của bài giảng\n" for index in range(lines)), "utf-8")
+    return str(path)
+
+
+def export(item_model, item, target_path):
+    exporter = item_model.export_file(item.id, str(target_path))
+    errors = []
+    exporter.signals.failed.connect(errors.append)
+    exporter.run()
+    assert errors == []
+
+
+def test_stored_content_reports_its_codec(tmp_path):
+    (tmp_path / "store").mkdir()
+    store = BlobStore(str(tmp_path / "store"))
+    source = write_lesson(tmp_path / "lesson.txt")
+
+    first = store.put_file(source, "zlib")
+    # As after a crash, the blob is on disk without a row
+    second = store.put_file(source, "zlib")
+
+    assert first.created and not second.created
+    assert second.codec == first.codec == "zlib"
+    assert second.stored_size == first.stored_size
+
+
+def test_raw_content_reports_no_codec(tmp_path):
+    (tmp_path / "store").mkdir()
+    store = BlobStore(str(tmp_path / "store"))
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(bytes(range(256)) * 16)
+
+    store.put_file(str(source))
+    stored = store.put_file(str(source), "zlib")
+
+    assert (stored.codec, stored.stored_size) == (None, 4096)
+
+
+def test_unknown_storage_cannot_create_a_row():
+    with pytest.raises(Exception):
+        StoredBlob("0" * 64, 10, False).reference_params()
+
+
+def test_concurrent_identical_uploads_export_both(item_model, tmp_path):
+    source = write_lesson(tmp_path / "lesson.txt")
+    store = item_model.get_upload_store()
+
+    with concurrent.futures.ThreadPoolExecutor(2) as pool:
+        stored = list(pool.map(lambda _: store.put_file(source, "zlib"), range(2)))
+    # The copy that found the blob already written commits its row first
+    stored.sort(key=lambda blob: blob.created)
+    items = [
+        item_model.create_files(USERNAME, [(f"lesson_{index}.txt", blob)])[0]
+        for index, blob in enumerate(stored)
+    ]
+
+    assert item_model.get_blob_codec(items[0].blob_hash) == "zlib"
+    for index, item in enumerate(items):
+        target_path = tmp_path / f"export_{index}.txt"
+        export(item_model, item, target_path)
+        assert filecmp.cmp(source, target_path, shallow=False)
+
+
+def test_identical_files_share_one_blob_until_both_are_deleted(item_model, tmp_path):
+    source = write_lesson(tmp_path / "lesson.txt")
+    folder = item_model.create_folder(USERNAME, "copies")
+
+    first = item_model.create_file(USERNAME, source)
+    second = item_model.create_file(USERNAME, source, folder.id)
+
+    def refcount():
+        row = item_model.connection.execute(
+            "SELECT refcount FROM blobs WHERE hash = ?", (first.blob_hash,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    blob_path = item_model.get_file_path(first)
+    assert second.blob_hash == first.blob_hash
+    assert item_model.get_file_path(second) == blob_path
+    assert refcount() == 2
+
+    item_model.delete_file(first.id)
+    assert refcount() == 1
+    export(item_model, second, tmp_path / "export.txt")
+    assert filecmp.cmp(source, tmp_path / "export.txt", shallow=False)
+
+    item_model.delete_file(second.id)
+    assert refcount() is None
+    assert not os.path.exists(blob_path)
+
+
+def test_stored_content_is_not_copied_again(tmp_path, monkeypatch):
+    (tmp_path / "store").mkdir()
+    store = BlobStore(str(tmp_path / "store"))
+    source = tmp_path / "photo.jpg"
+    source.write_bytes(bytes(range(256)) * 16)
+    store.put_file(str(source))
+
+    def copy_file(*args, **kwargs):
+        raise AssertionError("stored content was copied")
+
+    monkeypatch.setattr("common.storage.copy_file", copy_file)
+    stored = store.put_file(str(source))
+
+    assert not stored.created
+
+
+def test_blobs_are_spread_over_the_fanout(tmp_path):
+    store = BlobStore(str(tmp_path), fanout=[2, 2])
+    blob_hash = "abcdef" + "0" * 58
+
+    assert store.shard_path(blob_hash) == os.path.join(str(tmp_path), "ab", "cd", blob_hash)
+    assert store.put_bytes(blob_hash, b"content")
+    assert (tmp_path / "ab" / "cd" / blob_hash).read_bytes() == b"content"
+
+
+def test_flat_blobs_are_found_and_migrated(tmp_path):
+    store = BlobStore(str(tmp_path), fanout=[2, 2])
+    blob_hashes = [f"{index:02x}" + "1" * 62 for index in range(3)]
+    for blob_hash in blob_hashes:
+        (tmp_path / blob_hash).write_bytes(blob_hash.encode())
+    # Other stores and upload leftovers in the root are not blobs
+    (tmp_path / "chunks").mkdir()
+    (tmp_path / "chunks" / blob_hashes[0]).write_bytes(b"chunk")
+    (tmp_path / ".upload-1").write_bytes(b"partial")
+
+    assert store.blob_path(blob_hashes[0]) == str(tmp_path / blob_hashes[0])
+    assert store.migrate_layout(batch_size=2) == 3
+    # A rerun, as after a crash, finds nothing left to move
+    assert store.migrate_layout() == 0
+
+    for blob_hash in blob_hashes:
+        assert store.blob_path(blob_hash) == store.shard_path(blob_hash)
+        with open(store.blob_path(blob_hash), "rb") as blob_file:
+            assert blob_file.read() == blob_hash.encode()
+    assert (tmp_path / "chunks" / blob_hashes[0]).exists()
+    assert (tmp_path / ".upload-1").exists()
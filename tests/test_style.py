@@ -0,0 +1,15 @@
+from common.style import get_icon, get_style
+
+
+def test_styles_are_shared_per_size_and_weight(qapp):
+    folder = get_style(13, True)
+
+    assert get_style(13, True) is folder
+    assert get_style(13, False) is not folder
+    assert (folder.font.pointSize(), folder.font.bold()) == (13, True)
+    assert not get_style(13, False).font.bold()
+
+
+def test_icons_are_shared_per_category(qapp):
+    assert get_icon("Thư mục") is get_icon("Thư mục")
+    assert not get_icon("Tài liệu").isNull()
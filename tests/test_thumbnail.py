@@ -0,0 +1,77 @@
+from PyQt6.QtCore import QEventLoop, QTimer
+from PyQt6.QtGui import QColor, QImage
+
+from models.thumbnail import ThumbnailCache
+from tests.conftest import USERNAME
+
+
+def write_image(path, color="red", width=640, height=480):
+    image = QImage(width, height, QImage.Format.Format_RGB32)
+    image.fill(QColor(color))
+    assert image.save(str(path))
+    return str(path)
+
+
+def wait_ready(cache):
+    loop = QEventLoop()
+    ready = []
+    cache.thumbnail_ready.connect(lambda key: (ready.append(key), loop.quit()))
+    QTimer.singleShot(10000, loop.quit)
+    loop.exec()
+    return ready
+
+
+def test_thumbnail_is_loaded_then_served_from_memory(item_model, tmp_path):
+    item = item_model.create_file(USERNAME, write_image(tmp_path / "photo.png"))
+    cache = ThumbnailCache(item_model, cache_path=str(tmp_path / "thumbnails"), size=64)
+    try:
+        assert cache.icon(item) is None
+        assert wait_ready(cache) == [ThumbnailCache.key(item)]
+
+        icon = cache.icon(item)
+        assert icon is not None and not icon.isNull()
+        thumbnail = QImage(cache.cached_path(item))
+        assert max(thumbnail.width(), thumbnail.height()) == 64
+    finally:
+        cache.shutdown()
+
+
+def test_identical_images_share_one_thumbnail(item_model, tmp_path):
+    source = write_image(tmp_path / "photo.png")
+    first = item_model.create_file(USERNAME, source)
+    folder = item_model.create_folder(USERNAME, "copies")
+    second = item_model.create_file(USERNAME, source, folder.id)
+    cache = ThumbnailCache(item_model, cache_path=str(tmp_path / "thumbnails"), size=64)
+    try:
+        assert ThumbnailCache.key(first) == ThumbnailCache.key(second)
+        cache.icon(first)
+        wait_ready(cache)
+        assert cache.icon(second) is not None
+    finally:
+        cache.shutdown()
+
+
+def test_disk_cache_survives_restart_and_is_bounded(item_model, tmp_path):
+    items = [
+        item_model.create_file(USERNAME, write_image(tmp_path / f"{color}.png", color))
+        for color in ("red", "green")
+    ]
+    cache_path = str(tmp_path / "thumbnails")
+    cache = ThumbnailCache(item_model, cache_path=cache_path, size=64)
+    try:
+        cache.icon(items[0])
+        wait_ready(cache)
+    finally:
+        cache.shutdown()
+
+    # A new session finds the thumbnail on disk, with room for one file only
+    cache = ThumbnailCache(item_model, cache_path=cache_path, size=64, cache_bytes=1)
+    try:
+        assert cache.cached_path(items[0]) is not None
+        cache.icon(items[1])
+        wait_ready(cache)
+
+        assert cache.cached_path(items[0]) is None
+        assert cache.cached_path(items[1]) is not None
+    finally:
+        cache.shutdown()
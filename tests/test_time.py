@@ -0,0 +1,43 @@
+import datetime
+
+from common.time import (
+    format_utc_timestamp,
+    format_utc_timestamps,
+    get_timezone,
+    parse_utc_timestamp,
+)
+
+
+def test_epoch_and_text_timestamps_format_alike():
+    # 2024-03-01 10:20:30 UTC
+    epoch = 1_709_288_430
+
+    assert format_utc_timestamp(epoch) == "2024-03-01 17:20:30"
+    assert format_utc_timestamp("2024-03-01 10:20:30") == "2024-03-01 17:20:30"
+    assert parse_utc_timestamp("2024-03-01T10:20:30") == parse_utc_timestamp(epoch)
+
+
+def test_batch_formatting_matches_the_zone_database():
+    timestamps = [0, 1_709_288_430, None, 1_709_288_430, 1_720_000_000]
+    zone = "Europe/Paris"
+
+    expected = [
+        ""
+        if timestamp is None
+        else datetime.datetime.fromtimestamp(timestamp, get_timezone(zone)).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        for timestamp in timestamps
+    ]
+
+    assert format_utc_timestamps(timestamps, zone) == expected
+    assert format_utc_timestamps(timestamps) == [
+        format_utc_timestamp(timestamp) if timestamp is not None else ""
+        for timestamp in timestamps
+    ]
+
+
+def test_zones_without_daylight_saving_become_a_fixed_offset():
+    assert isinstance(get_timezone("Asia/Bangkok"), datetime.timezone)
+    assert not isinstance(get_timezone("Europe/Paris"), datetime.timezone)
+    assert get_timezone("Asia/Bangkok") is get_timezone("Asia/Bangkok")
@@ -2,9 +2,11 @@ import logging
 import traceback
 
 from PyQt6 import uic, QtWidgets
+from PyQt6.QtWidgets import QMessageBox
 
 from configs import LOG_UI_PATH
 from presenters.log import LogPresenter
+from ui_components.custom_messgae_box import CustomMessageBox
 
 
 class LogDialog(QtWidgets.QDialog):
@@ -15,5 +17,17 @@ class LogDialog(QtWidgets.QDialog):
         try:
             self.presenter.populate_table()
         except Exception:
-            logging.error(traceback.print_exc())
-        
+            logging.error(traceback.format_exc())
+
+    def display_error(self, message):
+        """Display a custom error message."""
+        error_box = CustomMessageBox(
+            "Lỗi", message, QMessageBox.Icon.Warning, "Đóng", self
+        )
+        error_box.exec()
+
+    def done(self, result):
+        # Stops the page loader, whichever way the dialog is closed
+        self.presenter.close()
+        super().done(result)
+
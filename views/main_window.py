@@ -3,7 +3,7 @@ import traceback
 
 from PyQt6 import QtWidgets, uic
 from PyQt6.QtCore import Qt, QObject, QEvent, pyqtSignal
-from PyQt6.QtGui import QShortcut, QKeySequence
+from PyQt6.QtGui import QAction, QShortcut, QKeySequence
 from PyQt6.QtWidgets import QMessageBox, QHeaderView, QDialog
 
 from common import session
@@ -37,10 +37,19 @@ class MainWindow(QtWidgets.QMainWindow):
         uic.loadUi(DASHBOARD_UI_PATH, self)
 
         menu_bar = self.menuBar()
+        file_menu = menu_bar.addMenu("Tệp")
         help_menu = menu_bar.addMenu("Help")
         create_about_action(self, help_menu)
 
         self.item_presenter = ItemPresenter(self)
+        import_action = QAction("Nhập thư mục...", self)
+        import_action.triggered.connect(self.item_presenter.handle_import_directory)
+        import_action.setVisible(
+            session.SESSION.match_permissions(FILE_CREATE)
+            and session.SESSION.match_permissions(FOLDER_CREATE)
+        )
+        file_menu.addAction(import_action)
+        file_menu.menuAction().setVisible(import_action.isVisible())
         self.permission_presenter = PermissionPresenter(self)
         self.permission_presenter.populate_table()
 
@@ -86,11 +95,7 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.display_error(f"{permission}: {PERMISSION_DENIED}")
                 return
 
-            items = [
-                self.treeView.model().data(value)
-                for index, value in enumerate(self.treeView.selectedIndexes())
-                if index % 4 == 0
-            ]
+            items = self.item_presenter.get_selected_items()
             if len(items) == 0:
                 self.display_error("Xin chọn 1 tệp")
             else:
@@ -165,7 +170,13 @@ class MainWindow(QtWidgets.QMainWindow):
         select_all_shortcut.activated.connect(self.select_all_items)
 
     def set_model(self, model):
+        if self.treeView.model() is model:
+            return
+        # QTreeView.setModel does not delete the selection model it replaces
+        old_selection_model = self.treeView.selectionModel()
         self.treeView.setModel(model)
+        if old_selection_model is not None:
+            old_selection_model.deleteLater()
 
     def display_success(self, message):
         """Display a custom success message."""
@@ -186,8 +197,8 @@ class MainWindow(QtWidgets.QMainWindow):
         # self.treeView.setRootIndex(root_index)
 
     def refresh_tree_view(self):
-        """Refresh the tree view to reflect any changes in the file system."""
-        self.set_model(self.item_presenter.refresh_model())
+        """Reload the tree view in place to reflect any changes in the file system."""
+        self.item_presenter.refresh_model()
 
     def update_label_text(self):
         sender = self.sender()  # Get the button that triggered this slot
@@ -19,6 +19,7 @@ class PermissionItemDialog(QtWidgets.QDialog):
         self.setWindowTitle("Màn Hình Chỉnh Quyền")
 
         self.action_type = action_type  # Store the action type ('assign' or 'unassign')
+        item_names = [item.original_name for item in selected_items]
 
         self.presenter = PermissionPresenter(self)
 
@@ -48,14 +49,14 @@ class PermissionItemDialog(QtWidgets.QDialog):
                 for item in selected_items:
                     try:
                         self.presenter.assign_permissions_to_users_for_file(
-                            item,
+                            item.id,
                             assign_username,
                             assign_permissions,
                         )
                     except Exception:
                         logging.error(traceback.print_exc())
                 self.display_success(
-                    f"Gắn {', '.join(selected_items)} "
+                    f"Gắn {', '.join(item_names)} "
                     f"với các quyền {', '.join(assign_permissions)}"
                 )
                 self.accept()
@@ -69,14 +70,14 @@ class PermissionItemDialog(QtWidgets.QDialog):
                 for item in selected_items:
                     try:
                         self.presenter.unassign_permissions_to_users_for_file(
-                            item,
+                            item.id,
                             assign_username,
                             assign_permissions,
                         )
                     except Exception:
                         logging.error(traceback.print_exc())
                 self.display_success(
-                    f"Gỡ {', '.join(selected_items)} "
+                    f"Gỡ {', '.join(item_names)} "
                     f"với các quyền {', '.join(assign_permissions)}"
                 )
                 self.accept()